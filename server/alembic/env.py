@@ -14,6 +14,9 @@ from app.models.book_models import (  # noqa: F401
     HighlightLocation,
     UserBookLibrary,
 )
+from app.models.feedback_models import Feedback  # noqa: F401
+from app.models.import_models import HighlightImport  # noqa: F401
+from app.models.sync_models import SyncChange  # noqa: F401
 from app.models.user_models import Profile  # noqa: F401
 from sqlalchemy import pool
 from sqlalchemy.engine import Connection
@@ -0,0 +1,74 @@
+"""jsonb progress storage
+
+Revision ID: 5b1d7e3a9c42
+Revises: 2c975cea25e6
+Create Date: 2025-10-19 09:00:00.000000+00:00
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "5b1d7e3a9c42"
+down_revision: Union[str, None] = "2c975cea25e6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # One rewrite per table under its ACCESS EXCLUSIVE lock; batching inside
+    # the migration's transaction would hold the same lock for just as long
+    op.alter_column(
+        "user_book_library",
+        "epub_progress",
+        type_=postgresql.JSONB(),
+        postgresql_using="epub_progress::jsonb",
+    )
+    op.alter_column(
+        "book_metadata",
+        "pdf_toc",
+        type_=postgresql.JSONB(),
+        postgresql_using="pdf_toc::jsonb",
+    )
+
+    op.add_column(
+        "user_book_library",
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+    )
+
+    # Partial index for "books currently in progress", most recently read first
+    op.create_index(
+        "ix_user_book_library_in_progress",
+        "user_book_library",
+        ["user_id", sa.text("updated_at DESC")],
+        postgresql_where=sa.text(
+            "epub_progress IS NOT NULL OR pdf_current_page IS NOT NULL"
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_book_library_in_progress", table_name="user_book_library")
+    op.drop_column("user_book_library", "updated_at")
+
+    op.alter_column(
+        "book_metadata",
+        "pdf_toc",
+        type_=postgresql.JSON(astext_type=sa.Text()),
+        postgresql_using="pdf_toc::json",
+    )
+    op.alter_column(
+        "user_book_library",
+        "epub_progress",
+        type_=postgresql.JSON(astext_type=sa.Text()),
+        postgresql_using="epub_progress::json",
+    )
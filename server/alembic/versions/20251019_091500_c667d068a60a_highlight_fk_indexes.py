@@ -0,0 +1,38 @@
+"""index highlight foreign keys
+
+Revision ID: c667d068a60a
+Revises: 5b1d7e3a9c42
+Create Date: 2025-10-19 09:15:00.000000+00:00
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c667d068a60a"
+down_revision: Union[str, None] = "5b1d7e3a9c42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ON DELETE CASCADE looks up child rows by these columns, so bulk deletes
+    # of highlights (or whole library entries) need them indexed. created_at
+    # rides along so per-entry listings ordered by time use the same index.
+    op.create_index(
+        "ix_highlights_user_book_lib_id_created_at",
+        "highlights",
+        ["user_book_lib_id", "created_at"],
+    )
+    op.create_index(
+        "ix_highlight_locations_highlight_id", "highlight_locations", ["highlight_id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_highlight_locations_highlight_id", table_name="highlight_locations"
+    )
+    op.drop_index("ix_highlights_user_book_lib_id_created_at", table_name="highlights")
@@ -0,0 +1,32 @@
+"""library overview indexes
+
+Revision ID: 9e24f1c7b8d3
+Revises: c667d068a60a
+Create Date: 2025-10-19 09:30:00.000000+00:00
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9e24f1c7b8d3"
+down_revision: Union[str, None] = "c667d068a60a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_user_book_library_user_id_date_added",
+        "user_book_library",
+        ["user_id", sa.text("date_added DESC"), sa.text("id DESC")],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_user_book_library_user_id_date_added", table_name="user_book_library"
+    )
@@ -0,0 +1,150 @@
+"""sync change feed
+
+Revision ID: 3fa8c2d61e07
+Revises: 9e24f1c7b8d3
+Create Date: 2025-10-19 09:45:00.000000+00:00
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "3fa8c2d61e07"
+down_revision: Union[str, None] = "9e24f1c7b8d3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SYNCED_TABLES = ("user_book_library", "highlights", "highlight_locations")
+
+
+def upgrade() -> None:
+    op.execute("CREATE SEQUENCE sync_change_seq")
+
+    op.create_table(
+        "sync_changes",
+        sa.Column("entity_type", sa.Text(), nullable=False),
+        sa.Column("entity_id", postgresql.UUID(), nullable=False),
+        sa.Column("user_id", postgresql.UUID(), nullable=False),
+        sa.Column(
+            "seq",
+            sa.BigInteger(),
+            server_default=sa.text("nextval('sync_change_seq')"),
+            nullable=False,
+        ),
+        sa.Column("deleted", sa.Boolean(), server_default=sa.false(), nullable=False),
+        sa.Column(
+            "changed_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("entity_type", "entity_id"),
+    )
+    # Writing transaction, so readers can hold back changes from transactions still in flight
+    op.execute(
+        "ALTER TABLE sync_changes ADD COLUMN txid xid8 NOT NULL DEFAULT pg_current_xact_id()"
+    )
+    op.create_index(
+        "ix_sync_changes_user_id_txid_seq", "sync_changes", ["user_id", "txid", "seq"]
+    )
+
+    # Rows whose parent is already gone (cascaded deletes) are skipped: the
+    # parent's tombstone tells clients to drop its children too.
+    op.execute("""
+    CREATE OR REPLACE FUNCTION public.record_sync_change()
+    RETURNS trigger AS $$
+    DECLARE
+        row_id uuid;
+        owner uuid;
+        kind text;
+        parent_id uuid;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            row_id := OLD.id;
+        ELSE
+            row_id := NEW.id;
+        END IF;
+
+        IF TG_TABLE_NAME = 'user_book_library' THEN
+            kind := 'library';
+            IF TG_OP = 'DELETE' THEN
+                owner := OLD.user_id;
+            ELSE
+                owner := NEW.user_id;
+            END IF;
+        ELSIF TG_TABLE_NAME = 'highlights' THEN
+            kind := 'highlight';
+            IF TG_OP = 'DELETE' THEN
+                parent_id := OLD.user_book_lib_id;
+            ELSE
+                parent_id := NEW.user_book_lib_id;
+            END IF;
+            SELECT l.user_id INTO owner
+            FROM public.user_book_library l WHERE l.id = parent_id;
+        ELSE
+            kind := 'highlight_location';
+            IF TG_OP = 'DELETE' THEN
+                parent_id := OLD.highlight_id;
+            ELSE
+                parent_id := NEW.highlight_id;
+            END IF;
+            SELECT l.user_id INTO owner
+            FROM public.highlights h
+            JOIN public.user_book_library l ON l.id = h.user_book_lib_id
+            WHERE h.id = parent_id;
+        END IF;
+
+        IF owner IS NULL THEN
+            RETURN NULL;
+        END IF;
+
+        INSERT INTO public.sync_changes (entity_type, entity_id, user_id, deleted)
+        VALUES (kind, row_id, owner, TG_OP = 'DELETE')
+        ON CONFLICT (entity_type, entity_id) DO UPDATE SET
+            user_id = EXCLUDED.user_id,
+            deleted = EXCLUDED.deleted,
+            seq = nextval('sync_change_seq'),
+            txid = pg_current_xact_id(),
+            changed_at = now();
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+    for table in SYNCED_TABLES:
+        op.execute(f"""
+        CREATE TRIGGER {table}_sync_change
+            AFTER INSERT OR UPDATE OR DELETE ON public.{table}
+            FOR EACH ROW EXECUTE FUNCTION public.record_sync_change();
+        """)
+
+    # Existing rows enter the feed so a fresh device can sync from cursor 0
+    op.execute("""
+    INSERT INTO sync_changes (entity_type, entity_id, user_id)
+    SELECT 'library', id, user_id FROM user_book_library
+    """)
+    op.execute("""
+    INSERT INTO sync_changes (entity_type, entity_id, user_id)
+    SELECT 'highlight', h.id, l.user_id
+    FROM highlights h JOIN user_book_library l ON l.id = h.user_book_lib_id
+    """)
+    op.execute("""
+    INSERT INTO sync_changes (entity_type, entity_id, user_id)
+    SELECT 'highlight_location', hl.id, l.user_id
+    FROM highlight_locations hl
+    JOIN highlights h ON h.id = hl.highlight_id
+    JOIN user_book_library l ON l.id = h.user_book_lib_id
+    """)
+
+
+def downgrade() -> None:
+    for table in SYNCED_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_sync_change ON public.{table};")
+    op.execute("DROP FUNCTION IF EXISTS public.record_sync_change();")
+    op.drop_index("ix_sync_changes_user_id_txid_seq", table_name="sync_changes")
+    op.drop_table("sync_changes")
+    op.execute("DROP SEQUENCE IF EXISTS sync_change_seq")
@@ -0,0 +1,31 @@
+"""book rag enabled
+
+Revision ID: 6d0e4b2a7f15
+Revises: 3fa8c2d61e07
+Create Date: 2025-10-19 10:00:00.000000+00:00
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "6d0e4b2a7f15"
+down_revision: Union[str, None] = "3fa8c2d61e07"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "book_metadata",
+        sa.Column(
+            "rag_enabled", sa.Boolean(), server_default=sa.text("false"), nullable=False
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("book_metadata", "rag_enabled")
@@ -0,0 +1,53 @@
+"""highlight import status
+
+Revision ID: 8b2f6c4d1e93
+Revises: 6d0e4b2a7f15
+Create Date: 2025-10-19 10:30:00.000000+00:00
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "8b2f6c4d1e93"
+down_revision: Union[str, None] = "6d0e4b2a7f15"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "highlight_imports",
+        sa.Column("id", postgresql.UUID(), nullable=False),
+        sa.Column("user_id", postgresql.UUID(), nullable=False),
+        sa.Column("format", sa.Text(), nullable=False),
+        sa.Column("status", sa.Text(), nullable=False),
+        sa.Column("rows_parsed", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("rows_staged", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("rows_skipped", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("imported", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("duplicates", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["profiles.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    # Old finished imports are pruned by age
+    op.create_index(
+        "ix_highlight_imports_finished_at", "highlight_imports", ["finished_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_highlight_imports_finished_at", table_name="highlight_imports")
+    op.drop_table("highlight_imports")
@@ -0,0 +1,56 @@
+"""feedback table
+
+Revision ID: e41a9d7c3b58
+Revises: 8b2f6c4d1e93
+Create Date: 2025-10-19 11:00:00.000000+00:00
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "e41a9d7c3b58"
+down_revision: Union[str, None] = "8b2f6c4d1e93"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "feedback",
+        sa.Column(
+            "id",
+            postgresql.UUID(),
+            server_default=sa.text("gen_random_uuid()"),
+            nullable=False,
+        ),
+        sa.Column("user_id", postgresql.UUID(), nullable=True),
+        sa.Column(
+            "feedback_type",
+            postgresql.ENUM(
+                "bug", "suggestion", "confusing", "other", name="feedbacktype"
+            ),
+            nullable=False,
+        ),
+        sa.Column("description", sa.Text(), nullable=False),
+        sa.Column(
+            "allow_follow_up", sa.Boolean(), server_default=sa.false(), nullable=False
+        ),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["user_id"], ["profiles.id"], ondelete="SET NULL"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("feedback")
+    op.execute("DROP TYPE IF EXISTS feedbacktype;")
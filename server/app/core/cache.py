@@ -0,0 +1,345 @@
+import asyncio
+import mmap
+import random
+import time
+import zlib
+from collections import OrderedDict
+from functools import cache
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import structlog
+
+from app.core.metrics import REGISTRY
+
+logger = structlog.get_logger()
+
+CACHE_ENTRIES = REGISTRY.gauge(
+    "cache_entries", "Entries held in the in-process tier.", ("cache",)
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "cache_lookups", "Cache lookups by where they were answered.", ("cache", "result")
+)
+CACHE_REMOVALS = REGISTRY.counter(
+    "cache_removals", "Entries dropped from the in-process tier.", ("cache", "reason")
+)
+
+
+class LRUCache:
+    """Bounded in-process LRU cache with a per-entry TTL.
+
+    ``None`` is never stored, so a ``None`` from ``get`` always means a miss.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (self._clock() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        return self._entries.pop(key, None) is not None
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SharedCacheBackend:
+    """Interface for a cache tier shared between workers, e.g. Redis."""
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+
+class InMemorySharedCache(SharedCacheBackend):
+    """Process-local stand-in for a shared backend, for tests and development."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._entries: Dict[str, Tuple[float, bytes]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        self._entries[key] = (self._clock() + ttl_seconds, value)
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+
+class InvalidationCounters:
+    """Per-key invalidation tokens, shared by every process forked after creation.
+
+    Keys hash into a fixed array of 64-bit slots held in an anonymous shared
+    mapping. Invalidating a key writes a fresh random token to its slot, so
+    a reader compares one integer to learn whether anything changed the key
+    since it cached it, whichever worker made the change. Keys that share a
+    slot only cost each other extra misses.
+    """
+
+    def __init__(self, slots: int = 65536):
+        self._slots = slots
+        self._map = mmap.mmap(-1, slots * 8)
+        self._tokens = memoryview(self._map).cast("Q")
+
+    def _slot(self, key: str) -> int:
+        return zlib.crc32(key.encode()) % self._slots
+
+    def token(self, key: str) -> int:
+        return self._tokens[self._slot(key)]
+
+    def bump(self, key: str) -> None:
+        # A fresh value rather than an increment, so concurrent bumps from
+        # two workers cannot land on the same token
+        self._tokens[self._slot(key)] = random.getrandbits(64)
+
+
+@cache
+def get_invalidation_counters() -> InvalidationCounters:
+    """Get the invalidation counters for this host's workers.
+
+    ``python -m app.server`` calls this before forking so every worker maps
+    the same counters; a single process just gets its own.
+    """
+    return InvalidationCounters()
+
+
+class TieredCache:
+    """Read-through cache with an in-process tier and an optional shared tier.
+
+    Writers call ``invalidate`` after committing, which bumps the key's
+    token in ``counters``. Local entries remember the token they were
+    loaded under and are dropped once it moves, so an invalidation in one
+    worker reaches every worker sharing the counters. A load only fills the
+    cache if the key's token did not move while it was reading, so a slow
+    reader cannot put back a row that a concurrent writer just replaced;
+    writes to other keys do not hold it up. Workers on other hosts see
+    invalidations through the shared tier only, and keep their local entry
+    until it expires.
+    """
+
+    def __init__(
+        self,
+        local: LRUCache,
+        shared: Optional[SharedCacheBackend] = None,
+        *,
+        namespace: str,
+        encode: Callable[[Any], bytes],
+        decode: Callable[[bytes], Any],
+        shared_ttl_seconds: float = 300,
+        counters: Optional[InvalidationCounters] = None,
+    ):
+        self.local = local
+        self.shared = shared
+        self.namespace = namespace
+        self.shared_ttl_seconds = shared_ttl_seconds
+        self.counters = counters or InvalidationCounters()
+        self._encode = encode
+        self._decode = decode
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get_or_load(
+        self, key: str, loader: Callable[[], Awaitable[Optional[Any]]]
+    ) -> Optional[Any]:
+        """Return the cached value for ``key``, calling ``loader`` on a miss."""
+        token = self.counters.token(self._shared_key(key))
+        entry = self.local.get(key)
+        if entry is not None:
+            if entry[0] == token:
+                self.local_hits += 1
+                return entry[1]
+            # Invalidated by another worker since it was cached
+            self.local.delete(key)
+
+        if self.shared is not None:
+            raw = await self._shared_call(self.shared.get(self._shared_key(key)))
+            if raw is not None:
+                self.shared_hits += 1
+                value = self._decode(raw)
+                if self._unchanged(key, token):
+                    self.local.set(key, (token, value))
+                return value
+
+        self.misses += 1
+        value = await loader()
+        if value is not None:
+            await self._store(key, token, value)
+        return value
+
+    async def get_many_or_load(
+        self,
+        keys: Sequence[str],
+        loader: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        """Return cached values for ``keys``, loading every miss with one ``loader`` call.
+
+        ``loader`` gets the missing keys and returns values by key, leaving
+        out keys that have none; so does the result.
+        """
+        tokens = {key: self.counters.token(self._shared_key(key)) for key in keys}
+        found: Dict[str, Any] = {}
+        missing = []
+        for key, token in tokens.items():
+            entry = self.local.get(key)
+            if entry is not None and entry[0] == token:
+                self.local_hits += 1
+                found[key] = entry[1]
+                continue
+            if entry is not None:
+                self.local.delete(key)
+            missing.append(key)
+
+        if self.shared is not None and missing:
+            raws = await asyncio.gather(
+                *(
+                    self._shared_call(self.shared.get(self._shared_key(key)))
+                    for key in missing
+                )
+            )
+            unshared = []
+            for key, raw in zip(missing, raws):
+                if raw is None:
+                    unshared.append(key)
+                    continue
+                self.shared_hits += 1
+                found[key] = self._decode(raw)
+                if self._unchanged(key, tokens[key]):
+                    self.local.set(key, (tokens[key], found[key]))
+            missing = unshared
+
+        if missing:
+            self.misses += len(missing)
+            loaded = await loader(missing)
+            for key in missing:
+                if loaded.get(key) is not None:
+                    found[key] = loaded[key]
+                    await self._store(key, tokens[key], loaded[key])
+        return found
+
+    async def invalidate(self, key: str) -> None:
+        """Drop ``key`` from both tiers and fence off in-flight loads."""
+        self.counters.bump(self._shared_key(key))
+        self.invalidations += 1
+        self.local.delete(key)
+        if self.shared is not None:
+            await self._shared_call(self.shared.delete(self._shared_key(key)))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.local_hits + self.shared_hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "entries": len(self.local),
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.local_hits + self.shared_hits) / lookups
+            if lookups
+            else 0.0,
+            "evictions": self.local.evictions,
+            "expirations": self.local.expirations,
+            "invalidations": self.invalidations,
+        }
+
+    async def _store(self, key: str, token: int, value: Any) -> None:
+        """Cache a loaded value unless ``key`` was invalidated since ``token``."""
+        if not self._unchanged(key, token):
+            return
+        self.local.set(key, (token, value))
+        if self.shared is not None:
+            await self._shared_call(
+                self.shared.set(
+                    self._shared_key(key), self._encode(value), self.shared_ttl_seconds
+                )
+            )
+            if not self._unchanged(key, token):
+                # Invalidated while the shared write was in flight
+                await self._shared_call(self.shared.delete(self._shared_key(key)))
+
+    def _unchanged(self, key: str, token: int) -> bool:
+        return self.counters.token(self._shared_key(key)) == token
+
+    def _shared_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def _shared_call(self, call: Awaitable[Any]) -> Any:
+        """Run a shared-tier call; an unavailable shared tier is treated as a miss."""
+        try:
+            return await call
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(
+                "Shared cache call failed", namespace=self.namespace, error=str(e)
+            )
+            return None
+
+
+def register_cache_metrics(cache: TieredCache) -> None:
+    """Publish a cache's counters on the metrics endpoint."""
+
+    def collect() -> None:
+        name = cache.namespace
+        CACHE_ENTRIES.labels(name).set(len(cache.local))
+        CACHE_LOOKUPS.labels(name, "local_hit").set(cache.local_hits)
+        CACHE_LOOKUPS.labels(name, "shared_hit").set(cache.shared_hits)
+        CACHE_LOOKUPS.labels(name, "miss").set(cache.misses)
+        CACHE_REMOVALS.labels(name, "eviction").set(cache.local.evictions)
+        CACHE_REMOVALS.labels(name, "expiration").set(cache.local.expirations)
+        CACHE_REMOVALS.labels(name, "invalidation").set(cache.invalidations)
+
+    REGISTRY.on_collect(collect)
@@ -0,0 +1,239 @@
+import asyncio
+import zlib
+from functools import cache
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, cast
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import get_settings
+from app.core.metrics import REGISTRY
+
+COMPRESSED_BYTES = REGISTRY.counter(
+    "compressed_response_bytes",
+    "Bytes of compressed responses before and after encoding.",
+    ("encoding", "stage"),
+)
+
+# Bodies at least this large are compressed in a worker thread; zlib, brotli
+# and zstd all release the GIL, so the event loop keeps serving meanwhile
+THREAD_MIN_BYTES = 64 * 1024
+
+# Already-compressed formats such as book files never match these
+COMPRESSIBLE_TYPES = (
+    b"application/json",
+    b"application/x-ndjson",
+    b"text/",
+)
+
+
+class Encoder:
+    """Incremental compressor for one response body."""
+
+    def compress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def finish(self) -> bytes:
+        raise NotImplementedError
+
+
+class GzipEncoder(Encoder):
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliEncoder(Encoder):
+    def __init__(self, quality: int):
+        import brotli
+
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return cast(bytes, self._compressor.process(data))
+
+    def finish(self) -> bytes:
+        return cast(bytes, self._compressor.finish())
+
+
+class ZstdEncoder(Encoder):
+    def __init__(self, level: int):
+        import zstandard
+
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return cast(bytes, self._compressor.compress(data))
+
+    def finish(self) -> bytes:
+        return cast(bytes, self._compressor.flush())
+
+
+def _importable(module: str) -> bool:
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+@cache
+def get_encoders() -> Dict[str, Callable[[], Encoder]]:
+    """Encoders this process can produce, in order of preference.
+
+    brotli and zstd are used when their packages are installed; gzip is
+    always available.
+    """
+    settings = get_settings()
+    encoders: Dict[str, Callable[[], Encoder]] = {}
+    if _importable("zstandard"):
+        encoders["zstd"] = lambda: ZstdEncoder(settings.COMPRESSION_ZSTD_LEVEL)
+    if _importable("brotli"):
+        encoders["br"] = lambda: BrotliEncoder(settings.COMPRESSION_BROTLI_QUALITY)
+    encoders["gzip"] = lambda: GzipEncoder(settings.COMPRESSION_GZIP_LEVEL)
+    return encoders
+
+
+def negotiate(accept_encoding: str, available: List[str]) -> Optional[str]:
+    """Pick the client's highest-q encoding, breaking ties by ``available`` order."""
+    offered: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        offered[name.strip().lower()] = q
+    wildcard = offered.get("*", 0.0)
+    best, best_q = None, 0.0
+    for name in available:
+        q = offered.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def _header(headers: Iterable[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class CompressionMiddleware:
+    """Compress JSON and text responses for clients that accept it.
+
+    The encoding is negotiated from Accept-Encoding. Whole bodies smaller
+    than ``COMPRESSION_MIN_BYTES`` are sent as they are; streamed bodies
+    are compressed as they go and not flushed per chunk, so small chunks
+    are coalesced on the wire. Responses that already carry a
+    Content-Encoding, a Content-Range or ``Cache-Control: no-transform``
+    are left alone.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        settings = get_settings()
+        self.enabled = settings.COMPRESSION_ENABLED
+        self.min_bytes = settings.COMPRESSION_MIN_BYTES
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = _header(scope["headers"], b"accept-encoding")
+        encoders = get_encoders()
+        encoding = accept_encoding and negotiate(
+            accept_encoding.decode("latin-1"), list(encoders)
+        )
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        encoder: Optional[Encoder] = None
+        raw_bytes = 0
+        sent_bytes = 0
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, encoder, raw_bytes, sent_bytes
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether to compress
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                if not self._should_compress(start_message, body, more_body):
+                    await send(start_message)
+                    start_message = None
+                    await send(message)
+                    return
+                encoder = encoders[encoding]()
+                await send(self._encoded_start(start_message, encoding))
+
+            raw_bytes += len(body)
+            chunk = await self._run(encoder.compress, body)
+            if not more_body:
+                chunk += encoder.finish()
+                COMPRESSED_BYTES.labels(encoding, "raw").inc(raw_bytes)
+                COMPRESSED_BYTES.labels(encoding, "encoded").inc(
+                    sent_bytes + len(chunk)
+                )
+            elif not chunk:
+                return
+            sent_bytes += len(chunk)
+            await send(
+                {"type": "http.response.body", "body": chunk, "more_body": more_body}
+            )
+
+        await self.app(scope, receive, send_compressed)
+
+    def _should_compress(
+        self, start_message: Message, body: bytes, more_body: bool
+    ) -> bool:
+        if not more_body and len(body) < self.min_bytes:
+            return False
+        headers = start_message.get("headers", ())
+        content_type = _header(headers, b"content-type") or b""
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return False
+        if _header(headers, b"content-encoding") or _header(headers, b"content-range"):
+            return False
+        return b"no-transform" not in (_header(headers, b"cache-control") or b"")
+
+    @staticmethod
+    def _encoded_start(start_message: Message, encoding: str) -> Message:
+        headers = []
+        vary = None
+        for key, value in start_message.get("headers", ()):
+            name = key.lower()
+            if name == b"content-length":
+                continue
+            if name == b"vary":
+                vary = value
+                continue
+            headers.append((key, value))
+        headers.append((b"content-encoding", encoding.encode()))
+        headers.append(
+            (b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding")
+        )
+        return {**start_message, "headers": headers}
+
+    @staticmethod
+    async def _run(compress: Callable[[bytes], bytes], body: bytes) -> bytes:
+        if len(body) >= THREAD_MIN_BYTES:
+            return await asyncio.to_thread(compress, body)
+        return compress(body)
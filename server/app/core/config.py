@@ -1,6 +1,6 @@
 from functools import cache
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 
 class Settings(BaseSettings):
     # Environment
@@ -15,6 +15,14 @@ class Settings(BaseSettings):
 
     # Database Configuration
     SUPABASE_DB_CONNECTION: str
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # Connections opened at startup so the first requests skip the handshake
+    DB_POOL_WARMUP_CONNECTIONS: int = 2
+    # Connections all workers of ``python -m app.server`` may hold together;
+    # each worker's pool is sized to its share. Keep it below Postgres
+    # max_connections less what other clients need
+    DB_CONNECTION_BUDGET: int = 40
 
     # API Configuration
     API_V1_STR: str = "/api/v1"
@@ -22,6 +30,95 @@ class Settings(BaseSettings):
     # CORS Configuration
     CORS_ORIGINS: List[str] = ["http://localhost:8042"]
 
+    # Book metadata cache
+    BOOK_CACHE_MAX_ENTRIES: int = 2048
+    BOOK_CACHE_TTL_SECONDS: float = 300
+    # "none" or "memory"; a networked backend plugs in via SharedCacheBackend
+    BOOK_CACHE_SHARED_BACKEND: str = "none"
+
+    # Chapter and page offset tables for position lookups, built once per
+    # book version
+    POSITION_MAP_CACHE_MAX_ENTRIES: int = 4096
+
+    # Bulk highlight import
+    IMPORT_MAX_BYTES: int = 200 * 1024 * 1024
+
+    # Feedback write-behind queue
+    FEEDBACK_QUEUE_MAX_SIZE: int = 10000
+    FEEDBACK_FLUSH_BATCH_SIZE: int = 500
+    FEEDBACK_FLUSH_INTERVAL_SECONDS: float = 1.0
+    FEEDBACK_SPILL_PATH: str = "feedback-spill.ndjson"
+
+    # Records buffered for the log writer thread; further records are dropped
+    LOG_QUEUE_SIZE: int = 10000
+
+    # Fraction of requests written to the access log; failed and slow
+    # requests are always logged
+    ACCESS_LOG_SAMPLE_RATE: float = 0.01
+    ACCESS_LOG_SLOW_MS: float = 1000
+
+    # Request profiling; off unless a token or a sample rate is set. Send
+    # "X-Profile: 1" with "X-Profile-Token" to profile a single request
+    PROFILE_TOKEN: str = ""
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_INTERVAL_MS: float = 5
+    PROFILE_STORE_MAX_ENTRIES: int = 50
+
+    # Statements at or above this duration are logged with their route
+    SLOW_QUERY_THRESHOLD_MS: float = 200
+
+    # Per-user token buckets by route, as "<requests>/<second|minute|hour>,<burst>";
+    # an empty spec turns a route's limit off
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMITS: Dict[str, str] = {
+        "book_progress": "2/second,30",
+        "highlight_create": "5/second,60",
+        "upload": "20/hour,10",
+    }
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    # "none" or "memory"; a networked backend plugs in via SharedRateLimitBackend
+    RATE_LIMIT_SHARED_BACKEND: str = "none"
+
+    # Response compression for JSON and text bodies; brotli and zstd are
+    # offered only when their packages are installed
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_BYTES: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 5
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+
+    # Readiness probe; results are reused for the TTL so probe storms do
+    # not reach Postgres. Degraded means storage is down or the pool is full
+    HEALTH_CACHE_TTL_SECONDS: float = 2.0
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = 1.0
+    READINESS_FAIL_ON_DEGRADED: bool = False
+
+    # Production launcher (python -m app.server); 0 workers means one per CPU
+    WEB_CONCURRENCY: int = 0
+    # Workers are replaced after this many requests, plus up to the jitter so
+    # they do not all restart at once; 0 disables recycling
+    WORKER_MAX_REQUESTS: int = 10000
+    WORKER_MAX_REQUESTS_JITTER: int = 1000
+    GRACEFUL_SHUTDOWN_SECONDS: int = 30
+
+    # Semantic search over books with rag_enabled. Indexes are local files,
+    # rebuilt by a background pass when a book changes; one process on a
+    # host indexes at a time and every worker reads the results
+    RAG_INDEXING_ENABLED: bool = True
+    RAG_INDEX_DIR: str = "rag-index"
+    RAG_INDEX_INTERVAL_SECONDS: float = 60
+    # "hashing" is built in; a CPU model plugs in via Embedder
+    RAG_EMBEDDER: str = "hashing"
+    RAG_EMBEDDING_DIMENSIONS: int = 256
+    RAG_EMBED_BATCH_SIZE: int = 64
+    RAG_CHUNK_WORDS: int = 120
+    RAG_CHUNK_OVERLAP_WORDS: int = 20
+    # Passages rescored with full-precision vectors after every passage of
+    # the searched books is scored on quantized ones
+    RAG_SEARCH_CANDIDATES: int = 50
+    # Book indexes kept mapped; each holds one file descriptor
+    RAG_OPEN_INDEXES: int = 2048
+
     # Other Configuration
     DEBUG: bool = False
 
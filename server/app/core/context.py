@@ -0,0 +1,66 @@
+import uuid
+from contextvars import ContextVar
+from typing import Optional
+
+import structlog
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+REQUEST_ID_HEADER = "x-request-id"
+
+# ASGI scope of the request being handled; FastAPI adds the matched route to
+# it during routing, so readers see the route template once it is known
+request_scope: ContextVar[Optional[Scope]] = ContextVar("request_scope", default=None)
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+def current_route() -> Optional[str]:
+    """Get "METHOD /route/{template}" for the current request, if any."""
+    scope = request_scope.get()
+    if scope is None:
+        return None
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("path")
+    return f"{scope.get('method')} {path}"
+
+
+def _incoming_request_id(scope: Scope) -> Optional[str]:
+    for name, value in scope.get("headers", ()):
+        if name == REQUEST_ID_HEADER.encode():
+            # Caller-supplied IDs end up in logs, so keep them short
+            return value.decode("latin-1")[:128] or None
+    return None
+
+
+class RequestContextMiddleware:
+    """Expose the current request to code that has no ``Request`` handle.
+
+    Takes the request ID from ``X-Request-ID`` or generates one, binds it to
+    structlog's contextvars so every log line of the request carries it, and
+    echoes it on the response.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rid = _incoming_request_id(scope) or uuid.uuid4().hex
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                headers.append((REQUEST_ID_HEADER.encode(), rid.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        scope_token = request_scope.set(scope)
+        id_token = request_id.set(rid)
+        try:
+            with structlog.contextvars.bound_contextvars(request_id=rid):
+                await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id.reset(id_token)
+            request_scope.reset(scope_token)
@@ -1,16 +1,70 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.orm import declarative_base
+import asyncio
+from functools import cache
 from typing import AsyncGenerator
-from app.core.config import get_settings
 
-settings = get_settings()
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import declarative_base
+
+from app.core.config import get_settings
+from app.db.instrumentation import InstrumentedAsyncPool, instrument_engine
 
-# Convert postgresql:// to postgresql+asyncpg:// for async support
-DATABASE_URL = settings.SUPABASE_DB_CONNECTION.replace("postgresql://", "postgresql+asyncpg://")
-engine = create_async_engine(DATABASE_URL, echo=True)
-async_session = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 Base = declarative_base()
 
+
+@cache
+def get_engine() -> AsyncEngine:
+    """Get the process-wide engine, created on first use."""
+    settings = get_settings()
+    # Convert postgresql:// to postgresql+asyncpg:// for async support
+    engine = create_async_engine(
+        settings.SUPABASE_DB_CONNECTION.replace("postgresql://", "postgresql+asyncpg://"),
+        echo=settings.ENVIRONMENT == "development",
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        # Idle pooled connections can be closed server-side; check before use
+        pool_pre_ping=True,
+        poolclass=InstrumentedAsyncPool,
+        pool_logging_name="core",
+    )
+    instrument_engine(engine, "core")
+    return engine
+
+
+@cache
+def get_sessionmaker() -> async_sessionmaker:
+    return async_sessionmaker(get_engine(), expire_on_commit=False, class_=AsyncSession)
+
+
+def async_session() -> AsyncSession:
+    """Open a session on the process-wide engine."""
+    return get_sessionmaker()()
+
+
+async def warm_pool(connections: int) -> None:
+    """Open ``connections`` pooled connections so early requests skip the handshake.
+
+    Checkouts run concurrently so each one gets its own connection; they
+    all go back to the pool afterwards.
+    """
+
+    async def checkout() -> None:
+        async with get_engine().connect() as conn:
+            await conn.exec_driver_sql("SELECT 1")
+
+    await asyncio.gather(*(checkout() for _ in range(connections)))
+
+
+async def dispose_engine() -> None:
+    """Close pooled connections, if the engine was ever created."""
+    if get_engine.cache_info().currsize:
+        await get_engine().dispose()
+
+
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
-        yield session 
\ No newline at end of file
+        yield session
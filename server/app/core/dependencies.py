@@ -1,10 +1,10 @@
 import uuid
-from typing import Annotated
+from typing import Annotated, Any
 
 from fastapi import Depends, Request
-from supabase import Client
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core import config, context
 from app.core.config import get_settings
 from app.db.session import get_db
 from app.repositories.books import BookRepository
@@ -13,9 +13,10 @@ from app.repositories.supabase import SupabaseStorageClient, get_supabase_client
 from app.schemas.auth import TokenData
 from app.services.auth import get_current_user
 
-Settings = Annotated[type(get_settings()), Depends(get_settings)]
+Settings = Annotated[config.Settings, Depends(get_settings)]
 CurrentUser = Annotated[TokenData, Depends(get_current_user)]
-SupabaseClient = Annotated[Client, Depends(get_supabase_client)]
+# Typed loosely so that importing this module does not import supabase
+SupabaseClient = Annotated[Any, Depends(get_supabase_client)]
 StorageClient = Annotated[SupabaseStorageClient, Depends(get_supabase_client)]
 DatabaseSession = Annotated[AsyncSession, Depends(get_db)]
 
@@ -35,7 +36,7 @@ HighlightRepo = Annotated[HighlightRepository, Depends(get_highlight_repository)
 
 
 async def get_request_id(request: Request) -> str:
-    """Get request ID from state or generate new one."""
+    """Get the ID bound by RequestContextMiddleware, or generate a new one."""
     if not hasattr(request.state, "request_id"):
-        request.state.request_id = str(uuid.uuid4())
+        request.state.request_id = context.request_id.get() or str(uuid.uuid4())
     return request.state.request_id
@@ -0,0 +1,223 @@
+import asyncio
+import hmac
+import random
+import sys
+import threading
+import time
+import types
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from functools import cache
+from typing import Any, Dict, List, Optional
+
+import structlog
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core import context
+from app.core.config import get_settings
+
+logger = structlog.get_logger()
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_TOKEN_HEADER = b"x-profile-token"
+AWAIT_FRAME = "<await>"
+
+
+def _frame_label(frame: types.FrameType) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{module}:{name}"
+
+
+def _coroutine_frames(coro: Any) -> List[types.FrameType]:
+    """Frames of a suspended coroutine chain, outermost first."""
+    frames = []
+    while coro is not None:
+        frame = (
+            getattr(coro, "cr_frame", None)
+            or getattr(coro, "gi_frame", None)
+            or getattr(coro, "ag_frame", None)
+        )
+        if frame is not None:
+            frames.append(frame)
+        coro = (
+            getattr(coro, "cr_await", None)
+            or getattr(coro, "gi_yieldfrom", None)
+            or getattr(coro, "ag_await", None)
+        )
+    return frames
+
+
+class TaskSampler:
+    """Wall-clock sampling profiler for one asyncio task.
+
+    A helper thread wakes every ``interval`` seconds. If the task is running
+    on the loop it records the loop thread's stack above the task's
+    coroutine; otherwise it records where the task is suspended, ending in
+    an ``<await>`` frame, so time spent waiting on Postgres or storage shows
+    up next to CPU time. Other requests sharing the loop are not sampled.
+    Stacks are counted in the folded format read by flamegraph.pl and
+    speedscope.
+    """
+
+    def __init__(self, task: "asyncio.Task[Any]", interval: float):
+        self.task = task
+        self.loop = task.get_loop()
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks: "Counter[str]" = Counter()
+        coro = task.get_coro()
+        if not isinstance(coro, types.CoroutineType):
+            raise TypeError("Only tasks running a native coroutine can be sampled")
+        self._root_code = coro.cr_code
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="request-profiler", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self._sample()
+            except Exception:
+                # The loop can swap frames under us; drop the sample
+                continue
+
+    def _sample(self) -> None:
+        if asyncio.current_task(self.loop) is self.task:
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                frames.append(frame)
+                if frame.f_code is self._root_code:
+                    break
+                frame = frame.f_back
+            labels = [_frame_label(f) for f in reversed(frames)]
+        else:
+            labels = [_frame_label(f) for f in _coroutine_frames(self.task.get_coro())]
+            labels.append(AWAIT_FRAME)
+        if labels:
+            self.stacks[";".join(labels)] += 1
+
+
+class ProfileStore:
+    """Most recent request profiles, keyed by request ID."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def add(self, request_id: str, profile: Dict[str, Any]) -> None:
+        self._profiles[request_id] = profile
+        self._profiles.move_to_end(request_id)
+        while len(self._profiles) > self.max_entries:
+            self._profiles.popitem(last=False)
+
+    def get(self, request_id: str) -> Optional[Dict[str, Any]]:
+        return self._profiles.get(request_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [
+            {k: v for k, v in profile.items() if k != "folded"}
+            for profile in reversed(self._profiles.values())
+        ]
+
+
+@cache
+def get_profile_store() -> ProfileStore:
+    return ProfileStore(get_settings().PROFILE_STORE_MAX_ENTRIES)
+
+
+def profiling_enabled() -> bool:
+    settings = get_settings()
+    return settings.PROFILE_SAMPLE_RATE > 0 or bool(settings.PROFILE_TOKEN)
+
+
+def valid_profile_token(token: Optional[str]) -> bool:
+    expected = get_settings().PROFILE_TOKEN
+    if not expected or not token:
+        return False
+    return hmac.compare_digest(token, expected)
+
+
+def _header(scope: Scope, name: bytes) -> Optional[str]:
+    key: bytes
+    value: bytes
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class ProfilingMiddleware:
+    """Profile selected requests and keep the result for later download.
+
+    A request is profiled when it sends ``X-Profile: 1`` with a valid
+    ``X-Profile-Token``, or when it is picked by PROFILE_SAMPLE_RATE. At most
+    one request is profiled at a time. The app only installs this middleware
+    when profiling is configured, so it costs nothing otherwise.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        settings = get_settings()
+        self.sample_rate = settings.PROFILE_SAMPLE_RATE
+        self.interval = settings.PROFILE_INTERVAL_MS / 1000
+        self.store = get_profile_store()
+        self._active = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self._active or not self._selected(scope):
+            await self.app(scope, receive, send)
+            return
+
+        task = asyncio.current_task()
+        # ASGI servers always call the app from inside a task
+        assert task is not None
+        self._active = True
+        sampler = TaskSampler(task, self.interval)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            sampler.stop()
+            self._active = False
+            self._save(scope, sampler, time.perf_counter() - start)
+
+    def _selected(self, scope: Scope) -> bool:
+        if _header(scope, PROFILE_HEADER) == "1":
+            return valid_profile_token(_header(scope, PROFILE_TOKEN_HEADER))
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _save(self, scope: Scope, sampler: TaskSampler, elapsed: float) -> None:
+        request_id = context.request_id.get()
+        if request_id is None:
+            return
+        self.store.add(
+            request_id,
+            {
+                "request_id": request_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(scope.get("route"), "path", None),
+                "duration_ms": round(elapsed * 1000, 1),
+                "samples": sum(sampler.stacks.values()),
+                "created_at": datetime.now(timezone.utc),
+                "folded": sampler.folded(),
+            },
+        )
+        logger.info("Request profiled", duration_ms=round(elapsed * 1000, 1))
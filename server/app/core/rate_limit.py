@@ -0,0 +1,246 @@
+import asyncio
+import math
+import time
+from functools import cache
+from typing import Callable, Dict, Hashable, NamedTuple, Optional
+
+import structlog
+from fastapi import Depends, HTTPException, Request, status
+
+from app.core.cache import LRUCache
+from app.core.config import get_settings
+from app.core.metrics import REGISTRY
+from app.schemas.auth import TokenData
+from app.services.auth import get_current_user
+
+logger = structlog.get_logger()
+
+RATE_LIMIT_REJECTIONS = REGISTRY.counter(
+    "rate_limit_rejections", "Requests rejected by a rate limit.", ("route",)
+)
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+# Where the dependency leaves an allowed request's decision for the middleware
+SCOPE_KEY = "rate_limit"
+
+
+class RateLimit(NamedTuple):
+    """Bucket refill rate in tokens per second, and its capacity."""
+
+    rate: float
+    burst: int
+
+
+def parse_rate_limit(spec: str) -> RateLimit:
+    """Parse ``"<requests>/<second|minute|hour>,<burst>"``, e.g. ``"2/second,30"``."""
+    try:
+        rate_part, burst = spec.split(",")
+        requests, period = rate_part.split("/")
+        return RateLimit(float(requests) / _PERIODS[period.strip()], int(burst))
+    except (KeyError, ValueError):
+        raise ValueError(f"Invalid rate limit: {spec!r}")
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    limit: RateLimit
+    tokens: float
+
+    def headers(self) -> Dict[str, str]:
+        """RateLimit-* headers as in the IETF ratelimit-headers draft."""
+        headers = {
+            "RateLimit-Limit": str(self.limit.burst),
+            "RateLimit-Remaining": str(int(self.tokens)),
+            # Seconds until the bucket is full again
+            "RateLimit-Reset": str(
+                math.ceil((self.limit.burst - self.tokens) / self.limit.rate)
+            ),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(math.ceil((1 - self.tokens) / self.limit.rate))
+        return headers
+
+
+class TokenBuckets:
+    """In-process token buckets for one limit, keyed by caller.
+
+    A bucket left alone for ``burst / rate`` seconds would be full again, so
+    the LRU's TTL drops it instead of keeping it around. ``max_keys`` bounds
+    memory; a caller evicted by it starts over with a full bucket.
+    """
+
+    def __init__(
+        self,
+        limit: RateLimit,
+        max_keys: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.limit = limit
+        self._clock = clock
+        self._buckets = LRUCache(max_keys, limit.burst / limit.rate, clock)
+
+    def take(self, key: Hashable) -> Decision:
+        now = self._clock()
+        rate, burst = self.limit
+        entry = self._buckets.get(key)
+        tokens = (
+            burst if entry is None else min(burst, entry[0] + (now - entry[1]) * rate)
+        )
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets.set(key, (tokens, now))
+        return Decision(allowed, self.limit, tokens)
+
+
+class SharedRateLimitBackend:
+    """Interface for token buckets shared between workers, e.g. a Redis script."""
+
+    async def take(self, key: str, limit: RateLimit) -> Decision:
+        raise NotImplementedError
+
+
+class InMemorySharedRateLimit(SharedRateLimitBackend):
+    """Process-local stand-in for a shared backend, for tests and development."""
+
+    def __init__(
+        self, max_keys: int = 100_000, clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: Dict[RateLimit, TokenBuckets] = {}
+
+    async def take(self, key: str, limit: RateLimit) -> Decision:
+        buckets = self._buckets.get(limit)
+        if buckets is None:
+            buckets = self._buckets[limit] = TokenBuckets(
+                limit, self.max_keys, self._clock
+            )
+        return buckets.take(key)
+
+
+class RateLimiter:
+    """Per-user token buckets for the routes named in ``limits``.
+
+    Without a shared backend each worker process keeps its own buckets, so
+    a user gets up to the worker count times the configured rate. With one,
+    all workers draw from the same bucket; if it fails, the process falls
+    back to its own buckets rather than rejecting or waving through
+    everything.
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, RateLimit],
+        max_keys: int,
+        shared: Optional[SharedRateLimitBackend] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.shared = shared
+        self._local = {
+            route: TokenBuckets(limit, max_keys, clock)
+            for route, limit in limits.items()
+        }
+
+    async def hit(self, route: str, user_id: str) -> Optional[Decision]:
+        """Take a token from the user's bucket for ``route``; None if it is not limited."""
+        local = self._local.get(route)
+        if local is None:
+            return None
+        if self.shared is not None:
+            try:
+                return await self.shared.take(
+                    f"ratelimit:{route}:{user_id}", local.limit
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(
+                    "Shared rate limit call failed", route=route, error=str(e)
+                )
+        return local.take(user_id)
+
+
+def _build_shared_backend(name: str) -> Optional[SharedRateLimitBackend]:
+    if name == "none":
+        return None
+    if name == "memory":
+        return InMemorySharedRateLimit()
+    raise ValueError(f"Unknown RATE_LIMIT_SHARED_BACKEND: {name}")
+
+
+@cache
+def get_rate_limiter() -> RateLimiter:
+    """Get the process-wide rate limiter."""
+    settings = get_settings()
+    limits = (
+        {
+            route: parse_rate_limit(spec)
+            for route, spec in settings.RATE_LIMITS.items()
+            if spec
+        }
+        if settings.RATE_LIMIT_ENABLED
+        else {}
+    )
+    return RateLimiter(
+        limits,
+        settings.RATE_LIMIT_MAX_KEYS,
+        _build_shared_backend(settings.RATE_LIMIT_SHARED_BACKEND),
+    )
+
+
+def rate_limited(route: str):
+    """Dependency that authenticates the caller and charges their ``route`` bucket.
+
+    Use it in place of ``CurrentUser``. It runs after ``get_current_user``,
+    so only authenticated requests are counted and each user has their own
+    bucket. Rejected requests get a 429 before any query runs; for allowed
+    ones the decision is left on the scope for ``RateLimitHeadersMiddleware``.
+    """
+
+    async def dependency(
+        request: Request, user: TokenData = Depends(get_current_user)
+    ) -> TokenData:
+        decision = await get_rate_limiter().hit(route, user.sub)
+        if decision is None:
+            return user
+        if not decision.allowed:
+            RATE_LIMIT_REJECTIONS.labels(route).inc()
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded",
+                headers=decision.headers(),
+            )
+        request.scope[SCOPE_KEY] = decision
+        return user
+
+    return dependency
+
+
+class RateLimitHeadersMiddleware:
+    """Add RateLimit-* headers to responses of rate-limited requests.
+
+    Headers set by a dependency on FastAPI's ``Response`` are lost when the
+    endpoint raises or returns its own response, so they are added here
+    instead, for errors and streamed responses alike.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def send_with_headers(message):
+            decision = scope.get(SCOPE_KEY)
+            if message["type"] == "http.response.start" and decision is not None:
+                headers = list(message.get("headers", ()))
+                headers.extend(
+                    (name.lower().encode(), value.encode())
+                    for name, value in decision.headers().items()
+                )
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,137 @@
+import hashlib
+import re
+import time
+from functools import lru_cache
+from typing import Tuple
+
+import structlog
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.config import get_settings
+from app.core.context import current_route
+from app.core.metrics import REGISTRY
+
+logger = structlog.get_logger()
+
+QUERY_SECONDS = REGISTRY.histogram(
+    "db_query_duration_seconds",
+    "Statement execution time by normalized statement fingerprint.",
+    ("engine", "fingerprint", "statement"),
+)
+SLOW_QUERIES = REGISTRY.counter(
+    "db_slow_queries",
+    "Statements slower than SLOW_QUERY_THRESHOLD_MS.",
+    ("engine", "fingerprint"),
+)
+CHECKOUT_WAIT_SECONDS = REGISTRY.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection.",
+    ("engine",),
+)
+CHECKOUT_TIMEOUTS = REGISTRY.counter(
+    "db_pool_checkout_timeouts",
+    "Pool checkouts that gave up waiting for a connection.",
+    ("engine",),
+)
+POOL_SIZE = REGISTRY.gauge("db_pool_size", "Configured pool size.", ("engine",))
+POOL_CHECKED_OUT = REGISTRY.gauge(
+    "db_pool_checked_out", "Connections currently in use.", ("engine",)
+)
+POOL_OVERFLOW = REGISTRY.gauge(
+    "db_pool_overflow",
+    "Connections opened beyond pool_size; negative while the pool is not full.",
+    ("engine",),
+)
+
+# Label text is kept short; the fingerprint identifies the full statement
+STATEMENT_LABEL_CHARS = 120
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<!:):\w+\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_LIST = re.compile(r"(VALUES\s*\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(statement: str) -> Tuple[str, str]:
+    """Normalize a statement and return ``(fingerprint, normalized_text)``.
+
+    Literals and bind parameters become ``?`` and lists of them collapse, so
+    the same query with different arguments or batch sizes shares one key.
+    """
+    normalized = _WHITESPACE.sub(" ", statement).strip()
+    normalized = _STRING.sub("?", normalized)
+    normalized = _PARAM.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _IN_LIST.sub("(...)", normalized)
+    normalized = _VALUES_LIST.sub(r"\1", normalized)
+    digest = hashlib.sha1(normalized.encode()).hexdigest()[:12]
+    return digest, normalized
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """Async queue pool that records how long checkouts wait.
+
+    Metrics are labelled with the engine's ``pool_logging_name``, which
+    survives the pool being recreated on dispose.
+    """
+
+    def _do_get(self):
+        name = getattr(self, "logging_name", None) or "default"
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            CHECKOUT_TIMEOUTS.labels(name).inc()
+            raise
+        finally:
+            CHECKOUT_WAIT_SECONDS.labels(name).observe(time.perf_counter() - start)
+
+
+def instrument_engine(engine: AsyncEngine, name: str) -> None:
+    """Record statement latency, slow queries and pool usage for an engine."""
+    sync_engine = engine.sync_engine
+    threshold = get_settings().SLOW_QUERY_THRESHOLD_MS / 1000
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        key, normalized = fingerprint(statement)
+        QUERY_SECONDS.labels(name, key, normalized[:STATEMENT_LABEL_CHARS]).observe(
+            elapsed
+        )
+        if elapsed >= threshold:
+            SLOW_QUERIES.labels(name, key).inc()
+            logger.warning(
+                "Slow query",
+                engine=name,
+                fingerprint=key,
+                duration_ms=round(elapsed * 1000, 1),
+                route=current_route(),
+                statement=normalized,
+            )
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+    def collect_pool_stats() -> None:
+        pool = sync_engine.pool
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            POOL_SIZE.labels(name).set(pool.size())
+            POOL_CHECKED_OUT.labels(name).set(pool.checkedout())
+            POOL_OVERFLOW.labels(name).set(pool.overflow())
+
+    REGISTRY.on_collect(collect_pool_stats)
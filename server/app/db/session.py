@@ -1,40 +1,28 @@
+from functools import cache
 from typing import AsyncGenerator
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from app.core.config import get_settings
+from app.core.database import get_engine
 
-settings = get_settings()
 
-# Create async engine with Supabase PostgreSQL URL
-engine = create_async_engine(
-    settings.SUPABASE_DB_CONNECTION.replace("postgresql://", "postgresql+asyncpg://"),
-    echo=settings.ENVIRONMENT == "development",
-    future=True,
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
-)
-
-# Create async session factory
-AsyncSessionLocal = sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False,
-)
+@cache
+def get_sessionmaker() -> async_sessionmaker:
+    """Sessions for request dependencies; unlike the core ones they never autoflush."""
+    return async_sessionmaker(
+        get_engine(), expire_on_commit=False, autoflush=False, class_=AsyncSession
+    )
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    """Get database session."""
-    async with AsyncSessionLocal() as session:
+    """Get a database session that commits when the request succeeds.
+
+    Sessions come from the shared engine in ``app.core.database``.
+    """
+    async with get_sessionmaker()() as session:
         try:
             yield session
             await session.commit()
         except Exception:
             await session.rollback()
             raise
-        finally:
-            await session.close()
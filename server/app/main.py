@@ -1,22 +1,150 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import structlog
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+
 from app.core.config import get_settings
-from app.routers import books, feedback, highlights
+from app.utils.logging_config import setup_logging
+
+logger = structlog.get_logger()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open connections and start background work before serving requests.
+
+    The pool warm-up and the storage client's import and construction
+    overlap, since one waits on the network and the other on the CPU.
+    Failures are logged rather than raised, so a database that is briefly
+    unreachable does not stop the process from starting.
+    """
+    from app.core.database import dispose_engine, warm_pool
+    from app.repositories.books import get_book_cache
+    from app.repositories.supabase import get_supabase_client
+    from app.services.feedback_queue import get_feedback_queue
+    from app.services.rag_indexer import get_rag_indexer
+
+    settings = get_settings()
+    get_book_cache()
+    feedback_queue = get_feedback_queue()
+    feedback_queue.start()
+    rag_indexer = get_rag_indexer() if settings.RAG_INDEXING_ENABLED else None
+    if rag_indexer is not None:
+        rag_indexer.start()
+
+    results = await asyncio.gather(
+        warm_pool(settings.DB_POOL_WARMUP_CONNECTIONS),
+        asyncio.to_thread(get_supabase_client),
+        return_exceptions=True,
+    )
+    for component, result in zip(("database pool", "storage client"), results):
+        if isinstance(result, Exception):
+            logger.warning(
+                "Startup warm-up failed", component=component, error=str(result)
+            )
+
+    yield
+
+    if rag_indexer is not None:
+        await rag_indexer.stop()
+    await feedback_queue.stop()
+    await dispose_engine()
+
+
+def preload() -> None:
+    """Import the modules ``create_app`` uses without building anything.
+
+    Lets a pre-forking launcher pay the import cost once, before fork;
+    these imports open no connections and start no threads.
+    """
+    import app.core.compression  # noqa: F401
+    import app.core.context  # noqa: F401
+    import app.core.database  # noqa: F401
+    import app.core.profiling  # noqa: F401
+    import app.core.rate_limit  # noqa: F401
+    import app.middleware  # noqa: F401
+    import app.routers.books  # noqa: F401
+    import app.routers.debug  # noqa: F401
+    import app.routers.feedback  # noqa: F401
+    import app.routers.health  # noqa: F401
+    import app.routers.highlights  # noqa: F401
+    import app.routers.metrics  # noqa: F401
+    import app.routers.search  # noqa: F401
+    import app.routers.sync  # noqa: F401
+    import app.routers.upload  # noqa: F401
+    import app.services.feedback_queue  # noqa: F401
+    import app.services.rag_indexer  # noqa: F401
+
+
+def create_app() -> FastAPI:
+    """Build the API application.
+
+    Routers and the modules behind them are imported here rather than at
+    the top of this module, so importing ``app.main`` stays cheap.
+    """
+    from app.core.compression import CompressionMiddleware
+    from app.core.context import RequestContextMiddleware
+    from app.core.profiling import ProfilingMiddleware, profiling_enabled
+    from app.core.rate_limit import RateLimitHeadersMiddleware
+    from app.middleware import AccessLogMiddleware
+    from app.routers import (
+        books,
+        debug,
+        feedback,
+        health,
+        highlights,
+        metrics,
+        search,
+        sync,
+        upload,
+    )
+
+    setup_logging()
+    settings = get_settings()
+
+    app = FastAPI(
+        title="ReadSpace API",
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan,
+    )
 
-app = FastAPI(title="ReadSpace API")
+    # Configure CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.add_middleware(RateLimitHeadersMiddleware)
+    app.add_middleware(CompressionMiddleware)
+    # Added last so it wraps the access log and every log line has a request ID
+    app.add_middleware(AccessLogMiddleware)
+    if profiling_enabled():
+        app.add_middleware(ProfilingMiddleware)
+    app.add_middleware(RequestContextMiddleware)
 
-settings = get_settings()
+    # Include routers
+    app.include_router(books.router, prefix=settings.API_V1_STR)
+    app.include_router(feedback.router, prefix=settings.API_V1_STR)
+    app.include_router(highlights.router, prefix=settings.API_V1_STR)
+    app.include_router(search.router, prefix=settings.API_V1_STR)
+    app.include_router(sync.router, prefix=settings.API_V1_STR)
+    app.include_router(
+        upload.router, prefix=f"{settings.API_V1_STR}/upload", tags=["upload"]
+    )
+    app.include_router(metrics.router)
+    app.include_router(health.router)
+    app.include_router(debug.router, prefix=settings.API_V1_STR)
+    return app
 
-# Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.CORS_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-# Include routers
-app.include_router(books.router, prefix=settings.API_V1_STR)
-app.include_router(feedback.router, prefix=settings.API_V1_STR)
-app.include_router(highlights.router, prefix=settings.API_V1_STR)
+def __getattr__(name: str):
+    # Keeps ``uvicorn app.main:app`` working; the app is built on first access
+    if name == "app":
+        app = globals()["app"] = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,16 +1,100 @@
+import random
 import time
-import uuid
-from typing import Callable, List, Optional
+from typing import Awaitable, Callable, List, Optional
 
 import structlog
 from fastapi import FastAPI, Request, Response, status
 from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from app.schemas.settings import Settings
+from app.core.config import get_settings
+from app.core.metrics import REGISTRY
 from app.services.auth import get_optional_user
 
 logger = structlog.get_logger()
-settings = Settings()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template; use histogram_quantile for p50/p95/p99.",
+    ("method", "route", "status"),
+)
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight", "Requests currently being handled.", ("method",)
+)
+
+
+class AccessLogMiddleware:
+    """Record request latency and write sampled access logs.
+
+    Every request is timed into a per-route histogram. Only a fraction of
+    requests, set by ACCESS_LOG_SAMPLE_RATE, get an access log line; server
+    errors and requests slower than ACCESS_LOG_SLOW_MS are always logged.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        settings = get_settings()
+        self.sample_rate = settings.ACCESS_LOG_SAMPLE_RATE
+        self.slow_seconds = settings.ACCESS_LOG_SLOW_MS / 1000
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        start = time.perf_counter()
+        error: Optional[Exception] = None
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            in_flight.inc(-1)
+            # Unmatched paths share one label so scanners cannot blow up cardinality
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            REQUEST_SECONDS.labels(method, route, status_code).observe(elapsed)
+            self._log(scope, route, status_code, elapsed, error)
+
+    def _log(
+        self,
+        scope: Scope,
+        route: str,
+        status_code: int,
+        elapsed: float,
+        error: Optional[Exception],
+    ) -> None:
+        failed = error is not None or status_code >= 500
+        slow = elapsed >= self.slow_seconds
+        if not (failed or slow or random.random() < self.sample_rate):
+            return
+        fields = dict(
+            method=scope["method"],
+            path=scope["path"],
+            route=route,
+            status_code=status_code,
+            duration_ms=round(elapsed * 1000, 1),
+            client_host=scope["client"][0] if scope.get("client") else None,
+            sampled=not (failed or slow),
+        )
+        if error is not None:
+            logger.error("Request failed", error=str(error), exc_info=error, **fields)
+        elif failed or slow:
+            logger.warning("Request completed", **fields)
+        else:
+            logger.info("Request completed", **fields)
 
 
 def create_error_response(
@@ -31,7 +115,7 @@ def create_error_response(
     return response
 
 
-def setup_middleware(app: FastAPI, public_paths: Optional[List[str]] = None):
+def setup_middleware(app: FastAPI, public_paths: Optional[List[str]] = None) -> None:
     """
     Setup all middleware for FastAPI application.
 
@@ -43,44 +127,9 @@ def setup_middleware(app: FastAPI, public_paths: Optional[List[str]] = None):
         public_paths = []
 
     @app.middleware("http")
-    async def request_logging_middleware(
-        request: Request, call_next: Callable
+    async def auth_middleware(
+        request: Request, call_next: Callable[[Request], Awaitable[Response]]
     ) -> Response:
-        """Log all incoming requests and their processing time."""
-        request_id = str(uuid.uuid4())
-        start_time = time.time()
-
-        logger.info(
-            "Request started",
-            request_id=request_id,
-            method=request.method,
-            path=request.url.path,
-            client_host=request.client.host if request.client else None,
-        )
-
-        try:
-            response = await call_next(request)
-            process_time = time.time() - start_time
-            logger.info(
-                "Request completed",
-                request_id=request_id,
-                status_code=response.status_code,
-                process_time=process_time,
-            )
-            return response
-        except Exception as e:
-            process_time = time.time() - start_time
-            logger.error(
-                "Request failed",
-                request_id=request_id,
-                error=str(e),
-                process_time=process_time,
-                exc_info=True,
-            )
-            raise
-
-    @app.middleware("http")
-    async def auth_middleware(request: Request, call_next: Callable) -> Response:
         """Handle authentication for protected routes."""
         # Allow preflight requests to pass through
         if request.method == "OPTIONS":
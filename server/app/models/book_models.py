@@ -6,14 +6,18 @@ from sqlalchemy import (
     ARRAY,
     JSON,
     BigInteger,
+    Boolean,
     Column,
     DateTime,
     Enum,
     ForeignKey,
+    Index,
     Integer,
     Text,
     UniqueConstraint,
+    text,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
 from sqlalchemy.orm import relationship
 
@@ -29,6 +33,11 @@ class HighlightColor(PyEnum):
     BLUE = "blue"
 
 
+def _enum_values(enum_cls: type[PyEnum]) -> list[str]:
+    # The Postgres enum types are created with the lowercase values, not names
+    return [member.value for member in enum_cls]
+
+
 class BookMetadata(Base):
     __tablename__ = "book_metadata"
 
@@ -38,14 +47,17 @@ class BookMetadata(Base):
     description = Column(Text)
     cover_url = Column(Text)
     file_url = Column(Text)
-    format = Column(Enum(BookFormat), nullable=False)
+    format = Column(Enum(BookFormat, values_callable=_enum_values), nullable=False)
     num_pages = Column(Integer)
     file_size_bytes = Column(BigInteger)
 
     # EPUB/PDF structure
     epub_chapter_char_counts = Column(ARRAY(Integer))
     epub_page_char_counts = Column(ARRAY(Integer))
-    pdf_toc = Column(JSON)
+    pdf_toc = Column(JSONB)
+
+    # Chunked and embedded for semantic search when set
+    rag_enabled = Column(Boolean, nullable=False, server_default=text("false"))
 
     created_at = Column(
         DateTime(timezone=True), nullable=False, default=datetime.utcnow
@@ -59,7 +71,10 @@ class BookMetadata(Base):
 
     # Relationships
     user_libraries = relationship(
-        "UserBookLibrary", back_populates="book_metadata", cascade="all, delete-orphan"
+        "UserBookLibrary",
+        back_populates="book_metadata",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
 
@@ -78,17 +93,42 @@ class UserBookLibrary(Base):
     )
 
     # User-specific progress
-    epub_progress = Column(JSON)
+    epub_progress = Column(JSONB)
     pdf_current_page = Column(Integer)
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+    )
 
     # Relationships
     book_metadata = relationship("BookMetadata", back_populates="user_libraries")
     highlights = relationship(
-        "Highlight", back_populates="user_book_library", cascade="all, delete-orphan"
+        "Highlight",
+        back_populates="user_book_library",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     __table_args__ = (
         UniqueConstraint("user_id", "book_metadata_id", name="uix_user_book"),
+        # Keyset pagination over a user's library, newest first
+        Index(
+            "ix_user_book_library_user_id_date_added",
+            "user_id",
+            date_added.desc(),
+            id.desc(),
+        ),
+        # Backs "books currently in progress" listings, most recently read first
+        Index(
+            "ix_user_book_library_in_progress",
+            "user_id",
+            updated_at.desc(),
+            postgresql_where=text(
+                "epub_progress IS NOT NULL OR pdf_current_page IS NOT NULL"
+            ),
+        ),
     )
 
 
@@ -97,9 +137,11 @@ class Highlight(Base):
 
     id = Column(PGUUID, primary_key=True, server_default="gen_random_uuid()")
     user_book_lib_id = Column(
-        PGUUID, ForeignKey("user_book_library.id", ondelete="CASCADE"), nullable=False
+        PGUUID,
+        ForeignKey("user_book_library.id", ondelete="CASCADE"),
+        nullable=False,
     )
-    color = Column(Enum(HighlightColor), nullable=False)
+    color = Column(Enum(HighlightColor, values_callable=_enum_values), nullable=False)
     original_text = Column(Text, nullable=False)
     note = Column(Text)
     created_at = Column(
@@ -115,7 +157,19 @@ class Highlight(Base):
     # Relationships
     user_book_library = relationship("UserBookLibrary", back_populates="highlights")
     locations = relationship(
-        "HighlightLocation", back_populates="highlight", cascade="all, delete-orphan"
+        "HighlightLocation",
+        back_populates="highlight",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+    __table_args__ = (
+        # Serves cascade lookups and per-entry highlight counts / latest highlight
+        Index(
+            "ix_highlights_user_book_lib_id_created_at",
+            "user_book_lib_id",
+            "created_at",
+        ),
     )
 
 
@@ -124,7 +178,10 @@ class HighlightLocation(Base):
 
     id = Column(PGUUID, primary_key=True, server_default="gen_random_uuid()")
     highlight_id = Column(
-        PGUUID, ForeignKey("highlights.id", ondelete="CASCADE"), nullable=False
+        PGUUID,
+        ForeignKey("highlights.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
     )
     chapter_idx = Column(Integer)
     chapter_href = Column(Text)
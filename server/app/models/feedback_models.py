@@ -2,7 +2,7 @@ from datetime import datetime
 from enum import Enum
 
 from app.db.base_class import Base
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Text
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Text, text
 from sqlalchemy import Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
 
@@ -14,15 +14,22 @@ class FeedbackType(str, Enum):
     OTHER = "other"
 
 
+def _enum_values(enum_cls: type[Enum]) -> list[str]:
+    # The Postgres enum type is created with the lowercase values, not names
+    return [member.value for member in enum_cls]
+
+
 class Feedback(Base):
     __tablename__ = "feedback"
 
-    id = Column(PGUUID, primary_key=True, server_default="gen_random_uuid()")
+    id = Column(PGUUID, primary_key=True, server_default=text("gen_random_uuid()"))
     user_id = Column(
-        PGUUID, ForeignKey("auth.users", ondelete="SET NULL"), nullable=True
+        PGUUID, ForeignKey("profiles.id", ondelete="SET NULL"), nullable=True
     )
 
-    feedback_type = Column(SQLEnum(FeedbackType), nullable=False)
+    feedback_type = Column(
+        SQLEnum(FeedbackType, values_callable=_enum_values), nullable=False
+    )
     description = Column(Text, nullable=False)
     allow_follow_up = Column(Boolean, nullable=False, default=False)
 
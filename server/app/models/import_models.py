@@ -0,0 +1,36 @@
+from datetime import datetime, timezone
+
+from app.db.base_class import Base
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, Text
+from sqlalchemy.dialects.postgresql import UUID as PGUUID
+
+
+class HighlightImport(Base):
+    """Progress of a bulk highlight import.
+
+    Kept in the database rather than in the worker running the import, so a
+    status poll can land on any worker.
+    """
+
+    __tablename__ = "highlight_imports"
+
+    id = Column(PGUUID, primary_key=True)
+    user_id = Column(
+        PGUUID, ForeignKey("profiles.id", ondelete="CASCADE"), nullable=False
+    )
+    format = Column(Text, nullable=False)
+    status = Column(Text, nullable=False)
+    rows_parsed = Column(Integer, nullable=False, default=0)
+    rows_staged = Column(Integer, nullable=False, default=0)
+    rows_skipped = Column(Integer, nullable=False, default=0)
+    imported = Column(Integer, nullable=False, default=0)
+    duplicates = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+    )
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (Index("ix_highlight_imports_finished_at", "finished_at"),)
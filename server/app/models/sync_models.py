@@ -0,0 +1,49 @@
+from datetime import datetime
+
+from app.db.base_class import Base
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Index, Text, text
+from sqlalchemy.dialects.postgresql import UUID as PGUUID
+from sqlalchemy.types import UserDefinedType
+
+
+class XID8(UserDefinedType):
+    """Postgres 64-bit transaction id."""
+
+    cache_ok = True
+
+    def get_col_spec(self, **kw) -> str:
+        return "xid8"
+
+
+class SyncEntity:
+    LIBRARY = "library"
+    HIGHLIGHT = "highlight"
+    HIGHLIGHT_LOCATION = "highlight_location"
+
+
+class SyncChange(Base):
+    """Latest change per synced row, maintained by database triggers.
+
+    Each insert, update or delete on ``user_book_library``, ``highlights`` and
+    ``highlight_locations`` stamps the row's entry with the writing
+    transaction and the next value of ``sync_change_seq``; deletes leave a
+    tombstone.
+    """
+
+    __tablename__ = "sync_changes"
+
+    entity_type = Column(Text, primary_key=True)
+    entity_id = Column(PGUUID, primary_key=True)
+    user_id = Column(PGUUID, nullable=False)
+    seq = Column(
+        BigInteger, nullable=False, server_default=text("nextval('sync_change_seq')")
+    )
+    deleted = Column(Boolean, nullable=False, default=False)
+    txid = Column(XID8, nullable=False, server_default=text("pg_current_xact_id()"))
+    changed_at = Column(
+        DateTime(timezone=True), nullable=False, default=datetime.utcnow
+    )
+
+    __table_args__ = (
+        Index("ix_sync_changes_user_id_txid_seq", "user_id", "txid", "seq"),
+    )
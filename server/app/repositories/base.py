@@ -1,9 +1,10 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from typing import Any, Dict, Generic, List, Mapping, Optional, Type, TypeVar, Union
 from uuid import UUID
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy import select, update, delete
+from sqlalchemy import any_, delete, literal, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import Select
 
@@ -30,6 +31,25 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         except Exception as e:
             raise StorageError(f"Failed to get {self.model.__name__}: {str(e)}")
 
+    async def get_many(self, db: AsyncSession, ids: List[UUID]) -> List[ModelType]:
+        """Get records by ID in one query, in the order the IDs were given.
+
+        IDs are sent as a single array parameter, so the statement is the same
+        whatever the batch size. Missing IDs are left out of the result.
+        """
+        if not ids:
+            return []
+        try:
+            query = select(self.model).where(self.model.id == any_(self.id_array(ids)))
+            result = await db.execute(query)
+            return order_by_ids(ids, result.scalars().all())
+        except Exception as e:
+            raise StorageError(f"Failed to get {self.model.__name__} batch: {str(e)}")
+
+    def id_array(self, ids: List[UUID]):
+        """Bind a list of IDs as one Postgres array parameter."""
+        return literal(list(ids), ARRAY(self.model.id.type))
+
     async def get_multi(
         self,
         db: AsyncSession,
@@ -71,21 +91,31 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         *,
         id: UUID,
         obj_in: Union[UpdateSchemaType, Dict[str, Any]],
-    ) -> ModelType:
-        """Update a record."""
+    ) -> Optional[ModelType]:
+        """Update a record with the fields set on ``obj_in``.
+
+        Fields the caller left out are not written, so a partial update never
+        clears columns it did not mention.
+        """
         try:
-            data = jsonable_encoder(obj_in) if isinstance(obj_in, BaseModel) else obj_in
+            data = (
+                obj_in.model_dump(exclude_unset=True)
+                if isinstance(obj_in, BaseModel)
+                else obj_in
+            )
+            if not data:
+                return await self.get(db, id)
             query = (
                 update(self.model)
                 .where(self.model.id == id)
                 .values(**data)
+                .returning(self.model)
                 .execution_options(synchronize_session="fetch")
             )
-            await db.execute(query)
+            result = await db.execute(query)
+            updated = result.scalar_one_or_none()
             await db.commit()
-
-            # Fetch the updated object
-            return await self.get(db, id)
+            return updated
         except Exception as e:
             await db.rollback()
             raise StorageError(f"Failed to update {self.model.__name__}: {str(e)}")
@@ -100,3 +130,12 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         except Exception as e:
             await db.rollback()
             raise StorageError(f"Failed to delete {self.model.__name__}: {str(e)}")
+
+
+def order_by_ids(ids: List[UUID], rows: List[Any], key: str = "id") -> List[Any]:
+    """Arrange rows to follow ``ids``, dropping duplicates and misses."""
+    by_id = {
+        (row[key] if isinstance(row, Mapping) else getattr(row, key)): row
+        for row in rows
+    }
+    return [by_id[id] for id in dict.fromkeys(ids) if id in by_id]
@@ -1,14 +1,44 @@
-from typing import List, Optional
+from datetime import datetime
+from functools import cache
+from typing import Any, Dict, List, Optional, Tuple, Union
 from uuid import UUID
 
+import orjson
+from app.core.cache import (
+    InMemorySharedCache,
+    LRUCache,
+    SharedCacheBackend,
+    TieredCache,
+    get_invalidation_counters,
+    register_cache_metrics,
+)
+from app.core.config import get_settings
 from app.core.exceptions import StorageError
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import (
+    Text,
+    case,
+    func,
+    inspect,
+    literal,
+    or_,
+    select,
+    true,
+    tuple_,
+    update,
+)
 from sqlalchemy.orm import selectinload
 
-from app.models.book_models import BookMetadata, UserBookLibrary
+from app.models.book_models import (
+    BookFormat,
+    BookMetadata,
+    Highlight,
+    UserBookLibrary,
+)
 from app.repositories.base import BaseRepository
 from app.schemas.book import BookCreate, BookUpdate
+from app.utils.serialization import orjson_default
 
 
 class BookRepository(BaseRepository[BookMetadata, BookCreate, BookUpdate]):
@@ -28,6 +58,17 @@ class BookRepository(BaseRepository[BookMetadata, BookCreate, BookUpdate]):
         except Exception as e:
             raise StorageError(f"Failed to get book by title: {str(e)}")
 
+    async def get_multi_version(
+        self, db: AsyncSession
+    ) -> Tuple[int, Optional[datetime]]:
+        """Get the book count and latest ``updated_at`` as a list version marker."""
+        try:
+            query = select(func.count(self.model.id), func.max(self.model.updated_at))
+            result = await db.execute(query)
+            return tuple(result.one())
+        except Exception as e:
+            raise StorageError(f"Failed to get books version: {str(e)}")
+
     async def get_user_books(
         self, db: AsyncSession, user_id: UUID, skip: int = 0, limit: int = 100
     ) -> List[BookMetadata]:
@@ -46,30 +87,161 @@ class BookRepository(BaseRepository[BookMetadata, BookCreate, BookUpdate]):
             raise StorageError(f"Failed to get user books: {str(e)}")
 
     async def update_progress(
-        self, db: AsyncSession, book_id: UUID, progress_data: dict
-    ) -> BookMetadata:
-        """Update book progress."""
-        try:
-            query = select(self.model).where(self.model.id == book_id)
-            result = await db.execute(query)
-            book = result.scalar_one_or_none()
-
-            if not book:
-                raise StorageError(f"Book not found: {book_id}")
+        self, db: AsyncSession, user_id: UUID, book_id: UUID, progress_data: dict
+    ) -> Optional[Dict[str, Any]]:
+        """Update a user's progress for a book in their library.
 
-            # Update progress based on book format
-            if book.format == "epub":
-                book.epub_progress = progress_data
-            else:
-                book.pdf_current_page = progress_data.get("page", 0)
+        ``epub_progress`` is merged into the stored jsonb document in place,
+        nested objects included, so only the keys sent by the client are
+        rewritten. An explicit null clears it.
+        """
+        try:
+            values: Dict[str, Any] = {"updated_at": func.now()}
+            if "epub_progress" in progress_data:
+                epub_progress = progress_data["epub_progress"]
+                values["epub_progress"] = (
+                    None
+                    if epub_progress is None
+                    else _merge_jsonb(UserBookLibrary.epub_progress, epub_progress)
+                )
+            if "pdf_current_page" in progress_data:
+                values["pdf_current_page"] = progress_data["pdf_current_page"]
 
+            query = (
+                update(UserBookLibrary)
+                .where(
+                    UserBookLibrary.user_id == user_id,
+                    UserBookLibrary.book_metadata_id == book_id,
+                )
+                .values(**values)
+                .returning(*self._progress_columns())
+                .execution_options(synchronize_session=False)
+            )
+            result = await db.execute(query)
+            progress = result.mappings().one_or_none()
             await db.commit()
-            await db.refresh(book)
-            return book
+            return progress
         except Exception as e:
             await db.rollback()
             raise StorageError(f"Failed to update book progress: {str(e)}")
 
+    async def get_in_progress(
+        self, db: AsyncSession, user_id: UUID, limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """Get the user's books that have reading progress, most recent first."""
+        try:
+            query = (
+                select(*self._progress_columns())
+                .where(
+                    UserBookLibrary.user_id == user_id,
+                    or_(
+                        UserBookLibrary.epub_progress.is_not(None),
+                        UserBookLibrary.pdf_current_page.is_not(None),
+                    ),
+                )
+                .order_by(UserBookLibrary.updated_at.desc())
+                .limit(limit)
+            )
+            result = await db.execute(query)
+            return result.mappings().all()
+        except Exception as e:
+            raise StorageError(f"Failed to get books in progress: {str(e)}")
+
+    async def get_library_overview(
+        self,
+        db: AsyncSession,
+        user_id: UUID,
+        after: Optional[Tuple[datetime, UUID]] = None,
+        limit: int = 500,
+    ) -> List[Dict[str, Any]]:
+        """Get the user's library entries with book summary and highlight stats.
+
+        Entries are ordered newest first and paginated by keyset on
+        ``(date_added, id)``; pass the last row's values as ``after`` to
+        continue. Highlight counts come from a lateral aggregate over the
+        ``(user_book_lib_id, created_at)`` index, so the whole page is one query.
+        """
+        try:
+            highlight_stats = (
+                select(
+                    func.count(Highlight.id).label("highlight_count"),
+                    func.max(Highlight.created_at).label("last_highlight_at"),
+                )
+                .where(Highlight.user_book_lib_id == UserBookLibrary.id)
+                .lateral("highlight_stats")
+            )
+            query = (
+                select(
+                    UserBookLibrary.id.label("library_id"),
+                    BookMetadata.id.label("book_id"),
+                    BookMetadata.title,
+                    BookMetadata.author,
+                    BookMetadata.cover_url,
+                    BookMetadata.format,
+                    BookMetadata.num_pages,
+                    UserBookLibrary.date_added,
+                    UserBookLibrary.epub_progress,
+                    UserBookLibrary.pdf_current_page,
+                    UserBookLibrary.updated_at.label("progress_updated_at"),
+                    highlight_stats.c.highlight_count,
+                    highlight_stats.c.last_highlight_at,
+                )
+                .join(BookMetadata, BookMetadata.id == UserBookLibrary.book_metadata_id)
+                .join(highlight_stats, true())
+                .where(UserBookLibrary.user_id == user_id)
+                .order_by(UserBookLibrary.date_added.desc(), UserBookLibrary.id.desc())
+                .limit(limit)
+            )
+            if after is not None:
+                query = query.where(
+                    tuple_(UserBookLibrary.date_added, UserBookLibrary.id)
+                    < tuple_(*after)
+                )
+            result = await db.execute(query)
+            return result.mappings().all()
+        except Exception as e:
+            raise StorageError(f"Failed to get library overview: {str(e)}")
+
+    async def get_rag_sources(self, db: AsyncSession) -> List[Any]:
+        """Get ID, format, file URL and ``updated_at`` of every book with ``rag_enabled``."""
+        try:
+            query = select(
+                self.model.id,
+                self.model.format,
+                self.model.file_url,
+                self.model.updated_at,
+            ).where(self.model.rag_enabled)
+            result = await db.execute(query)
+            return result.all()
+        except Exception as e:
+            raise StorageError(f"Failed to get books to index: {str(e)}")
+
+    async def get_rag_versions(
+        self, db: AsyncSession, user_id: UUID, book_id: Optional[UUID] = None
+    ) -> Dict[UUID, datetime]:
+        """Get ``updated_at`` of the user's books with ``rag_enabled``, by book ID."""
+        try:
+            query = (
+                select(self.model.id, self.model.updated_at)
+                .join(UserBookLibrary)
+                .where(UserBookLibrary.user_id == user_id, self.model.rag_enabled)
+            )
+            if book_id is not None:
+                query = query.where(self.model.id == book_id)
+            result = await db.execute(query)
+            return dict(result.all())
+        except Exception as e:
+            raise StorageError(f"Failed to get searchable books: {str(e)}")
+
+    @staticmethod
+    def _progress_columns() -> tuple:
+        return (
+            UserBookLibrary.book_metadata_id.label("book_id"),
+            UserBookLibrary.epub_progress,
+            UserBookLibrary.pdf_current_page,
+            UserBookLibrary.updated_at,
+        )
+
     async def get_with_highlights(
         self, db: AsyncSession, book_id: UUID
     ) -> Optional[BookMetadata]:
@@ -84,3 +256,142 @@ class BookRepository(BaseRepository[BookMetadata, BookCreate, BookUpdate]):
             return result.scalar_one_or_none()
         except Exception as e:
             raise StorageError(f"Failed to get book with highlights: {str(e)}")
+
+
+def _merge_jsonb(target: Any, patch: Dict[str, Any]) -> Any:
+    """SQL expression merging ``patch`` into the jsonb ``target`` key by key.
+
+    Scalars and arrays replace what is stored; objects are merged
+    recursively with ``jsonb_set``, so sending one nested key leaves its
+    siblings alone. A target that is not an object is treated as empty.
+    """
+    base = case(
+        (func.jsonb_typeof(target) == "object", target), else_=literal({}, JSONB)
+    )
+    nested = {
+        key: value for key, value in patch.items() if isinstance(value, dict) and value
+    }
+    flat = {key: value for key, value in patch.items() if key not in nested}
+    merged = base.op("||", return_type=JSONB)(literal(flat, JSONB))
+    for key, value in nested.items():
+        merged = func.jsonb_set(
+            merged,
+            literal([key], ARRAY(Text)),
+            _merge_jsonb(target.op("->", return_type=JSONB)(key), value),
+            type_=JSONB,
+        )
+    return merged
+
+
+def _encode_book(data: Dict[str, Any]) -> bytes:
+    return orjson.dumps(data, default=orjson_default)
+
+
+def _decode_book(raw: bytes) -> Dict[str, Any]:
+    data = orjson.loads(raw)
+    data["id"] = UUID(data["id"])
+    data["format"] = BookFormat(data["format"])
+    for key in ("created_at", "updated_at"):
+        if data.get(key):
+            data[key] = datetime.fromisoformat(data[key])
+    return data
+
+
+def _build_shared_backend(name: str) -> Optional[SharedCacheBackend]:
+    if name == "none":
+        return None
+    if name == "memory":
+        return InMemorySharedCache()
+    raise ValueError(f"Unknown BOOK_CACHE_SHARED_BACKEND: {name}")
+
+
+@cache
+def get_book_cache() -> TieredCache:
+    """Get the process-wide book metadata cache."""
+    settings = get_settings()
+    book_cache = TieredCache(
+        LRUCache(settings.BOOK_CACHE_MAX_ENTRIES, settings.BOOK_CACHE_TTL_SECONDS),
+        _build_shared_backend(settings.BOOK_CACHE_SHARED_BACKEND),
+        namespace="book",
+        encode=_encode_book,
+        decode=_decode_book,
+        shared_ttl_seconds=settings.BOOK_CACHE_TTL_SECONDS,
+        counters=get_invalidation_counters(),
+    )
+    register_cache_metrics(book_cache)
+    return book_cache
+
+
+class CachedBookRepository(BookRepository):
+    """Book repository that serves ``get`` from the book metadata cache.
+
+    Cached values are column snapshots rather than ORM instances, so every
+    hit hands out a fresh transient ``BookMetadata`` that is safe to use from
+    any session. Writes through this repository invalidate the book's entry.
+    """
+
+    def __init__(self, book_cache: Optional[TieredCache] = None):
+        super().__init__()
+        self.cache = book_cache or get_book_cache()
+
+    async def get(self, db: AsyncSession, id: UUID) -> Optional[BookMetadata]:
+        """Get a book by ID, reading through the cache."""
+
+        async def load() -> Optional[Dict[str, Any]]:
+            book = await super(CachedBookRepository, self).get(db, id)
+            return self._snapshot(book) if book else None
+
+        data = await self.cache.get_or_load(str(id), load)
+        return BookMetadata(**data) if data else None
+
+    async def get_many(self, db: AsyncSession, ids: List[UUID]) -> List[BookMetadata]:
+        """Get books by ID in the order given, reading through the cache.
+
+        Books missing from the cache are fetched together in one query.
+        """
+
+        async def load(keys: List[str]) -> Dict[str, Dict[str, Any]]:
+            books = await super(CachedBookRepository, self).get_many(
+                db, [UUID(key) for key in keys]
+            )
+            return {str(book.id): self._snapshot(book) for book in books}
+
+        found = await self.cache.get_many_or_load([str(id) for id in ids], load)
+        return [
+            BookMetadata(**found[key])
+            for key in dict.fromkeys(str(id) for id in ids)
+            if key in found
+        ]
+
+    async def create(self, db: AsyncSession, *, obj_in: BookCreate) -> BookMetadata:
+        book = await super().create(db, obj_in=obj_in)
+        await self.invalidate(book.id)
+        return book
+
+    async def update(
+        self,
+        db: AsyncSession,
+        *,
+        id: UUID,
+        obj_in: Union[BookUpdate, Dict[str, Any]],
+    ) -> Optional[BookMetadata]:
+        try:
+            return await super().update(db, id=id, obj_in=obj_in)
+        finally:
+            await self.invalidate(id)
+
+    async def delete(self, db: AsyncSession, *, id: UUID) -> bool:
+        try:
+            return await super().delete(db, id=id)
+        finally:
+            await self.invalidate(id)
+
+    async def invalidate(self, book_id: UUID) -> None:
+        """Drop a book from the cache; call after any other write to its row."""
+        await self.cache.invalidate(str(book_id))
+
+    def _snapshot(self, book: BookMetadata) -> Dict[str, Any]:
+        return {
+            attr.key: getattr(book, attr.key)
+            for attr in inspect(self.model).column_attrs
+        }
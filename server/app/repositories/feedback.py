@@ -1,9 +1,11 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from uuid import UUID
 
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
+from app.core.exceptions import StorageError
 from app.models.feedback_models import Feedback
 from app.repositories.base import BaseRepository
 from app.schemas.feedback import FeedbackCreate
@@ -24,4 +26,23 @@ class FeedbackRepository(BaseRepository[Feedback, FeedbackCreate, FeedbackCreate
         """Get a feedback entry by ID."""
         query = select(self.model).where(self.model.id == feedback_id)
         result = await db.execute(query)
-        return result.scalar_one_or_none() 
\ No newline at end of file
+        return result.scalar_one_or_none()
+
+    async def create_many(self, db: AsyncSession, rows: List[Dict[str, Any]]) -> int:
+        """Insert feedback rows with one multi-row INSERT.
+
+        Rows carry their own IDs; ones already stored are skipped so a batch
+        can be retried safely.
+        """
+        try:
+            query = (
+                insert(self.model)
+                .values(rows)
+                .on_conflict_do_nothing(index_elements=[self.model.id])
+            )
+            result = await db.execute(query)
+            await db.commit()
+            return result.rowcount
+        except Exception as e:
+            await db.rollback()
+            raise StorageError(f"Failed to create feedback batch: {str(e)}")
@@ -1,12 +1,79 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from uuid import UUID
 
 from app.core.exceptions import StorageError
-from app.models.book_models import Highlight
-from app.repositories.base import BaseRepository
+from app.models.book_models import (
+    BookMetadata,
+    Highlight,
+    HighlightColor,
+    HighlightLocation,
+    UserBookLibrary,
+)
+from app.repositories.base import BaseRepository, order_by_ids
 from app.schemas.highlights import HighlightCreate, HighlightUpdate
-from sqlalchemy import select
+from sqlalchemy import any_, delete, func, insert, select, text, true, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+
+IMPORT_STAGING_TABLE = "highlight_import_staging"
+IMPORT_STAGING_COLUMNS = [
+    "row_num",
+    "user_book_lib_id",
+    "color",
+    "original_text",
+    "note",
+    "chapter_idx",
+    "chapter_href",
+    "chapter_title",
+    "page",
+    "created_at",
+]
+IMPORT_STAGING_DDL = f"""
+CREATE TEMP TABLE {IMPORT_STAGING_TABLE} (
+    row_num integer NOT NULL,
+    user_book_lib_id uuid NOT NULL,
+    color text NOT NULL,
+    original_text text NOT NULL,
+    note text,
+    chapter_idx integer,
+    chapter_href text,
+    chapter_title text,
+    page integer,
+    created_at timestamptz
+) ON COMMIT DROP
+"""
+IMPORT_MERGE_SQL = f"""
+WITH staged AS MATERIALIZED (
+    SELECT DISTINCT ON (s.user_book_lib_id, s.original_text)
+        gen_random_uuid() AS highlight_id, s.*
+    FROM {IMPORT_STAGING_TABLE} s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM highlights h
+        WHERE h.user_book_lib_id = s.user_book_lib_id
+          AND h.original_text = s.original_text
+    )
+    ORDER BY s.user_book_lib_id, s.original_text, s.row_num
+),
+inserted AS (
+    INSERT INTO highlights
+        (id, user_book_lib_id, color, original_text, note, created_at, updated_at)
+    SELECT highlight_id, user_book_lib_id, color::highlightcolor, original_text,
+           note, coalesce(created_at, now()), now()
+    FROM staged
+    RETURNING id
+),
+located AS (
+    INSERT INTO highlight_locations
+        (highlight_id, chapter_idx, chapter_href, chapter_title, page, created_at)
+    SELECT highlight_id, chapter_idx, chapter_href, chapter_title, page, now()
+    FROM staged
+    WHERE chapter_idx IS NOT NULL OR chapter_href IS NOT NULL
+       OR chapter_title IS NOT NULL OR page IS NOT NULL
+)
+SELECT count(*) FROM inserted
+"""
 
 
 class HighlightRepository(BaseRepository[Highlight, HighlightCreate, HighlightUpdate]):
@@ -16,20 +83,206 @@ class HighlightRepository(BaseRepository[Highlight, HighlightCreate, HighlightUp
         super().__init__(Highlight)
 
     async def get_book_highlights(
-        self, db: AsyncSession, book_id: UUID
-    ) -> List[Highlight]:
-        """Get all highlights for a book."""
+        self, db: AsyncSession, user_id: UUID, book_id: UUID
+    ) -> List[Dict[str, Any]]:
+        """Get all of the user's highlights for a book, newest first.
+
+        Rows are flattened into the API shape, taking the first location of
+        each highlight.
+        """
         try:
             query = (
-                select(self.model)
-                .where(self.model.book_id == book_id)
+                self._flattened_select()
+                .where(
+                    UserBookLibrary.user_id == user_id,
+                    UserBookLibrary.book_metadata_id == book_id,
+                )
                 .order_by(self.model.created_at.desc())
             )
             result = await db.execute(query)
-            return result.scalars().all()
+            return result.mappings().all()
         except Exception as e:
             raise StorageError(f"Failed to get book highlights: {str(e)}")
 
+    async def get_highlights_by_ids(
+        self, db: AsyncSession, user_id: UUID, ids: List[UUID]
+    ) -> List[Dict[str, Any]]:
+        """Get the user's highlights by ID in one query, in the order given.
+
+        Rows use the same flattened shape as ``get_book_highlights``. IDs
+        that do not exist or belong to another user are left out.
+        """
+        if not ids:
+            return []
+        try:
+            query = self._flattened_select().where(
+                UserBookLibrary.user_id == user_id,
+                self.model.id == any_(self.id_array(ids)),
+            )
+            result = await db.execute(query)
+            return order_by_ids(ids, result.mappings().all())
+        except Exception as e:
+            raise StorageError(f"Failed to get highlight batch: {str(e)}")
+
+    async def get_book_highlights_version(
+        self, db: AsyncSession, user_id: UUID, book_id: UUID
+    ) -> Tuple[int, Optional[datetime]]:
+        """Get a cheap version marker for a book's highlights.
+
+        The row count changes on inserts and deletes, the latest
+        ``updated_at`` on inserts and edits.
+        """
+        try:
+            query = (
+                select(func.count(self.model.id), func.max(self.model.updated_at))
+                .join(UserBookLibrary)
+                .where(
+                    UserBookLibrary.user_id == user_id,
+                    UserBookLibrary.book_metadata_id == book_id,
+                )
+            )
+            result = await db.execute(query)
+            return tuple(result.one())
+        except Exception as e:
+            raise StorageError(f"Failed to get book highlights version: {str(e)}")
+
+    async def stream_export_rows(
+        self, db: AsyncSession, user_id: UUID, batch_size: int = 1000
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream all of the user's highlights in batches for export.
+
+        Rows come from a server-side cursor, ordered by book, chapter and
+        position, so memory use is bounded by ``batch_size``.
+        """
+        location = self._first_location()
+        query = (
+            select(
+                BookMetadata.id.label("book_id"),
+                BookMetadata.title.label("book_title"),
+                BookMetadata.author.label("book_author"),
+                location.c.chapter_idx,
+                location.c.chapter_title,
+                location.c.page,
+                self.model.id,
+                self.model.color,
+                self.model.original_text.label("text"),
+                self.model.note,
+                self.model.created_at,
+            )
+            .select_from(self.model)
+            .join(UserBookLibrary)
+            .join(BookMetadata, BookMetadata.id == UserBookLibrary.book_metadata_id)
+            .outerjoin(location, true())
+            .where(UserBookLibrary.user_id == user_id)
+            .order_by(
+                BookMetadata.title,
+                BookMetadata.id,
+                location.c.chapter_idx.nulls_last(),
+                location.c.page.nulls_last(),
+                self.model.created_at,
+            )
+            .execution_options(yield_per=batch_size)
+        )
+        try:
+            result = await db.stream(query)
+            async for batch in result.mappings().partitions(batch_size):
+                yield batch
+        except Exception as e:
+            raise StorageError(f"Failed to stream highlights: {str(e)}")
+
+    async def get_import_targets(
+        self, db: AsyncSession, user_id: UUID
+    ) -> List[Dict[str, Any]]:
+        """Get the user's library entries with the book ID and title to match on."""
+        try:
+            query = (
+                select(
+                    UserBookLibrary.id.label("library_id"),
+                    UserBookLibrary.book_metadata_id.label("book_id"),
+                    BookMetadata.title,
+                )
+                .join(BookMetadata)
+                .where(UserBookLibrary.user_id == user_id)
+            )
+            result = await db.execute(query)
+            return result.mappings().all()
+        except Exception as e:
+            raise StorageError(f"Failed to get import targets: {str(e)}")
+
+    async def create_import_staging(self, db: AsyncSession) -> None:
+        """Create the transaction-scoped staging table for an import."""
+        await db.execute(text(IMPORT_STAGING_DDL))
+
+    async def copy_to_import_staging(
+        self, db: AsyncSession, records: List[Tuple]
+    ) -> None:
+        """Bulk-load parsed rows into the staging table with COPY."""
+        try:
+            connection = await db.connection()
+            raw = await connection.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                IMPORT_STAGING_TABLE,
+                records=records,
+                columns=IMPORT_STAGING_COLUMNS,
+            )
+        except Exception as e:
+            raise StorageError(f"Failed to stage highlights: {str(e)}")
+
+    async def merge_import_staging(self, db: AsyncSession) -> int:
+        """Insert staged highlights and their locations in one statement.
+
+        Rows whose text already exists for the same library entry, in the
+        database or earlier in the file, are skipped as duplicates.
+
+        Returns:
+            int: The number of highlights inserted
+        """
+        try:
+            result = await db.execute(text(IMPORT_MERGE_SQL))
+            return result.scalar_one()
+        except Exception as e:
+            raise StorageError(f"Failed to merge imported highlights: {str(e)}")
+
+    def _first_location(self):
+        """Lateral subquery for the earliest location of each highlight."""
+        return (
+            select(
+                HighlightLocation.chapter_idx,
+                HighlightLocation.chapter_href,
+                HighlightLocation.chapter_title,
+                HighlightLocation.page,
+                HighlightLocation.html_range,
+                HighlightLocation.pdf_rect_position,
+            )
+            .where(HighlightLocation.highlight_id == self.model.id)
+            .order_by(HighlightLocation.created_at)
+            .limit(1)
+            .lateral("location")
+        )
+
+    def _flattened_select(self) -> Select:
+        """Select highlights joined with their book and first location."""
+        location = self._first_location()
+        return (
+            select(
+                self.model.id,
+                UserBookLibrary.book_metadata_id.label("book_id"),
+                self.model.original_text.label("text"),
+                self.model.color,
+                self.model.note,
+                location.c.html_range.label("epub_range"),
+                location.c.chapter_href.label("epub_chapter_href"),
+                location.c.chapter_idx.label("epub_chapter_idx"),
+                location.c.chapter_title.label("epub_chapter_title"),
+                location.c.page.label("epub_est_page"),
+                location.c.pdf_rect_position,
+                self.model.created_at,
+                self.model.updated_at,
+            )
+            .join(UserBookLibrary)
+            .outerjoin(location, true())
+        )
+
     async def get_by_text(self, db: AsyncSession, text: str) -> Optional[Highlight]:
         """Get a highlight by its text content."""
         try:
@@ -39,38 +292,129 @@ class HighlightRepository(BaseRepository[Highlight, HighlightCreate, HighlightUp
         except Exception as e:
             raise StorageError(f"Failed to get highlight by text: {str(e)}")
 
-    async def delete_by_text(self, db: AsyncSession, text: str) -> bool:
-        """Delete highlights by text content."""
+    async def delete_by_text(
+        self, db: AsyncSession, user_id: UUID, text: str
+    ) -> List[UUID]:
+        """Delete the user's highlights with the given text content."""
+        return await self._delete_where(
+            db, self._owned_by(user_id), self.model.original_text == text
+        )
+
+    async def delete_by_book(
+        self, db: AsyncSession, user_id: UUID, book_id: UUID
+    ) -> List[UUID]:
+        """Delete all of the user's highlights for a book."""
+        return await self._delete_where(db, self._owned_by(user_id, book_id))
+
+    async def delete_by_ids(
+        self, db: AsyncSession, user_id: UUID, ids: List[UUID]
+    ) -> List[UUID]:
+        """Delete the user's highlights with the given IDs."""
+        if not ids:
+            return []
+        return await self._delete_where(
+            db, self._owned_by(user_id), self.model.id.in_(ids)
+        )
+
+    def _owned_by(self, user_id: UUID, book_id: Optional[UUID] = None):
+        """Restrict highlights to library entries owned by the user."""
+        library = select(UserBookLibrary.id).where(UserBookLibrary.user_id == user_id)
+        if book_id is not None:
+            library = library.where(UserBookLibrary.book_metadata_id == book_id)
+        return self.model.user_book_lib_id.in_(library)
+
+    async def _delete_where(self, db: AsyncSession, *criteria) -> List[UUID]:
+        """Delete matching highlights in one statement and return their IDs.
+
+        Locations are removed by the database's ON DELETE CASCADE, so nothing
+        is loaded into the session.
+        """
         try:
-            query = select(self.model).where(self.model.text == text)
+            query = (
+                delete(self.model)
+                .where(*criteria)
+                .returning(self.model.id)
+                .execution_options(synchronize_session=False)
+            )
             result = await db.execute(query)
-            highlights = result.scalars().all()
+            deleted_ids = result.scalars().all()
+            await db.commit()
+            return deleted_ids
+        except Exception as e:
+            await db.rollback()
+            raise StorageError(f"Failed to delete highlights: {str(e)}")
 
-            for highlight in highlights:
-                await db.delete(highlight)
+    async def create_for_user(
+        self, db: AsyncSession, user_id: UUID, obj_in: HighlightCreate
+    ) -> Optional[Dict[str, Any]]:
+        """Create a highlight and its location in the user's copy of a book.
 
+        Returns the flattened row, or None if the book is not in the user's
+        library.
+        """
+        try:
+            library_id = (
+                await db.execute(
+                    select(UserBookLibrary.id).where(
+                        UserBookLibrary.user_id == user_id,
+                        UserBookLibrary.book_metadata_id == obj_in.book_id,
+                    )
+                )
+            ).scalar_one_or_none()
+            if library_id is None:
+                return None
+
+            highlight_id = (
+                await db.execute(
+                    insert(self.model)
+                    .values(
+                        user_book_lib_id=library_id,
+                        color=obj_in.color or HighlightColor.YELLOW,
+                        original_text=obj_in.text,
+                        note=obj_in.note,
+                    )
+                    .returning(self.model.id)
+                )
+            ).scalar_one()
+            await db.execute(
+                insert(HighlightLocation).values(
+                    highlight_id=highlight_id,
+                    chapter_idx=obj_in.epub_chapter_idx,
+                    chapter_href=obj_in.epub_chapter_href,
+                    chapter_title=obj_in.epub_chapter_title,
+                    page=obj_in.epub_est_page,
+                    html_range=obj_in.epub_range,
+                    pdf_rect_position=obj_in.pdf_rect_position,
+                )
+            )
             await db.commit()
-            return True
         except Exception as e:
             await db.rollback()
-            raise StorageError(f"Failed to delete highlights by text: {str(e)}")
+            raise StorageError(f"Failed to create highlight: {str(e)}")
+        rows = await self.get_highlights_by_ids(db, user_id, [highlight_id])
+        return rows[0]
 
     async def update_note(
-        self, db: AsyncSession, highlight_id: UUID, note: str
-    ) -> Highlight:
-        """Update a highlight's note."""
-        try:
-            query = select(self.model).where(self.model.id == highlight_id)
-            result = await db.execute(query)
-            highlight = result.scalar_one_or_none()
+        self, db: AsyncSession, user_id: UUID, highlight_id: UUID, note: str
+    ) -> Optional[Dict[str, Any]]:
+        """Update the note on one of the user's highlights.
 
-            if not highlight:
-                raise StorageError(f"Highlight not found: {highlight_id}")
-
-            highlight.note = note
+        Returns the flattened row, or None if the user has no such highlight.
+        """
+        try:
+            result = await db.execute(
+                update(self.model)
+                .where(self.model.id == highlight_id, self._owned_by(user_id))
+                .values(note=note, updated_at=func.now())
+                .returning(self.model.id)
+                .execution_options(synchronize_session=False)
+            )
+            updated = result.scalar_one_or_none()
             await db.commit()
-            await db.refresh(highlight)
-            return highlight
         except Exception as e:
             await db.rollback()
             raise StorageError(f"Failed to update highlight note: {str(e)}")
+        if updated is None:
+            return None
+        rows = await self.get_highlights_by_ids(db, user_id, [highlight_id])
+        return rows[0] if rows else None
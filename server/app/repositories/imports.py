@@ -0,0 +1,74 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from pydantic import BaseModel
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.exceptions import StorageError
+from app.models.import_models import HighlightImport
+from app.repositories.base import BaseRepository
+from app.schemas.highlights import ImportStatusResponse
+
+
+def _columns(job: ImportStatusResponse) -> Dict[str, Any]:
+    values = job.model_dump()
+    values["format"] = job.format.value
+    values["status"] = job.status.value
+    return values
+
+
+class HighlightImportRepository(BaseRepository[HighlightImport, BaseModel, BaseModel]):
+    """Repository for bulk highlight import progress."""
+
+    def __init__(self):
+        super().__init__(HighlightImport)
+
+    async def create_job(self, db: AsyncSession, job: ImportStatusResponse) -> None:
+        """Store a new import and commit, so it can be polled right away."""
+        try:
+            await db.execute(insert(self.model).values(_columns(job)))
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            raise StorageError(f"Failed to create highlight import: {str(e)}")
+
+    async def save_job(self, db: AsyncSession, job: ImportStatusResponse) -> None:
+        """Write an import's current progress and commit."""
+        try:
+            values = _columns(job)
+            del values["id"], values["user_id"], values["created_at"]
+            await db.execute(
+                update(self.model).where(self.model.id == job.id).values(values)
+            )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            raise StorageError(f"Failed to save highlight import: {str(e)}")
+
+    async def get_for_user(
+        self, db: AsyncSession, user_id: UUID, import_id: UUID
+    ) -> Optional[ImportStatusResponse]:
+        try:
+            query = select(self.model).where(
+                self.model.id == import_id, self.model.user_id == user_id
+            )
+            job = (await db.execute(query)).scalar_one_or_none()
+            if job is None:
+                return None
+            return ImportStatusResponse.model_validate(job, from_attributes=True)
+        except Exception as e:
+            raise StorageError(f"Failed to get highlight import: {str(e)}")
+
+    async def delete_finished_before(self, db: AsyncSession, cutoff: datetime) -> int:
+        """Drop imports that finished before ``cutoff``; returns how many."""
+        try:
+            result = await db.execute(
+                delete(self.model).where(self.model.finished_at < cutoff)
+            )
+            await db.commit()
+            return result.rowcount
+        except Exception as e:
+            await db.rollback()
+            raise StorageError(f"Failed to prune highlight imports: {str(e)}")
@@ -1,13 +1,17 @@
+import asyncio
 import uuid
-from typing import Optional
+from functools import cache
+from typing import TYPE_CHECKING, Optional
 
+import httpx
 import structlog
-from supabase import Client, create_client
 
 from app.core.config import get_settings
 
+if TYPE_CHECKING:
+    from supabase import Client
+
 logger = structlog.get_logger()
-settings = get_settings()
 
 
 class StorageError(Exception):
@@ -24,12 +28,18 @@ def generate_id() -> str:
     return str(uuid.uuid4())
 
 
-def get_supabase_client() -> Client:
-    """Get a Supabase client instance."""
+@cache
+def get_supabase_client() -> "Client":
+    """Get the process-wide Supabase client.
+
+    The supabase package is imported here rather than at module level; it
+    is the slowest import in the app and only storage and role lookups need it.
+    """
+    from supabase import create_client
+
     try:
-        url = settings.supabase_url
-        key = settings.supabase_key.get_secret_value()
-        client = create_client(url, key)
+        settings = get_settings()
+        client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
         return client
     except Exception as e:
         logger.error("Failed to create Supabase client", error=str(e))
@@ -45,9 +55,40 @@ class SupabaseStorageClient:
     """Client for interacting with Supabase Storage."""
 
     def __init__(self):
-        self.client = get_supabase_client()
         self.bucket_name = "documents"
 
+    @property
+    def client(self) -> "Client":
+        # Resolved on use, so failing to create the client surfaces as a
+        # StorageError from the call rather than from dependency injection
+        return get_supabase_client()
+
+    async def ping(self, timeout: float = 5.0) -> None:
+        """
+        Check that the storage bucket is reachable.
+
+        Calls the storage API directly with an async request that gives up
+        after ``timeout`` seconds, rather than running the synchronous client
+        in a thread that a hung request would keep busy.
+
+        Raises:
+            StorageError: If the bucket cannot be reached
+        """
+        settings = get_settings()
+        url = (
+            f"{settings.SUPABASE_URL.rstrip('/')}/storage/v1/bucket/{self.bucket_name}"
+        )
+        headers = {
+            "apikey": settings.SUPABASE_KEY,
+            "Authorization": f"Bearer {settings.SUPABASE_KEY}",
+        }
+        try:
+            async with httpx.AsyncClient(timeout=timeout) as http:
+                response = await http.get(url, headers=headers)
+                response.raise_for_status()
+        except Exception as e:
+            raise StorageError(f"Storage unreachable: {str(e)}")
+
     async def upload_file(
         self,
         object_name: str,
@@ -103,7 +144,10 @@ class SupabaseStorageClient:
         try:
             logger.info("Downloading file from storage", path=object_name)
 
-            result = self.client.storage.from_(self.bucket_name).download(object_name)
+            # Book files run to megabytes; keep the event loop free meanwhile
+            result = await asyncio.to_thread(
+                self.client.storage.from_(self.bucket_name).download, object_name
+            )
 
             logger.info("File download successful", path=object_name)
             return result
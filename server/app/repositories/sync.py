@@ -0,0 +1,131 @@
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from pydantic import BaseModel
+from sqlalchemy import Text, cast, func, literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.exceptions import StorageError
+from app.models.book_models import Highlight, HighlightLocation, UserBookLibrary
+from app.models.sync_models import XID8, SyncChange, SyncEntity
+from app.repositories.base import BaseRepository
+
+
+class SyncRepository(BaseRepository[SyncChange, BaseModel, BaseModel]):
+    """Repository for reading the per-user change feed."""
+
+    def __init__(self):
+        super().__init__(SyncChange)
+
+    async def get_changes(
+        self,
+        db: AsyncSession,
+        user_id: UUID,
+        after: Optional[Tuple[int, int]] = None,
+        limit: int = 500,
+    ) -> Tuple[List[Any], bool]:
+        """Get up to ``limit`` of the user's changes after ``after``, in order.
+
+        Changes are ordered by ``(txid, seq)`` and only returned once every
+        transaction up to theirs has finished (``txid`` below the snapshot
+        xmin). A sequence number taken by a transaction that commits late can
+        then never fall behind a cursor that has already moved past it.
+        """
+        try:
+            query = (
+                select(
+                    self.model.entity_type,
+                    self.model.entity_id,
+                    cast(self.model.txid, Text).label("txid"),
+                    self.model.seq,
+                    self.model.deleted,
+                )
+                .where(
+                    self.model.user_id == user_id,
+                    self.model.txid < func.pg_snapshot_xmin(func.pg_current_snapshot()),
+                )
+                .order_by(self.model.txid, self.model.seq)
+                .limit(limit + 1)
+            )
+            if after is not None:
+                txid, seq = after
+                query = query.where(
+                    tuple_(self.model.txid, self.model.seq)
+                    > tuple_(cast(cast(literal(str(txid)), Text), XID8), seq)
+                )
+            result = await db.execute(query)
+            changes = result.all()
+            return changes[:limit], len(changes) > limit
+        except Exception as e:
+            raise StorageError(f"Failed to get sync changes: {str(e)}")
+
+    async def get_changed_rows(
+        self, db: AsyncSession, user_id: UUID, ids: Dict[str, List[UUID]]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Load the current state of changed rows, one query per entity type."""
+        try:
+            rows: Dict[str, List[Dict[str, Any]]] = {}
+            for entity_type, query, id_column in (
+                (SyncEntity.LIBRARY, self._library_select(), UserBookLibrary.id),
+                (SyncEntity.HIGHLIGHT, self._highlight_select(), Highlight.id),
+                (
+                    SyncEntity.HIGHLIGHT_LOCATION,
+                    self._location_select(),
+                    HighlightLocation.id,
+                ),
+            ):
+                entity_ids = ids.get(entity_type)
+                if not entity_ids:
+                    rows[entity_type] = []
+                    continue
+                result = await db.execute(
+                    query.where(
+                        UserBookLibrary.user_id == user_id,
+                        id_column.in_(entity_ids),
+                    )
+                )
+                rows[entity_type] = result.mappings().all()
+            return rows
+        except Exception as e:
+            raise StorageError(f"Failed to get changed rows: {str(e)}")
+
+    @staticmethod
+    def _library_select():
+        return select(
+            UserBookLibrary.id,
+            UserBookLibrary.book_metadata_id.label("book_id"),
+            UserBookLibrary.date_added,
+            UserBookLibrary.epub_progress,
+            UserBookLibrary.pdf_current_page,
+            UserBookLibrary.updated_at,
+        )
+
+    @staticmethod
+    def _highlight_select():
+        return select(
+            Highlight.id,
+            Highlight.user_book_lib_id.label("library_id"),
+            Highlight.color,
+            Highlight.original_text.label("text"),
+            Highlight.note,
+            Highlight.created_at,
+            Highlight.updated_at,
+        ).join(UserBookLibrary)
+
+    @staticmethod
+    def _location_select():
+        return (
+            select(
+                HighlightLocation.id,
+                HighlightLocation.highlight_id,
+                HighlightLocation.chapter_idx,
+                HighlightLocation.chapter_href,
+                HighlightLocation.chapter_title,
+                HighlightLocation.page,
+                HighlightLocation.html_range,
+                HighlightLocation.pdf_rect_position,
+                HighlightLocation.created_at,
+            )
+            .join(Highlight)
+            .join(UserBookLibrary)
+        )
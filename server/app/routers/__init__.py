@@ -1,4 +1,3 @@
-import structlog
 from fastapi import APIRouter, Depends
 
 from app.services.auth import TokenData, get_current_user
@@ -13,16 +12,6 @@ router = APIRouter()
 router.include_router(upload.router, prefix="/upload", tags=["upload"])
 
 
-@router.get("/health")
-async def health_check():
-    """
-    Health check endpoint that doesn't require authentication
-    """
-    log = structlog.get_logger()
-    log.info("Health check endpoint called")
-    return {"status": "ok"}
-
-
 @router.get("/user-info")
 async def user_info(user: TokenData = Depends(get_current_user)):
     """
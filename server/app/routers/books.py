@@ -1,37 +1,140 @@
-from typing import List, Annotated
+from typing import List, Annotated, Optional
 from uuid import UUID
 
 from app.core.database import get_db
-from app.repositories.books import BookRepository
-from app.schemas.books import BookCreate, BookProgress, BookResponse, BookUpdate
-from fastapi import APIRouter, Depends, HTTPException, status
+from app.core.dependencies import CurrentUser
+from app.core.rate_limit import rate_limited
+from app.schemas.auth import TokenData
+from app.repositories.books import CachedBookRepository
+from app.services.positions import (
+    PositionMap,
+    get_position_maps,
+    position_map,
+    progress_page,
+)
+from app.services.rag_indexer import get_rag_indexer
+from app.schemas.books import (
+    BookBatchGetAdapter,
+    BookBatchGetRequest,
+    BookBatchGetResponse,
+    BookCreate,
+    BookListAdapter,
+    BookProgress,
+    BookResponse,
+    BookUpdate,
+    LibraryOverviewAdapter,
+    LibraryOverviewResponse,
+    LibraryProgressResponse,
+    LocationLookupRequest,
+    LocationLookupResponse,
+    PageLookupRequest,
+    PageLookupResponse,
+)
+from app.utils.etag import etag_matches, not_modified, set_etag, weak_etag
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.serialization import pydantic_response
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(prefix="/books", tags=["books"])
-book_repo = BookRepository()
+book_repo = CachedBookRepository()
 
 
 @router.get("/", response_model=List[BookResponse])
 async def get_books(
     db: Annotated[AsyncSession, Depends(get_db)],
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    if_none_match: Annotated[Optional[str], Header()] = None,
 ):
     """Get all books for a user."""
-    return await book_repo.get_multi(db, skip=skip, limit=limit)
+    version = await book_repo.get_multi_version(db)
+    etag = weak_etag("books", skip, limit, *version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    books = await book_repo.get_multi(db, skip=skip, limit=limit)
+    return set_etag(pydantic_response(BookListAdapter, books), etag)
+
+
+@router.get("/library", response_model=LibraryOverviewResponse)
+async def get_library_overview(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    user: CurrentUser,
+    cursor: Optional[str] = None,
+    limit: Annotated[int, Query(ge=1, le=2000)] = 500,
+):
+    """Get the user's library with progress and highlight stats, one page per call."""
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    # Fetch one extra row to know whether another page follows
+    entries = await book_repo.get_library_overview(
+        db, UUID(user.sub), after=after, limit=limit + 1
+    )
+    next_cursor = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        last = entries[-1]
+        next_cursor = encode_cursor(last["date_added"], last["library_id"])
+    return pydantic_response(
+        LibraryOverviewAdapter, {"items": entries, "next_cursor": next_cursor}
+    )
+
+
+@router.post(":batchGet", response_model=BookBatchGetResponse)
+async def batch_get_books(
+    request: BookBatchGetRequest,
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    """Get several books by ID in one query, in the order requested."""
+    books = await book_repo.get_many(db, request.ids)
+    found = {book.id for book in books}
+    missing = [id for id in dict.fromkeys(request.ids) if id not in found]
+    return pydantic_response(
+        BookBatchGetAdapter, {"items": books, "missing": missing}
+    )
+
+
+@router.get("/in-progress", response_model=List[LibraryProgressResponse])
+async def get_books_in_progress(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    user: CurrentUser,
+    limit: int = 20
+):
+    """Get the user's books with reading progress, most recently read first."""
+    entries = await book_repo.get_in_progress(db, UUID(user.sub), limit=limit)
+    maps = await get_position_maps(db, (entry["book_id"] for entry in entries))
+    return [
+        {
+            **entry,
+            "epub_page": progress_page(entry["epub_progress"], maps.get(entry["book_id"])),
+        }
+        for entry in entries
+    ]
 
 
 @router.get("/{book_id}", response_model=BookResponse)
 async def get_book(
     book_id: UUID,
-    db: Annotated[AsyncSession, Depends(get_db)]
+    db: Annotated[AsyncSession, Depends(get_db)],
+    response: Response,
+    if_none_match: Annotated[Optional[str], Header()] = None,
 ):
     """Get a specific book by ID."""
+    # Served from the book cache, so the row itself is the cheap version probe
     book = await book_repo.get(db, book_id)
     if not book:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Book not found"
         )
+
+    etag = weak_etag("book", book_id, book.updated_at)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     return book
 
 
@@ -41,7 +144,10 @@ async def create_book(
     db: Annotated[AsyncSession, Depends(get_db)]
 ):
     """Create a new book."""
-    return await book_repo.create(db, book)
+    created = await book_repo.create(db, obj_in=book)
+    if book.rag_enabled:
+        get_rag_indexer().wake()
+    return created
 
 
 @router.put("/{book_id}", response_model=BookResponse)
@@ -51,11 +157,13 @@ async def update_book(
     db: Annotated[AsyncSession, Depends(get_db)]
 ):
     """Update a book."""
-    updated_book = await book_repo.update(db, book_id, book)
+    updated_book = await book_repo.update(db, id=book_id, obj_in=book)
     if not updated_book:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Book not found"
         )
+    if updated_book.rag_enabled or book.rag_enabled is not None:
+        get_rag_indexer().wake()
     return updated_book
 
 
@@ -65,23 +173,81 @@ async def delete_book(
     db: Annotated[AsyncSession, Depends(get_db)]
 ):
     """Delete a book."""
-    success = await book_repo.delete(db, book_id)
+    success = await book_repo.delete(db, id=book_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Book not found"
         )
 
 
-@router.put("/{book_id}/progress", response_model=BookResponse)
+@router.put("/{book_id}/progress", response_model=LibraryProgressResponse)
 async def update_book_progress(
     book_id: UUID,
     progress: BookProgress,
-    db: Annotated[AsyncSession, Depends(get_db)]
+    db: Annotated[AsyncSession, Depends(get_db)],
+    user: Annotated[TokenData, Depends(rate_limited("book_progress"))],
 ):
-    """Update a book's progress."""
-    updated_book = await book_repo.update_progress(db, book_id, progress.dict(exclude_unset=True))
-    if not updated_book:
+    """Update the user's progress for a book in their library."""
+    updated_progress = await book_repo.update_progress(
+        db, UUID(user.sub), book_id, progress.dict(exclude_unset=True)
+    )
+    if not updated_progress:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Book not in library"
+        )
+    maps = await get_position_maps(db, [book_id])
+    return {
+        **updated_progress,
+        "epub_page": progress_page(updated_progress["epub_progress"], maps.get(book_id)),
+    }
+
+
+async def _position_map(db: AsyncSession, book_id: UUID) -> PositionMap:
+    book = await book_repo.get(db, book_id)
+    if not book:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Book not found"
         )
-    return updated_book
+    positions = position_map(book)
+    if positions is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Book has no chapter character counts",
+        )
+    return positions
+
+
+@router.post("/{book_id}/positions:toPages", response_model=PageLookupResponse)
+async def locations_to_pages(
+    book_id: UUID,
+    request: PageLookupRequest,
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    """Map chapter offsets to estimated pages, in the order requested."""
+    positions = await _position_map(db, book_id)
+    return {
+        "pages": [
+            positions.page_of(location.chapter_index, location.char_offset)
+            for location in request.locations
+        ],
+        "total_pages": positions.total_pages,
+    }
+
+
+@router.post("/{book_id}/positions:toLocations", response_model=LocationLookupResponse)
+async def pages_to_locations(
+    book_id: UUID,
+    request: LocationLookupRequest,
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    """Map estimated pages to the chapter offsets they start at, in the order requested."""
+    positions = await _position_map(db, book_id)
+    locations = []
+    for page in request.pages:
+        location = positions.location_of(page)
+        locations.append(
+            None
+            if location is None
+            else {"chapter_index": location[0], "char_offset": location[1]}
+        )
+    return {"locations": locations, "total_pages": positions.total_pages}
@@ -0,0 +1,37 @@
+from typing import Annotated, List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from app.core.profiling import get_profile_store, valid_profile_token
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+
+def require_profile_token(
+    x_profile_token: Annotated[Optional[str], Header()] = None,
+) -> None:
+    """Hide the debug routes unless the caller presents the profiling token."""
+    if not valid_profile_token(x_profile_token):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+
+
+@router.get("/profiles", dependencies=[Depends(require_profile_token)])
+async def list_profiles() -> List[dict]:
+    """List stored request profiles, newest first."""
+    return get_profile_store().list()
+
+
+@router.get(
+    "/profiles/{request_id}",
+    response_class=PlainTextResponse,
+    dependencies=[Depends(require_profile_token)],
+)
+async def get_profile(request_id: str):
+    """Get a request profile as folded stacks for flamegraph.pl or speedscope."""
+    profile = get_profile_store().get(request_id)
+    if not profile:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found"
+        )
+    return PlainTextResponse(profile["folded"])
@@ -1,11 +1,14 @@
+import uuid
+from datetime import datetime, timezone
 from typing import Annotated, List, Optional
 from uuid import UUID
 
-from app.core.dependencies import get_current_user
 from app.core.database import get_db
-from app.models.feedback_models import Feedback
 from app.repositories.feedback import FeedbackRepository
+from app.schemas.auth import TokenData
 from app.schemas.feedback import FeedbackCreate, FeedbackResponse
+from app.services.auth import get_optional_user
+from app.services.feedback_queue import get_feedback_queue
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -13,27 +16,34 @@ router = APIRouter(prefix="/feedback", tags=["feedback"])
 feedback_repo = FeedbackRepository()
 
 
-@router.post("/", response_model=FeedbackResponse)
+@router.post(
+    "/", response_model=FeedbackResponse, status_code=status.HTTP_202_ACCEPTED
+)
 async def create_feedback(
     feedback: FeedbackCreate,
-    db: Annotated[AsyncSession, Depends(get_db)],
-    user: Annotated[Optional[dict], Depends(get_current_user)] = None
+    user: Annotated[Optional[TokenData], Depends(get_optional_user)],
 ):
     """
-    Create a new feedback entry.
-    """
-    db_feedback = Feedback(
-        user_id=user["id"] if user else None,
-        feedback_type=feedback.feedback_type,
-        description=feedback.description,
-        allow_follow_up=feedback.allow_follow_up,
-    )
+    Accept a new feedback entry.
 
-    db.add(db_feedback)
-    await db.commit()
-    await db.refresh(db_feedback)
-
-    return db_feedback
+    The entry is queued and written in a later batch, so it may take a
+    moment to show up in listings.
+    """
+    record = {
+        "id": uuid.uuid4(),
+        "user_id": UUID(user.sub) if user else None,
+        "feedback_type": feedback.feedback_type,
+        "description": feedback.description,
+        "allow_follow_up": feedback.allow_follow_up,
+        "created_at": datetime.now(timezone.utc),
+    }
+    if not get_feedback_queue().submit(record):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Feedback queue is full, try again shortly",
+            headers={"Retry-After": "5"},
+        )
+    return record
 
 @router.get("/", response_model=List[FeedbackResponse])
 async def get_feedback(
@@ -0,0 +1,37 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import ORJSONResponse
+
+from app.core.config import get_settings
+from app.repositories.supabase import SupabaseStorageClient, get_storage_client
+from app.services.health import DEGRADED, OK, get_readiness_probe
+
+router = APIRouter(tags=["health"])
+
+
+@router.get("/health", include_in_schema=False)
+@router.get("/health/live", include_in_schema=False)
+async def liveness():
+    """Report that the process is serving requests.
+
+    Touches no dependencies, so a database outage does not get the
+    process restarted.
+    """
+    return {"status": OK}
+
+
+@router.get("/health/ready", include_in_schema=False)
+async def readiness(
+    storage: Annotated[SupabaseStorageClient, Depends(get_storage_client)],
+):
+    """Report whether the process should receive traffic.
+
+    Responds 503 when the database is unreachable, and also when degraded
+    if ``READINESS_FAIL_ON_DEGRADED`` is set, so load balancers drain the node.
+    """
+    report = await get_readiness_probe().check(storage)
+    ready = report["status"] == OK or (
+        report["status"] == DEGRADED and not get_settings().READINESS_FAIL_ON_DEGRADED
+    )
+    return ORJSONResponse(report, status_code=200 if ready else 503)
@@ -1,14 +1,42 @@
+import os
 from typing import Annotated, List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    Header,
+    HTTPException,
+    Request,
+    status,
+)
+from fastapi.responses import StreamingResponse
 
-from app.core.dependencies import DatabaseSession, HighlightRepo
+from app.core.dependencies import CurrentUser, DatabaseSession, HighlightRepo
+from app.core.rate_limit import rate_limited
+from app.schemas.auth import TokenData
 from app.repositories.highlights import HighlightRepository
-from app.schemas.highlights import HighlightCreate, HighlightUpdate, HighlightResponse
-from app.core.dependencies import get_current_user
+from app.schemas.highlights import (
+    ExportFormat,
+    HighlightBatchDeleteRequest,
+    HighlightBatchDeleteResponse,
+    HighlightBatchGetAdapter,
+    HighlightBatchGetRequest,
+    HighlightBatchGetResponse,
+    HighlightCreate,
+    HighlightListAdapter,
+    HighlightResponse,
+    HighlightUpdate,
+    ImportStatusResponse,
+)
+from app.core.config import get_settings
 from app.core.database import get_db
-from app.models.highlight_models import Highlight
+from app.services import export as export_service
+from app.services import imports as import_service
+from app.services.positions import annotate_highlight_pages, get_position_maps
+from app.utils.etag import etag_matches, not_modified, set_etag, weak_etag
+from app.utils.serialization import pydantic_response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(prefix="/highlights", tags=["highlights"])
@@ -19,32 +47,42 @@ highlight_repo = HighlightRepository()
 async def get_book_highlights(
     book_id: UUID,
     db: Annotated[AsyncSession, Depends(get_db)],
-    highlight_repo: HighlightRepository = Depends(HighlightRepo),
-) -> List[HighlightResponse]:
-    """Get all highlights for a book."""
-    highlights = await highlight_repo.get_book_highlights(book_id)
-    return highlights
+    user: CurrentUser,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+):
+    """Get all highlights for a book.
+
+    Highlights without an estimated page get the page their chapter starts on.
+    """
+    user_id = UUID(user.sub)
+    version = await highlight_repo.get_book_highlights_version(db, user_id, book_id)
+    maps = await get_position_maps(db, [book_id])
+    # Estimated pages change with the book's character counts
+    positions_version = maps[book_id].version if book_id in maps else None
+    etag = weak_etag("highlights", user_id, book_id, *version, positions_version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    highlights = await highlight_repo.get_book_highlights(db, user_id, book_id)
+    highlights = annotate_highlight_pages(highlights, maps)
+    return set_etag(pydantic_response(HighlightListAdapter, highlights), etag)
 
 
 @router.post("/", response_model=HighlightResponse)
 async def create_highlight(
     highlight: HighlightCreate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    user: Annotated[Optional[dict], Depends(get_current_user)] = None
+    user: Annotated[TokenData, Depends(rate_limited("highlight_create"))],
 ):
     """
     Create a new highlight entry.
     """
-    db_highlight = Highlight(
-        user_id=user["id"] if user else None,
-        book_id=highlight.book_id,
-        text=highlight.text,
-        page_number=highlight.page_number,
-    )
-    db.add(db_highlight)
-    await db.commit()
-    await db.refresh(db_highlight)
-    return db_highlight
+    created = await highlight_repo.create_for_user(db, UUID(user.sub), highlight)
+    if not created:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Book not in library"
+        )
+    return created
 
 
 @router.put("/{highlight_id}", response_model=HighlightResponse)
@@ -67,11 +105,13 @@ async def update_highlight(
 async def delete_highlight(
     highlight_id: UUID,
     db: Annotated[AsyncSession, Depends(get_db)],
-    highlight_repo: HighlightRepository = Depends(HighlightRepo),
+    user: CurrentUser,
 ) -> None:
     """Delete a highlight."""
-    success = await highlight_repo.delete(highlight_id)
-    if not success:
+    deleted_ids = await highlight_repo.delete_by_ids(
+        db, UUID(user.sub), [highlight_id]
+    )
+    if not deleted_ids:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Highlight not found"
         )
@@ -81,26 +121,75 @@ async def delete_highlight(
 async def delete_highlights_by_text(
     text: str,
     db: Annotated[AsyncSession, Depends(get_db)],
-    highlight_repo: HighlightRepository = Depends(HighlightRepo),
+    user: CurrentUser,
 ) -> None:
     """Delete highlights by text content."""
-    success = await highlight_repo.delete_by_text(text)
-    if not success:
+    deleted_ids = await highlight_repo.delete_by_text(db, UUID(user.sub), text)
+    if not deleted_ids:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No highlights found with the given text",
         )
 
 
+@router.delete("/book/{book_id}", response_model=HighlightBatchDeleteResponse)
+async def delete_book_highlights(
+    book_id: UUID,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    user: CurrentUser,
+):
+    """Delete all of the user's highlights for a book."""
+    deleted_ids = await highlight_repo.delete_by_book(db, UUID(user.sub), book_id)
+    return HighlightBatchDeleteResponse(deleted_ids=deleted_ids)
+
+
+@router.post(":batchDelete", response_model=HighlightBatchDeleteResponse)
+async def batch_delete_highlights(
+    request: HighlightBatchDeleteRequest,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    user: CurrentUser,
+):
+    """Delete several highlights by ID; IDs not owned by the user are ignored."""
+    deleted_ids = await highlight_repo.delete_by_ids(
+        db, UUID(user.sub), request.ids
+    )
+    return HighlightBatchDeleteResponse(deleted_ids=deleted_ids)
+
+
+@router.post(":batchGet", response_model=HighlightBatchGetResponse)
+async def batch_get_highlights(
+    request: HighlightBatchGetRequest,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    user: CurrentUser,
+):
+    """Get several highlights by ID in one query, in the order requested.
+
+    IDs that do not exist or are not owned by the user are listed in
+    ``missing``.
+    """
+    highlights = await highlight_repo.get_highlights_by_ids(
+        db, UUID(user.sub), request.ids
+    )
+    maps = await get_position_maps(db, (highlight["book_id"] for highlight in highlights))
+    highlights = annotate_highlight_pages(highlights, maps)
+    found = {highlight["id"] for highlight in highlights}
+    missing = [id for id in dict.fromkeys(request.ids) if id not in found]
+    return pydantic_response(
+        HighlightBatchGetAdapter, {"items": highlights, "missing": missing}
+    )
+
+
 @router.put("/{highlight_id}/note", response_model=HighlightResponse)
 async def update_highlight_note(
     highlight_id: UUID,
     note: str,
     db: Annotated[AsyncSession, Depends(get_db)],
-    highlight_repo: HighlightRepository = Depends(HighlightRepo),
-) -> HighlightResponse:
+    user: CurrentUser,
+):
     """Update a highlight's note."""
-    updated_highlight = await highlight_repo.update_note(highlight_id, note)
+    updated_highlight = await highlight_repo.update_note(
+        db, UUID(user.sub), highlight_id, note
+    )
     if not updated_highlight:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Highlight not found"
@@ -108,6 +197,81 @@ async def update_highlight_note(
     return updated_highlight
 
 
+@router.get("/export")
+async def export_highlights(
+    user: CurrentUser,
+    format: ExportFormat = ExportFormat.NDJSON,
+):
+    """Export all of the user's highlights, grouped by book and chapter.
+
+    The body is streamed from a server-side cursor, so memory use does not
+    grow with the size of the export.
+    """
+    writer = export_service.get_writer(format)
+    filename = f"highlights.{writer.extension}"
+    return StreamingResponse(
+        export_service.export_highlights(UUID(user.sub), writer),
+        media_type=writer.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post(
+    "/import",
+    response_model=ImportStatusResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def import_highlights(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    user: CurrentUser,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    format: ExportFormat = ExportFormat.NDJSON,
+):
+    """Bulk-import highlights from an NDJSON or CSV request body.
+
+    Rows use the export columns and are matched to books in the user's
+    library by ``book_id`` or title. The import runs in the background;
+    poll ``GET /highlights/import/{id}`` for progress.
+    """
+    if format == ExportFormat.MARKDOWN:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Import supports ndjson and csv",
+        )
+    try:
+        path = await import_service.spool_request_body(
+            request, get_settings().IMPORT_MAX_BYTES
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e)
+        )
+
+    try:
+        job = await import_service.create_import(db, UUID(user.sub), format)
+    except BaseException:
+        os.unlink(path)
+        raise
+    background_tasks.add_task(import_service.run_import, job, path)
+    return job
+
+
+@router.get("/import/{import_id}", response_model=ImportStatusResponse)
+async def get_import_status(
+    import_id: UUID,
+    user: CurrentUser,
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    """Get the progress of a bulk highlight import."""
+    job = await import_service.get_import(db, UUID(user.sub), import_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Import not found"
+        )
+    return job
+
+
 @router.get("/{highlight_id}", response_model=HighlightResponse)
 async def get_highlight_by_id(
     highlight_id: UUID,
@@ -0,0 +1,41 @@
+import asyncio
+from typing import Annotated, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, HTTPException, Query, status
+
+from app.core.dependencies import CurrentUser, DatabaseSession
+from app.repositories.books import BookRepository
+from app.schemas.search import SearchResponse
+from app.services.semantic_search import get_semantic_index
+
+router = APIRouter(prefix="/search", tags=["search"])
+book_repo = BookRepository()
+
+
+@router.get("/", response_model=SearchResponse)
+async def search_books(
+    user: CurrentUser,
+    db: DatabaseSession,
+    q: Annotated[str, Query(min_length=1, max_length=500)],
+    book_id: Optional[UUID] = None,
+    limit: Annotated[int, Query(ge=1, le=50)] = 10,
+):
+    """Find the passages that best match ``q`` in the user's books with RAG enabled.
+
+    Searches the whole library unless ``book_id`` is given.
+    """
+    versions = await book_repo.get_rag_versions(db, UUID(user.sub), book_id)
+    if book_id is not None and not versions:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Book not in library or not enabled for search",
+        )
+    # Embedding the query and scoring the library are CPU-bound
+    hits, pending = await asyncio.to_thread(
+        get_semantic_index().search,
+        q,
+        {str(id): updated_at.isoformat() for id, updated_at in versions.items()},
+        limit,
+    )
+    return SearchResponse(items=hits, pending=pending)
@@ -0,0 +1,62 @@
+from collections import defaultdict
+from typing import Annotated, Dict, List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_db
+from app.core.dependencies import CurrentUser
+from app.models.sync_models import SyncEntity
+from app.repositories.sync import SyncRepository
+from app.schemas.sync import SyncResponse, SyncResponseAdapter, SyncTombstone
+from app.utils.pagination import decode_sync_cursor, encode_sync_cursor
+from app.utils.serialization import pydantic_response
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+sync_repo = SyncRepository()
+
+
+@router.get("/", response_model=SyncResponse)
+async def get_changes(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    user: CurrentUser,
+    cursor: Optional[str] = None,
+    limit: Annotated[int, Query(ge=1, le=5000)] = 500,
+):
+    """Get library entries, highlights and locations changed since ``cursor``.
+
+    Omit ``cursor`` for a full sync.
+    """
+    try:
+        after = decode_sync_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    user_id = UUID(user.sub)
+    changes, has_more = await sync_repo.get_changes(db, user_id, after, limit)
+
+    changed_ids: Dict[str, List[UUID]] = defaultdict(list)
+    deleted: List[SyncTombstone] = []
+    for change in changes:
+        if change.deleted:
+            deleted.append(
+                SyncTombstone(entity_type=change.entity_type, id=change.entity_id)
+            )
+        else:
+            changed_ids[change.entity_type].append(change.entity_id)
+
+    rows = await sync_repo.get_changed_rows(db, user_id, changed_ids)
+    return pydantic_response(
+        SyncResponseAdapter,
+        {
+            "cursor": encode_sync_cursor(int(changes[-1].txid), changes[-1].seq)
+            if changes
+            else cursor,
+            "has_more": has_more,
+            "library": rows[SyncEntity.LIBRARY],
+            "highlights": rows[SyncEntity.HIGHLIGHT],
+            "highlight_locations": rows[SyncEntity.HIGHLIGHT_LOCATION],
+            "deleted": deleted,
+        },
+    )
@@ -13,17 +13,15 @@ from fastapi import (
 )
 from pydantic import BaseModel, Field
 
+from app.core.rate_limit import rate_limited
 from app.repositories.supabase import (
     SupabaseStorageClient,
     get_storage_client,
 )
 from app.schemas.auth import TokenData
-from app.core.config import get_settings
-from app.services.auth import get_current_user
 
 router = APIRouter()
 logger = structlog.get_logger()
-settings = get_settings()
 
 
 class UploadResponse(BaseModel):
@@ -127,7 +125,7 @@ async def process_file_upload(
 async def upload_file(
     background_tasks: BackgroundTasks,
     file: UploadFile,
-    user: Annotated[TokenData, Depends(get_current_user)],
+    user: Annotated[TokenData, Depends(rate_limited("upload"))],
     book_id: str,
     storage_client: SupabaseStorageClient = Depends(get_storage_client),
 ):
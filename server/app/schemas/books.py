@@ -1,5 +1,9 @@
-from pydantic import BaseModel
+from datetime import datetime
+from pydantic import BaseModel, Field, TypeAdapter
 from typing import Optional, Dict, Any, List
+from uuid import UUID
+
+from app.models.book_models import BookFormat
 
 class BookCreate(BaseModel):
     title: str
@@ -12,11 +16,38 @@ class BookProgress(BaseModel):
     epub_progress: Optional[Dict[str, Any]] = None
     pdf_current_page: Optional[int] = None
 
+class LibraryProgressResponse(BaseModel):
+    book_id: UUID
+    epub_progress: Optional[Dict[str, Any]] = None
+    pdf_current_page: Optional[int] = None
+    updated_at: datetime
+    # Estimated page of epub_progress, when the book has chapter counts
+    epub_page: Optional[int] = None
+
+class LibraryEntryResponse(BaseModel):
+    library_id: UUID
+    book_id: UUID
+    title: str
+    author: Optional[str] = None
+    cover_url: Optional[str] = None
+    format: BookFormat
+    num_pages: Optional[int] = None
+    date_added: datetime
+    epub_progress: Optional[Dict[str, Any]] = None
+    pdf_current_page: Optional[int] = None
+    progress_updated_at: datetime
+    highlight_count: int = 0
+    last_highlight_at: Optional[datetime] = None
+
+class LibraryOverviewResponse(BaseModel):
+    items: List[LibraryEntryResponse]
+    next_cursor: Optional[str] = None
+
 class BookResponse(BaseModel):
-    id: str
+    id: UUID
     title: str
     author: Optional[str] = None
-    format: str
+    format: BookFormat
     file_url: Optional[str] = None
     rag_enabled: bool = False
     epub_progress: Optional[Dict[str, Any]] = None
@@ -28,5 +59,35 @@ class BookUpdate(BaseModel):
     format: Optional[str] = None
     file_url: Optional[str] = None
     rag_enabled: Optional[bool] = None
-    epub_progress: Optional[Dict[str, Any]] = None
-    pdf_current_page: Optional[int] = None 
\ No newline at end of file
+
+class BookLocation(BaseModel):
+    chapter_index: int = Field(..., ge=0)
+    char_offset: int = Field(0, ge=0)
+
+class PageLookupRequest(BaseModel):
+    locations: List[BookLocation] = Field(..., max_length=1000)
+
+class PageLookupResponse(BaseModel):
+    # In request order; null where the chapter does not exist
+    pages: List[Optional[int]]
+    total_pages: int
+
+class LocationLookupRequest(BaseModel):
+    pages: List[int] = Field(..., max_length=1000)
+
+class LocationLookupResponse(BaseModel):
+    # In request order; null where the page does not exist
+    locations: List[Optional[BookLocation]]
+    total_pages: int
+
+class BookBatchGetRequest(BaseModel):
+    ids: List[UUID] = Field(..., max_length=500)
+
+class BookBatchGetResponse(BaseModel):
+    items: List[BookResponse]
+    missing: List[UUID]
+
+# Precompiled adapters for the hot list responses
+BookListAdapter = TypeAdapter(List[BookResponse])
+BookBatchGetAdapter = TypeAdapter(BookBatchGetResponse)
+LibraryOverviewAdapter = TypeAdapter(LibraryOverviewResponse)
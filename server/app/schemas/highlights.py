@@ -1,8 +1,11 @@
 from datetime import datetime
-from typing import Optional, Dict, Any
+from enum import Enum
+from typing import Optional, Dict, Any, List
 from uuid import UUID
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, TypeAdapter
+
+from app.models.book_models import HighlightColor
 
 
 class HighlightBase(BaseModel):
@@ -10,7 +13,7 @@ class HighlightBase(BaseModel):
 
     book_id: UUID
     text: str
-    color: Optional[str] = None
+    color: Optional[HighlightColor] = None
     note: Optional[str] = None
     epub_range: Optional[Dict[str, Any]] = None
     epub_chapter_href: Optional[str] = None
@@ -30,7 +33,7 @@ class HighlightUpdate(BaseModel):
     """Schema for updating a highlight."""
 
     text: Optional[str] = None
-    color: Optional[str] = None
+    color: Optional[HighlightColor] = None
     note: Optional[str] = None
     epub_range: Optional[Dict[str, Any]] = None
     epub_chapter_href: Optional[str] = None
@@ -49,3 +52,64 @@ class HighlightResponse(HighlightBase):
 
     class Config:
         from_attributes = True
+
+
+class HighlightBatchGetRequest(BaseModel):
+    """Schema for fetching several highlights at once."""
+
+    ids: List[UUID] = Field(..., max_length=500)
+
+
+class HighlightBatchGetResponse(BaseModel):
+    """Schema for a batch get; ``items`` follow the requested order."""
+
+    items: List[HighlightResponse]
+    missing: List[UUID]
+
+
+# Precompiled adapters for the hot list responses
+HighlightListAdapter = TypeAdapter(List[HighlightResponse])
+HighlightBatchGetAdapter = TypeAdapter(HighlightBatchGetResponse)
+
+
+class HighlightBatchDeleteRequest(BaseModel):
+    """Schema for deleting several highlights at once."""
+
+    ids: List[UUID] = Field(..., max_length=1000)
+
+
+class HighlightBatchDeleteResponse(BaseModel):
+    """Schema for the IDs removed by a bulk delete."""
+
+    deleted_ids: List[UUID]
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+    MARKDOWN = "markdown"
+
+
+class ImportStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    MERGING = "merging"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class ImportStatusResponse(BaseModel):
+    """Progress of a bulk highlight import."""
+
+    id: UUID
+    user_id: UUID
+    format: ExportFormat
+    status: ImportStatus
+    rows_parsed: int = 0
+    rows_staged: int = 0
+    rows_skipped: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,20 @@
+from typing import List
+from uuid import UUID
+
+from pydantic import BaseModel
+
+
+class SearchHit(BaseModel):
+    book_id: UUID
+    chapter_index: int
+    # Character offsets into the chapter's text
+    start_char: int
+    end_char: int
+    text: str
+    score: float
+
+
+class SearchResponse(BaseModel):
+    items: List[SearchHit]
+    # Books whose index is missing or older than the book; results may lag for them
+    pending: List[UUID]
@@ -0,0 +1,61 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from pydantic import BaseModel, TypeAdapter
+
+from app.models.book_models import HighlightColor
+
+
+class LibrarySyncEntry(BaseModel):
+    id: UUID
+    book_id: UUID
+    date_added: datetime
+    epub_progress: Optional[Dict[str, Any]] = None
+    pdf_current_page: Optional[int] = None
+    updated_at: datetime
+
+
+class HighlightSyncEntry(BaseModel):
+    id: UUID
+    library_id: UUID
+    color: HighlightColor
+    text: str
+    note: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+
+class HighlightLocationSyncEntry(BaseModel):
+    id: UUID
+    highlight_id: UUID
+    chapter_idx: Optional[int] = None
+    chapter_href: Optional[str] = None
+    chapter_title: Optional[str] = None
+    page: Optional[int] = None
+    html_range: Optional[Dict[str, Any]] = None
+    pdf_rect_position: Optional[Dict[str, Any]] = None
+    created_at: datetime
+
+
+class SyncTombstone(BaseModel):
+    entity_type: str
+    id: UUID
+
+
+class SyncResponse(BaseModel):
+    """Rows changed since the request cursor.
+
+    Pass ``cursor`` back on the next call; keep calling while ``has_more``.
+    A tombstoned library entry or highlight implies its children are gone.
+    """
+
+    cursor: Optional[str] = None
+    has_more: bool
+    library: List[LibrarySyncEntry]
+    highlights: List[HighlightSyncEntry]
+    highlight_locations: List[HighlightLocationSyncEntry]
+    deleted: List[SyncTombstone]
+
+
+SyncResponseAdapter = TypeAdapter(SyncResponse)
@@ -0,0 +1,301 @@
+"""Production entry point: a pre-forking supervisor around uvicorn workers.
+
+The supervisor binds the listening socket, imports the application's
+modules, then forks ``WEB_CONCURRENCY`` workers (by default one per CPU
+this process may use). Workers share the imported modules' memory and skip
+the import cost; each one still builds the app, its logging thread, its
+database engine and its caches after the fork, since none of those
+survive one. Every worker gets a share of ``DB_CONNECTION_BUDGET`` as its
+pool size, exits after about ``WORKER_MAX_REQUESTS`` requests and is
+replaced, and on SIGTERM or SIGINT stops accepting connections and
+finishes in-flight requests for up to ``GRACEFUL_SHUTDOWN_SECONDS``.
+
+State that lives in a process is per worker: ``/metrics``, the book
+cache's entries, rate-limit buckets (unless a shared backend is set) and
+the feedback queue, whose spill file gets a per-worker suffix so workers
+never replay each other's files. A replacement worker takes over its
+slot's file. Book cache invalidations are not per worker: the supervisor
+maps the cache's invalidation counters before forking, so a write in one
+worker drops the entry in all of them.
+
+Usage:
+    python -m app.server --host 0.0.0.0 --port 3000
+    python -m app.server --workers 4 --app benchmarks.loadtest_app:create_app
+"""
+
+import argparse
+import asyncio
+import importlib
+import math
+import os
+import random
+import signal
+import socket
+import sys
+import time
+import traceback
+from types import FrameType
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import structlog
+
+from app.core.config import get_settings
+from app.utils.logging_config import restart_log_writer, setup_logging, shutdown_logging
+
+if TYPE_CHECKING:
+    import uvicorn
+
+logger = structlog.get_logger()
+
+# A worker that fails sooner than this after starting is treated as failing
+# to boot, and its replacement is delayed so a broken deploy does not spin
+MIN_WORKER_LIFETIME_SECONDS = 5
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on, honouring affinity and cgroup v2 quotas."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def worker_pool_size(budget: int, workers: int, pool_size: int) -> Tuple[int, int]:
+    """Split a connection budget into a per-worker pool size and overflow."""
+    per_worker = max(1, budget // workers)
+    size = min(pool_size, per_worker)
+    return size, per_worker - size
+
+
+async def _connection_limit(database_url: str, timeout: float) -> Optional[int]:
+    """Connections Postgres can still give this server, or None if it cannot be asked."""
+    import asyncpg
+
+    try:
+        conn = await asyncpg.connect(database_url, timeout=timeout)
+    except Exception as e:
+        logger.warning("Could not read max_connections", error=str(e))
+        return None
+    try:
+        limit: int = await conn.fetchval(
+            """
+            SELECT current_setting('max_connections')::int
+                 - current_setting('superuser_reserved_connections')::int
+                 - (SELECT count(*) FROM pg_stat_activity
+                    WHERE backend_type = 'client backend' AND pid <> pg_backend_pid())
+            """
+        )
+    finally:
+        await conn.close()
+    return limit
+
+
+def connection_budget(workers: int) -> int:
+    """``DB_CONNECTION_BUDGET``, lowered to what Postgres has left if that is less."""
+    settings = get_settings()
+    budget = settings.DB_CONNECTION_BUDGET
+    limit = asyncio.run(_connection_limit(settings.SUPABASE_DB_CONNECTION, timeout=5))
+    if limit is not None and limit < budget:
+        logger.warning(
+            "Connection budget exceeds what Postgres has free; lowering it",
+            budget=budget,
+            available=limit,
+        )
+        budget = max(workers, limit)
+    return budget
+
+
+def spill_path(base: str, slot: int) -> str:
+    root, ext = os.path.splitext(base)
+    return f"{root}.{slot}{ext}"
+
+
+class Supervisor:
+    """Fork workers onto a shared socket, replace those that exit, drain on signal."""
+
+    def __init__(
+        self,
+        config: "uvicorn.Config",
+        sock: socket.socket,
+        workers: int,
+        max_requests: int,
+        jitter: int,
+    ):
+        self.config = config
+        self.sock = sock
+        self.workers = workers
+        self.max_requests = max_requests
+        self.jitter = jitter
+        self.graceful_seconds = config.timeout_graceful_shutdown or 0
+        self.children: Dict[int, Tuple[int, float]] = {}
+        self.stopping = False
+        self.base_spill_path = get_settings().FEEDBACK_SPILL_PATH
+
+    def spawn(self, slot: int) -> None:
+        limit = (
+            self.max_requests + random.randint(0, self.jitter)
+            if self.max_requests
+            else None
+        )
+        pid = os.fork()
+        if pid == 0:
+            restart_log_writer()
+            status = 0
+            try:
+                self._run_worker(slot, limit)
+            except SystemExit as e:
+                status = e.code if isinstance(e.code, int) else 1
+            except BaseException:
+                traceback.print_exc()
+                status = 1
+            finally:
+                # Skip the supervisor's atexit handlers and buffered state,
+                # but write out this worker's queued log records first
+                shutdown_logging()
+                os._exit(status)
+        self.children[pid] = (slot, time.monotonic())
+        logger.info("Worker started", pid=pid, slot=slot, max_requests=limit)
+
+    def _run_worker(self, slot: int, limit: Optional[int]) -> None:
+        import uvicorn
+
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(sig, signal.SIG_DFL)
+        os.environ["FEEDBACK_SPILL_PATH"] = spill_path(self.base_spill_path, slot)
+        get_settings.cache_clear()
+        self.config.limit_max_requests = limit
+        uvicorn.Server(self.config).run(sockets=[self.sock])
+
+    def stop(self, signum: int, frame: Optional[FrameType]) -> None:
+        if not self.stopping:
+            logger.info("Draining workers", signal=signal.Signals(signum).name)
+        self.stopping = True
+
+    def run(self) -> None:
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self.stop)
+        for slot in range(self.workers):
+            self.spawn(slot)
+
+        kill_at = None
+        while self.children:
+            if self.stopping and kill_at is None:
+                for pid in self.children:
+                    os.kill(pid, signal.SIGTERM)
+                # Workers get the graceful period plus time for lifespan shutdown
+                kill_at = time.monotonic() + self.graceful_seconds + 10
+            if kill_at is not None and time.monotonic() > kill_at:
+                logger.warning(
+                    "Workers did not drain in time", pids=list(self.children)
+                )
+                for pid in self.children:
+                    os.kill(pid, signal.SIGKILL)
+                kill_at = float("inf")
+
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                time.sleep(0.1)
+                continue
+            slot, started = self.children.pop(pid)
+            if self.stopping:
+                continue
+            lifetime = time.monotonic() - started
+            exit_code = os.waitstatus_to_exitcode(status)
+            logger.info("Worker exited", pid=pid, slot=slot, status=exit_code)
+            if exit_code != 0 and lifetime < MIN_WORKER_LIFETIME_SECONDS:
+                time.sleep(MIN_WORKER_LIFETIME_SECONDS - lifetime)
+                if self.stopping:
+                    continue
+            self.spawn(slot)
+        logger.info("All workers stopped")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import uvicorn
+
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--app", default="app.main:create_app", help="app factory, module:callable"
+    )
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8008)
+    parser.add_argument(
+        "--workers", type=int, default=settings.WEB_CONCURRENCY or available_cpus()
+    )
+    parser.add_argument(
+        "--max-requests", type=int, default=settings.WORKER_MAX_REQUESTS
+    )
+    parser.add_argument(
+        "--max-requests-jitter", type=int, default=settings.WORKER_MAX_REQUESTS_JITTER
+    )
+    parser.add_argument(
+        "--no-preload", action="store_true", help="import the app in each worker"
+    )
+    parser.add_argument("--log-level", default=settings.LOG_LEVEL.lower())
+    args = parser.parse_args(argv)
+
+    # The supervisor logs in the same format as the workers; each worker
+    # restarts the writer thread after the fork and reuses the rest
+    setup_logging()
+
+    # Children read pool sizes from the environment when they rebuild Settings
+    pool_size, max_overflow = worker_pool_size(
+        connection_budget(args.workers), args.workers, settings.DB_POOL_SIZE
+    )
+    os.environ["DB_POOL_SIZE"] = str(pool_size)
+    os.environ["DB_MAX_OVERFLOW"] = str(max_overflow)
+    os.environ["DB_POOL_WARMUP_CONNECTIONS"] = str(
+        min(settings.DB_POOL_WARMUP_CONNECTIONS, pool_size)
+    )
+    logger.info(
+        "Starting workers",
+        workers=args.workers,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        preload=not args.no_preload,
+    )
+
+    # Created before forking so every worker maps the same counters and a
+    # book cache invalidation in one worker reaches the others
+    from app.core.cache import get_invalidation_counters
+
+    get_invalidation_counters()
+
+    if not args.no_preload:
+        # Importing opens no connections and starts no threads, so it is
+        # safe before fork; building the app is not and happens per worker
+        module_name = args.app.partition(":")[0]
+        importlib.import_module(module_name)
+        importlib.import_module("app.main").preload()
+
+    config = uvicorn.Config(
+        args.app,
+        factory=True,
+        host=args.host,
+        port=args.port,
+        log_level=args.log_level,
+        # AccessLogMiddleware already logs requests
+        access_log=False,
+        # Leave uvicorn's loggers to the root handler setup_logging installed
+        log_config=None,
+        timeout_graceful_shutdown=settings.GRACEFUL_SHUTDOWN_SECONDS,
+    )
+    sock = config.bind_socket()
+    Supervisor(
+        config, sock, args.workers, args.max_requests, args.max_requests_jitter
+    ).run()
+    sock.close()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import csv
+import io
+from typing import Any, AsyncIterator, Dict, List, Optional
+from uuid import UUID
+
+import orjson
+import structlog
+
+from app.core.database import async_session
+from app.repositories.highlights import HighlightRepository
+from app.schemas.highlights import ExportFormat
+from app.utils.serialization import orjson_default
+
+logger = structlog.get_logger()
+highlight_repo = HighlightRepository()
+
+# Rows fetched from the server-side cursor per round trip
+EXPORT_BATCH_SIZE = 1000
+
+CSV_COLUMNS = [
+    "book_title",
+    "book_author",
+    "chapter_idx",
+    "chapter_title",
+    "page",
+    "color",
+    "text",
+    "note",
+    "created_at",
+]
+
+
+class NDJSONWriter:
+    media_type = "application/x-ndjson"
+    extension = "ndjson"
+
+    def header(self) -> bytes:
+        return b""
+
+    def write(self, rows: List[Dict[str, Any]]) -> bytes:
+        return b"".join(
+            orjson.dumps(dict(row), default=orjson_default) + b"\n" for row in rows
+        )
+
+
+class CSVWriter:
+    media_type = "text/csv; charset=utf-8"
+    extension = "csv"
+
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def header(self) -> bytes:
+        self._writer.writerow(CSV_COLUMNS)
+        return self._flush()
+
+    def write(self, rows: List[Dict[str, Any]]) -> bytes:
+        for row in rows:
+            self._writer.writerow(
+                [
+                    row["color"].value if column == "color" else row[column]
+                    for column in CSV_COLUMNS
+                ]
+            )
+        return self._flush()
+
+    def _flush(self) -> bytes:
+        data = self._buffer.getvalue().encode()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+
+class MarkdownWriter:
+    """Writes one section per book and a subsection per chapter."""
+
+    media_type = "text/markdown; charset=utf-8"
+    extension = "md"
+
+    def __init__(self):
+        self._book_id: Optional[UUID] = None
+        self._chapter: Optional[Any] = None
+
+    def header(self) -> bytes:
+        return b"# Highlights\n"
+
+    def write(self, rows: List[Dict[str, Any]]) -> bytes:
+        parts: List[str] = []
+        for row in rows:
+            if row["book_id"] != self._book_id:
+                self._book_id = row["book_id"]
+                # A book whose highlights have no chapter gets no subheading
+                self._chapter = (None, None)
+                title = row["book_title"]
+                if row["book_author"]:
+                    title = f"{title} by {row['book_author']}"
+                parts.append(f"\n## {title}\n")
+
+            chapter = (row["chapter_idx"], row["chapter_title"])
+            if chapter != self._chapter:
+                self._chapter = chapter
+                chapter_idx, chapter_title = chapter
+                if chapter_title:
+                    heading = chapter_title
+                elif chapter_idx is not None:
+                    heading = f"Chapter {chapter_idx + 1}"
+                else:
+                    # Highlights without a chapter (e.g. PDFs) sort last
+                    heading = "Other highlights"
+                parts.append(f"\n### {heading}\n")
+
+            quote = "\n".join(f"> {line}" for line in row["text"].splitlines())
+            parts.append(f"\n{quote}\n")
+            if row["note"]:
+                parts.append(f"\n**Note:** {row['note']}\n")
+        return "".join(parts).encode()
+
+
+WRITERS = {
+    ExportFormat.NDJSON: NDJSONWriter,
+    ExportFormat.CSV: CSVWriter,
+    ExportFormat.MARKDOWN: MarkdownWriter,
+}
+
+
+def get_writer(export_format: ExportFormat):
+    return WRITERS[export_format]()
+
+
+async def export_highlights(user_id: UUID, writer: Any) -> AsyncIterator[bytes]:
+    """Stream a user's highlights in the writer's format.
+
+    Owns its database session: the response body is produced after the
+    request's dependencies have already been torn down.
+    """
+    yield writer.header()
+    exported = 0
+    async with async_session() as db:
+        async for batch in highlight_repo.stream_export_rows(
+            db, user_id, EXPORT_BATCH_SIZE
+        ):
+            exported += len(batch)
+            yield writer.write(batch)
+    logger.info("Highlights exported", user_id=str(user_id), count=exported)
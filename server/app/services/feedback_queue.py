@@ -0,0 +1,276 @@
+import asyncio
+import os
+from datetime import datetime
+from functools import cache
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+import orjson
+import structlog
+
+from app.core.config import get_settings
+from app.core.database import async_session
+from app.core.metrics import REGISTRY
+from app.models.feedback_models import FeedbackType
+from app.repositories.feedback import FeedbackRepository
+
+logger = structlog.get_logger()
+feedback_repo = FeedbackRepository()
+
+FEEDBACK_QUEUE_DEPTH = REGISTRY.gauge(
+    "feedback_queue_depth", "Feedback submissions waiting to be written."
+)
+FEEDBACK_RECORDS = REGISTRY.counter(
+    "feedback_queue_records", "Feedback submissions by outcome.", ("outcome",)
+)
+
+
+# Queued by stop() to end the flush task once everything before it is written
+_STOP = object()
+
+
+def _encode_record(record: Dict[str, Any]) -> bytes:
+    return orjson.dumps(record) + b"\n"
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def _decode_record(line: bytes) -> Dict[str, Any]:
+    record = orjson.loads(line)
+    record["id"] = UUID(record["id"])
+    if record.get("user_id"):
+        record["user_id"] = UUID(record["user_id"])
+    record["feedback_type"] = FeedbackType(record["feedback_type"])
+    record["created_at"] = datetime.fromisoformat(record["created_at"])
+    return record
+
+
+class FeedbackQueue:
+    """Bounded write-behind queue for feedback submissions.
+
+    Submissions are acknowledged as soon as they are queued. A background
+    task flushes them with multi-row inserts once ``batch_size`` records are
+    waiting or ``flush_interval`` seconds after the first one arrived. When
+    the database is unavailable a batch is appended to an NDJSON spill file
+    and replayed after the next successful flush. Records carry their own
+    IDs and inserts skip existing rows, so replaying a batch twice is safe.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        batch_size: int,
+        flush_interval: float,
+        spill_path: str,
+        session_factory=async_session,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path
+        self._session_factory = session_factory
+        self._queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=max_size)
+        self._task: Optional[asyncio.Task] = None
+        # Batch taken off the queue but not yet written, kept for shutdown
+        self._pending: List[Dict[str, Any]] = []
+        self.flushed = 0
+        self.spilled = 0
+        self.rejected = 0
+
+    def submit(self, record: Dict[str, Any]) -> bool:
+        """Queue a feedback row; returns False when the queue is full."""
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush task and write out everything still queued.
+
+        The task is stopped with a sentinel rather than cancelled, so it
+        finishes the batch it is collecting or writing before it exits.
+        """
+        if self._task is not None:
+            if not self._task.done():
+                await self._queue.put(_STOP)
+            try:
+                await self._task
+            except Exception:
+                logger.exception("Feedback writer failed")
+            self._task = None
+
+        batch, self._pending = self._pending, []
+        while not self._queue.empty():
+            record = self._queue.get_nowait()
+            if record is not _STOP:
+                batch.append(record)
+        for start in range(0, len(batch), self.batch_size):
+            await self._flush(batch[start : start + self.batch_size])
+        logger.info(
+            "Feedback queue drained",
+            flushed=self.flushed,
+            spilled=self.spilled,
+            rejected=self.rejected,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "max_size": self._queue.maxsize,
+            "flushed": self.flushed,
+            "spilled": self.spilled,
+            "rejected": self.rejected,
+        }
+
+    async def _run(self) -> None:
+        try:
+            await self._replay_spill()
+        except Exception:
+            logger.exception("Feedback spill replay failed")
+        while True:
+            stopping = False
+            try:
+                stopping = await self._next_batch()
+                await self._flush(self._pending)
+                self._pending = []
+            except Exception:
+                # The batch stays in _pending and is retried with the next one
+                logger.exception("Feedback writer failed", count=len(self._pending))
+                if not stopping:
+                    await asyncio.sleep(self.flush_interval)
+            if stopping:
+                return
+
+    async def _next_batch(self) -> bool:
+        """Collect records into ``_pending`` until the batch is full or due.
+
+        Waits for a first record if there is none. Returns True once the
+        stop sentinel has been taken, leaving what was collected to flush.
+        """
+        loop = asyncio.get_running_loop()
+        if not self._pending:
+            record = await self._queue.get()
+            if record is _STOP:
+                return True
+            self._pending.append(record)
+        deadline = loop.time() + self.flush_interval
+        while len(self._pending) < self.batch_size:
+            while len(self._pending) < self.batch_size and not self._queue.empty():
+                record = self._queue.get_nowait()
+                if record is _STOP:
+                    return True
+                self._pending.append(record)
+            remaining = deadline - loop.time()
+            if len(self._pending) >= self.batch_size or remaining <= 0:
+                break
+            try:
+                record = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if record is _STOP:
+                return True
+            self._pending.append(record)
+        return False
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        if not batch:
+            return
+        try:
+            await self._insert(batch)
+        except Exception:
+            logger.exception("Feedback flush failed, spilling", count=len(batch))
+            self._spill(batch)
+            return
+        self.flushed += len(batch)
+        await self._replay_spill()
+
+    async def _insert(self, batch: List[Dict[str, Any]]) -> None:
+        async with self._session_factory() as db:
+            await feedback_repo.create_many(db, batch)
+
+    def _spill(self, batch: List[Dict[str, Any]]) -> None:
+        with open(self.spill_path, "ab") as f:
+            # End a line cut short by an earlier crash so it stays on its own
+            if f.tell() and not _ends_with_newline(self.spill_path):
+                f.write(b"\n")
+            f.writelines(_encode_record(record) for record in batch)
+            f.flush()
+            os.fsync(f.fileno())
+        self.spilled += len(batch)
+
+    async def _replay_spill(self) -> None:
+        """Insert spilled records; the file is removed once all are written.
+
+        Lines that cannot be decoded, such as one cut short by a crash
+        mid-write, are moved to ``<spill_path>.bad`` instead of blocking the
+        rest.
+        """
+        if not os.path.exists(self.spill_path):
+            return
+        records = []
+        good_lines = []
+        bad_lines = []
+        with open(self.spill_path, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    records.append(_decode_record(line))
+                    good_lines.append(line.rstrip(b"\n") + b"\n")
+                except (KeyError, TypeError, ValueError):
+                    bad_lines.append(line.rstrip(b"\n") + b"\n")
+        if bad_lines:
+            with open(f"{self.spill_path}.bad", "ab") as f:
+                f.writelines(bad_lines)
+            # Rewrite the spill without them so a failed replay does not
+            # quarantine them again
+            tmp_path = f"{self.spill_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.writelines(good_lines)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.spill_path)
+            logger.warning(
+                "Quarantined unreadable spilled feedback",
+                count=len(bad_lines),
+                path=f"{self.spill_path}.bad",
+            )
+        try:
+            for start in range(0, len(records), self.batch_size):
+                await self._insert(records[start : start + self.batch_size])
+        except Exception:
+            logger.warning("Feedback spill replay failed", count=len(records))
+            return
+        os.unlink(self.spill_path)
+        self.flushed += len(records)
+        logger.info("Replayed spilled feedback", count=len(records))
+
+
+@cache
+def get_feedback_queue() -> FeedbackQueue:
+    """Get the process-wide feedback queue."""
+    settings = get_settings()
+    queue = FeedbackQueue(
+        max_size=settings.FEEDBACK_QUEUE_MAX_SIZE,
+        batch_size=settings.FEEDBACK_FLUSH_BATCH_SIZE,
+        flush_interval=settings.FEEDBACK_FLUSH_INTERVAL_SECONDS,
+        spill_path=settings.FEEDBACK_SPILL_PATH,
+    )
+
+    def collect() -> None:
+        stats = queue.stats()
+        FEEDBACK_QUEUE_DEPTH.set(stats["queued"])
+        for outcome in ("flushed", "spilled", "rejected"):
+            FEEDBACK_RECORDS.labels(outcome).set(stats[outcome])
+
+    REGISTRY.on_collect(collect)
+    return queue
@@ -0,0 +1,119 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from functools import cache
+from typing import Any, Awaitable, Dict, Optional
+
+import structlog
+
+from app.core.config import get_settings
+from app.core.database import get_engine
+from app.core.metrics import REGISTRY
+
+logger = structlog.get_logger()
+
+HEALTH_CHECK_UP = REGISTRY.gauge(
+    "health_check_up",
+    "Whether the last readiness check of a dependency passed.",
+    ("check",),
+)
+
+OK = "ok"
+DEGRADED = "degraded"
+DOWN = "down"
+UNAVAILABLE = "unavailable"
+
+
+class ReadinessProbe:
+    """Cached readiness checks for the database pool and storage.
+
+    A result is reused for ``ttl`` seconds, and probes that arrive while a
+    check is running wait for that check instead of starting their own, so
+    a storm of probes costs at most one round trip per dependency per
+    ``ttl``. The database being down makes the process unavailable; storage
+    being down or the pool being exhausted only degrades it.
+    """
+
+    def __init__(self, ttl: float, timeout: float, pool_capacity: int):
+        self.ttl = ttl
+        self.timeout = timeout
+        self.pool_capacity = pool_capacity
+        self._result: Optional[Dict[str, Any]] = None
+        self._checked_at = 0.0
+        self._inflight: Optional[asyncio.Task] = None
+
+    async def check(self, storage) -> Dict[str, Any]:
+        """Get the latest readiness report, running the checks if it is stale."""
+        if self._result is not None and time.monotonic() - self._checked_at < self.ttl:
+            return self._result
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._run(storage))
+            self._inflight.add_done_callback(self._finished)
+        # Shielded so a probe that disconnects does not cancel the shared check
+        return await asyncio.shield(self._inflight)
+
+    def _finished(self, task: asyncio.Task) -> None:
+        self._inflight = None
+        if not task.cancelled() and task.exception() is None:
+            self._result = task.result()
+            self._checked_at = time.monotonic()
+
+    async def _run(self, storage) -> Dict[str, Any]:
+        database, storage_result = await asyncio.gather(
+            self._check_database(), self._timed(storage.ping(self.timeout))
+        )
+        checks = {"database": database, "storage": storage_result}
+        for name, result in checks.items():
+            HEALTH_CHECK_UP.labels(name).set(1 if result["status"] == OK else 0)
+
+        if database["status"] == DOWN:
+            status = UNAVAILABLE
+        elif any(result["status"] != OK for result in checks.values()):
+            status = DEGRADED
+        else:
+            status = OK
+        if status != OK:
+            logger.warning("Readiness check failed", status=status, checks=checks)
+        return {
+            "status": status,
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+            "checks": checks,
+        }
+
+    async def _timed(self, check: Awaitable[Any]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(check, self.timeout)
+        except asyncio.TimeoutError:
+            return {"status": DOWN, "error": f"timed out after {self.timeout}s"}
+        except Exception as e:
+            return {"status": DOWN, "error": str(e)}
+        return {
+            "status": OK,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+
+    async def _check_database(self) -> Dict[str, Any]:
+        pool = get_engine().pool
+        stats = {"checked_out": pool.checkedout(), "capacity": self.pool_capacity}
+        if stats["checked_out"] >= self.pool_capacity:
+            # A checkout would queue behind requests and time out, which says
+            # nothing about whether Postgres itself is reachable
+            return {"status": DEGRADED, "error": "connection pool exhausted", **stats}
+
+        async def ping() -> None:
+            async with get_engine().connect() as conn:
+                await conn.exec_driver_sql("SELECT 1")
+
+        return {**await self._timed(ping()), **stats}
+
+
+@cache
+def get_readiness_probe() -> ReadinessProbe:
+    """Get the process-wide readiness probe."""
+    settings = get_settings()
+    return ReadinessProbe(
+        ttl=settings.HEALTH_CACHE_TTL_SECONDS,
+        timeout=settings.HEALTH_CHECK_TIMEOUT_SECONDS,
+        pool_capacity=settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW,
+    )
@@ -0,0 +1,247 @@
+import asyncio
+import csv
+import io
+import os
+import tempfile
+import uuid
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+import orjson
+import structlog
+
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import async_session
+from app.models.book_models import HighlightColor
+from app.repositories.highlights import HighlightRepository
+from app.repositories.imports import HighlightImportRepository
+from app.schemas.highlights import ExportFormat, ImportStatus, ImportStatusResponse
+
+logger = structlog.get_logger()
+highlight_repo = HighlightRepository()
+import_repo = HighlightImportRepository()
+
+# Parsed rows sent to the staging table per COPY
+IMPORT_BATCH_SIZE = 5000
+# How long finished imports are kept around for status polling
+IMPORT_STATUS_RETENTION = timedelta(days=1)
+
+
+async def create_import(
+    db: AsyncSession, user_id: UUID, export_format: ExportFormat
+) -> ImportStatusResponse:
+    """Register a new import so its progress can be polled from any worker."""
+    job = ImportStatusResponse(
+        id=uuid.uuid4(),
+        user_id=user_id,
+        format=export_format,
+        status=ImportStatus.PENDING,
+        created_at=datetime.now(timezone.utc),
+    )
+    await import_repo.delete_finished_before(
+        db, job.created_at - IMPORT_STATUS_RETENTION
+    )
+    await import_repo.create_job(db, job)
+    return job
+
+
+async def get_import(
+    db: AsyncSession, user_id: UUID, import_id: UUID
+) -> Optional[ImportStatusResponse]:
+    return await import_repo.get_for_user(db, user_id, import_id)
+
+
+async def spool_request_body(request: Request, max_bytes: int) -> str:
+    """Write the raw request body to a temporary file as it arrives.
+
+    Raises:
+        ValueError: If the body is larger than ``max_bytes``
+    """
+    size = 0
+    with tempfile.NamedTemporaryFile(prefix="highlight-import-", delete=False) as f:
+        try:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError(f"Import exceeds {max_bytes} bytes")
+                f.write(chunk)
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+    return f.name
+
+
+def iter_rows(path: str, export_format: ExportFormat) -> Iterator[Any]:
+    """Read an uploaded NDJSON or CSV file one row at a time.
+
+    NDJSON lines are yielded undecoded so ``parse_row`` can skip a bad one
+    without ending the import.
+    """
+    with open(path, "rb") as f:
+        if export_format == ExportFormat.NDJSON:
+            for line in f:
+                if line.strip():
+                    yield line
+        else:
+            yield from csv.DictReader(io.TextIOWrapper(f, encoding="utf-8-sig"))
+
+
+def parse_row(raw: Any, export_format: ExportFormat) -> Dict[str, Any]:
+    """Decode a row from ``iter_rows``.
+
+    Raises:
+        ValueError: If the row is not valid JSON or not an object
+    """
+    row = orjson.loads(raw) if export_format == ExportFormat.NDJSON else raw
+    if not isinstance(row, dict):
+        raise ValueError("Row is not an object")
+    return row
+
+
+def _optional_int(value: Any) -> Optional[int]:
+    return int(value) if value not in (None, "") else None
+
+
+def _optional_str(value: Any) -> Optional[str]:
+    return str(value) if value not in (None, "") else None
+
+
+class LibraryIndex:
+    """Resolves an imported row to one of the user's library entries."""
+
+    def __init__(self, targets: List[Dict[str, Any]]):
+        self.by_book_id = {str(t["book_id"]): t["library_id"] for t in targets}
+        self.by_title = {t["title"].strip().lower(): t["library_id"] for t in targets}
+
+    def resolve(self, row: Dict[str, Any]) -> Optional[UUID]:
+        book_id = row.get("book_id")
+        if book_id and str(book_id) in self.by_book_id:
+            return self.by_book_id[str(book_id)]
+        title = row.get("book_title")
+        if title:
+            return self.by_title.get(str(title).strip().lower())
+        return None
+
+
+def to_staging_record(
+    row_num: int, row: Dict[str, Any], library: LibraryIndex
+) -> Optional[Tuple]:
+    """Convert a parsed row to a staging tuple, or None if it cannot be imported."""
+    library_id = library.resolve(row)
+    text = _optional_str(row.get("text"))
+    if library_id is None or text is None:
+        return None
+
+    try:
+        color = HighlightColor(row.get("color") or HighlightColor.YELLOW.value)
+    except ValueError:
+        color = HighlightColor.YELLOW
+    created_at = row.get("created_at")
+
+    return (
+        row_num,
+        library_id,
+        color.value,
+        text,
+        _optional_str(row.get("note")),
+        _optional_int(row.get("chapter_idx")),
+        _optional_str(row.get("chapter_href")),
+        _optional_str(row.get("chapter_title")),
+        _optional_int(row.get("page")),
+        datetime.fromisoformat(created_at) if created_at else None,
+    )
+
+
+def read_batch(
+    rows: Iterator[Any],
+    first_row_num: int,
+    export_format: ExportFormat,
+    library: LibraryIndex,
+) -> Tuple[int, List[Tuple]]:
+    """Parse up to ``IMPORT_BATCH_SIZE`` rows into staging tuples.
+
+    Returns how many rows were read and the tuples of those that can be
+    imported. Runs in a worker thread, so it must not touch the event loop.
+    """
+    count = 0
+    records = []
+    for row_num, raw in enumerate(islice(rows, IMPORT_BATCH_SIZE), first_row_num):
+        count += 1
+        try:
+            record = to_staging_record(row_num, parse_row(raw, export_format), library)
+        except (TypeError, ValueError):
+            record = None
+        if record is not None:
+            records.append(record)
+    return count, records
+
+
+async def run_import(
+    job: ImportStatusResponse, path: str, session_factory=async_session
+) -> None:
+    """Parse an uploaded file, COPY it into staging and merge it in one transaction.
+
+    Progress is written to ``highlight_imports`` through a second session, as
+    the import's own transaction is not visible until it commits.
+    """
+
+    async def save_progress() -> None:
+        async with session_factory() as status_db:
+            await import_repo.save_job(status_db, job)
+
+    job.status = ImportStatus.RUNNING
+    try:
+        await save_progress()
+        async with session_factory() as db:
+            library = LibraryIndex(
+                await highlight_repo.get_import_targets(db, job.user_id)
+            )
+            await highlight_repo.create_import_staging(db)
+
+            # Reading and parsing a batch is CPU-bound, so it runs off the loop
+            with closing(iter_rows(path, job.format)) as rows:
+                while True:
+                    count, batch = await asyncio.to_thread(
+                        read_batch, rows, job.rows_parsed, job.format, library
+                    )
+                    if not count:
+                        break
+                    job.rows_parsed += count
+                    job.rows_skipped += count - len(batch)
+                    if batch:
+                        await highlight_repo.copy_to_import_staging(db, batch)
+                        job.rows_staged += len(batch)
+                    await save_progress()
+
+            job.status = ImportStatus.MERGING
+            await save_progress()
+            job.imported = await highlight_repo.merge_import_staging(db)
+            job.duplicates = job.rows_staged - job.imported
+            await db.commit()
+
+        job.status = ImportStatus.COMPLETED
+        logger.info(
+            "Highlight import completed",
+            import_id=str(job.id),
+            parsed=job.rows_parsed,
+            imported=job.imported,
+            duplicates=job.duplicates,
+            skipped=job.rows_skipped,
+        )
+    except Exception as e:
+        job.status = ImportStatus.FAILED
+        job.error = str(e)
+        logger.exception("Highlight import failed", import_id=str(job.id))
+    finally:
+        job.finished_at = datetime.now(timezone.utc)
+        os.unlink(path)
+        try:
+            await save_progress()
+        except Exception:
+            logger.exception("Failed to save highlight import", import_id=str(job.id))
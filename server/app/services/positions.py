@@ -0,0 +1,174 @@
+import math
+from bisect import bisect_right
+from datetime import datetime
+from functools import cache
+from itertools import accumulate
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import LRUCache
+from app.core.config import get_settings
+from app.models.book_models import BookMetadata
+from app.repositories.books import CachedBookRepository
+
+book_repo = CachedBookRepository()
+
+# Characters per estimated page when a book has no page counts; matches the
+# web reader's page size
+PAGE_CHARS = 2300
+
+
+class PositionMap:
+    """Converts between chapter offsets and estimated pages for one book.
+
+    Positions are character offsets into the book's text as the reader
+    counts it, chapter by chapter in spine order. ``chapter_starts[i]`` is
+    where chapter ``i`` begins and the last entry is the book's length;
+    ``page_starts`` does the same for pages when the book has
+    ``epub_page_char_counts``, and pages are ``PAGE_CHARS`` long otherwise.
+    Both are built once, so every lookup is a binary search. ``version`` is
+    the book's ``updated_at`` when the map was built.
+    """
+
+    def __init__(
+        self,
+        chapter_counts: Sequence[int],
+        page_counts: Optional[Sequence[int]] = None,
+        version: Optional[datetime] = None,
+    ):
+        self.version = version
+        self.chapter_starts = list(accumulate(chapter_counts, initial=0))
+        self.page_starts = (
+            list(accumulate(page_counts, initial=0)) if page_counts else None
+        )
+
+    @property
+    def total_chars(self) -> int:
+        return self.chapter_starts[-1]
+
+    @property
+    def total_pages(self) -> int:
+        if self.page_starts is not None:
+            return len(self.page_starts) - 1
+        return max(1, math.ceil(self.total_chars / PAGE_CHARS))
+
+    def offset(self, chapter: int, char: int = 0) -> Optional[int]:
+        """Book-wide offset of a chapter offset, or None if there is no such chapter.
+
+        Offsets past the chapter's end are clamped to it.
+        """
+        if not 0 <= chapter < len(self.chapter_starts) - 1:
+            return None
+        start = self.chapter_starts[chapter]
+        return start + min(max(char, 0), self.chapter_starts[chapter + 1] - start)
+
+    def page_at(self, offset: int) -> int:
+        """The 1-based page holding a book-wide offset."""
+        if self.page_starts is None:
+            page = offset // PAGE_CHARS + 1
+        else:
+            page = bisect_right(self.page_starts, offset)
+        return min(max(page, 1), self.total_pages)
+
+    def page_of(self, chapter: int, char: int = 0) -> Optional[int]:
+        """The page holding a chapter offset, or None if there is no such chapter."""
+        offset = self.offset(chapter, char)
+        return None if offset is None else self.page_at(offset)
+
+    def location_of(self, page: int) -> Optional[Tuple[int, int]]:
+        """Chapter and chapter offset where a 1-based page starts, or None if out of range."""
+        if not 1 <= page <= self.total_pages:
+            return None
+        if self.page_starts is None:
+            offset = min((page - 1) * PAGE_CHARS, self.total_chars)
+        else:
+            offset = self.page_starts[page - 1]
+        # Empty chapters share their start with the next one; take the last
+        chapter = min(
+            bisect_right(self.chapter_starts, offset) - 1, len(self.chapter_starts) - 2
+        )
+        return chapter, offset - self.chapter_starts[chapter]
+
+    @classmethod
+    def from_book(cls, book: BookMetadata) -> Optional["PositionMap"]:
+        if not book.epub_chapter_char_counts:
+            return None
+        return cls(
+            book.epub_chapter_char_counts, book.epub_page_char_counts, book.updated_at
+        )
+
+
+@cache
+def get_position_cache() -> LRUCache:
+    """Get the process-wide cache of position maps, keyed by book ID."""
+    # Entries are checked against the book's updated_at, so they never expire
+    return LRUCache(get_settings().POSITION_MAP_CACHE_MAX_ENTRIES, math.inf)
+
+
+def position_map(book: BookMetadata) -> Optional[PositionMap]:
+    """Get the position map of a book; None if it has no chapter counts."""
+    cache = get_position_cache()
+    positions: Optional[PositionMap] = cache.get(book.id)
+    if positions is not None and positions.version == book.updated_at:
+        return positions
+    positions = PositionMap.from_book(book)
+    if positions is not None:
+        cache.set(book.id, positions)
+    return positions
+
+
+async def get_position_maps(
+    db: AsyncSession, book_ids: Iterable[UUID]
+) -> Dict[UUID, PositionMap]:
+    """Get position maps for several books, reading books through the book cache.
+
+    Books the cache misses are fetched in one query. Books that do not exist
+    or have no chapter counts are left out.
+    """
+    maps = {}
+    for book in await book_repo.get_many(db, list(dict.fromkeys(book_ids))):
+        positions = position_map(book)
+        if positions is not None:
+            maps[book.id] = positions
+    return maps
+
+
+def annotate_highlight_pages(
+    highlights: List[Any], maps: Dict[UUID, PositionMap]
+) -> List[Dict[str, Any]]:
+    """Fill in ``epub_est_page`` of highlights that lack one.
+
+    Highlights record their chapter but not where in it they fall, so the
+    estimate is the page the chapter starts on.
+    """
+    annotated = []
+    for highlight in highlights:
+        highlight = dict(highlight)
+        positions = maps.get(highlight["book_id"])
+        if (
+            highlight["epub_est_page"] is None
+            and highlight["epub_chapter_idx"] is not None
+            and positions is not None
+        ):
+            highlight["epub_est_page"] = positions.page_of(
+                highlight["epub_chapter_idx"]
+            )
+        annotated.append(highlight)
+    return annotated
+
+
+def progress_page(
+    epub_progress: Optional[Dict[str, Any]], positions: Optional[PositionMap]
+) -> Optional[int]:
+    """The page a reader's saved EPUB progress is on, if it can be told."""
+    if not epub_progress or positions is None:
+        return None
+    global_progress = epub_progress.get("globalProgress")
+    current = (
+        global_progress.get("current") if isinstance(global_progress, dict) else None
+    )
+    if not isinstance(current, (int, float)) or isinstance(current, bool):
+        return None
+    return positions.page_at(int(current))
@@ -0,0 +1,271 @@
+import asyncio
+import fcntl
+import os
+import re
+import tempfile
+from functools import cache
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import structlog
+
+from app.core.config import get_settings
+from app.core.database import async_session
+from app.core.metrics import REGISTRY
+from app.models.book_models import BookFormat
+from app.repositories.books import BookRepository
+from app.repositories.supabase import StorageError, get_storage_client
+from app.services.semantic_search import Chunk, SemanticIndex, get_semantic_index
+
+logger = structlog.get_logger()
+book_repo = BookRepository()
+
+RAG_INDEXED_BOOKS = REGISTRY.counter(
+    "rag_indexed_books",
+    "Books processed by the semantic indexer by outcome.",
+    ("outcome",),
+)
+
+WORD_SPAN_RE = re.compile(r"\S+")
+
+
+def extract_epub_chapters(data: bytes) -> List[str]:
+    """Plain text of each spine item, in reading order.
+
+    Positions match the spine, so a list index is the chapter index the
+    reader uses; items that are not documents come out empty.
+    """
+    import ebooklib
+    import lxml.html
+    from ebooklib import epub
+
+    with tempfile.NamedTemporaryFile(suffix=".epub") as f:
+        f.write(data)
+        f.flush()
+        book = epub.read_epub(f.name, {"ignore_ncx": True})
+
+    chapters = []
+    for item_id, _ in book.spine:
+        item = book.get_item_with_id(item_id)
+        if item is None or item.get_type() != ebooklib.ITEM_DOCUMENT:
+            chapters.append("")
+            continue
+        try:
+            root = lxml.html.document_fromstring(item.get_content())
+        except Exception:
+            chapters.append("")
+            continue
+        for element in root.xpath("//script|//style"):
+            element.drop_tree()
+        chapters.append(
+            root.body.text_content() if root.find("body") is not None else ""
+        )
+    return chapters
+
+
+def chunk_chapters(chapters: List[str], words: int, overlap: int) -> List[Chunk]:
+    """Split chapters into windows of ``words`` words overlapping by ``overlap``.
+
+    Windows never cross chapters. Offsets are characters into the chapter's
+    extracted text; the stored text has its whitespace collapsed.
+    """
+    step = max(1, words - overlap)
+    chunks = []
+    for chapter, text in enumerate(chapters):
+        spans = [m.span() for m in WORD_SPAN_RE.finditer(text)]
+        for first in range(0, len(spans), step):
+            start = spans[first][0]
+            end = spans[min(first + words, len(spans)) - 1][1]
+            chunks.append(Chunk(chapter, start, end, " ".join(text[start:end].split())))
+            if first + words >= len(spans):
+                break
+    return chunks
+
+
+def storage_object_name(file_url: str) -> Optional[str]:
+    """Storage object of a book's ``file_url``, or None if it is not one of ours.
+
+    ``file_url`` is "users/<user id>/<object>" while objects live at
+    "<user id>/<object>".
+    """
+    parts = file_url.split("/", 2)
+    if len(parts) != 3 or parts[0] != "users" or not all(parts[1:]):
+        return None
+    return f"{parts[1]}/{parts[2]}"
+
+
+class RagIndexer:
+    """Background task that keeps the semantic index in step with ``rag_enabled``.
+
+    Every ``interval`` seconds, or sooner after ``wake``, a pass compares the
+    books with ``rag_enabled`` against the indexes on disk: books whose
+    ``updated_at`` moved are downloaded, chunked, embedded in batches and
+    rewritten, and indexes of books that were deleted or opted out are
+    removed. Only EPUB text can be extracted; PDFs and books kept on the
+    reader's device are skipped until they change. Workers on a host share
+    the index directory, and a file lock lets one of them run a pass at a
+    time.
+    """
+
+    def __init__(
+        self,
+        index: SemanticIndex,
+        storage,
+        interval: float,
+        batch_size: int,
+        chunk_words: int,
+        overlap_words: int,
+        session_factory=async_session,
+    ):
+        self.index = index
+        self.storage = storage
+        self.interval = interval
+        self.batch_size = batch_size
+        self.chunk_words = chunk_words
+        self.overlap_words = overlap_words
+        self._session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        # (book ID, version) pairs that cannot be indexed, so they are not retried
+        self._skipped: Set[Tuple[str, str]] = set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self) -> None:
+        """Run a pass now rather than at the next interval."""
+        self._wake.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_pass()
+            except Exception:
+                logger.exception("Semantic index pass failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def run_pass(self) -> Optional[Dict[str, int]]:
+        """Bring the index up to date; None if another process holds the lock."""
+        lock = open(os.path.join(self.index.root, ".indexer.lock"), "w")
+        try:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+            return await self._update()
+        finally:
+            lock.close()
+
+    async def _update(self) -> Dict[str, int]:
+        async with self._session_factory() as db:
+            rows = await book_repo.get_rag_sources(db)
+        wanted = {str(row.id): row for row in rows}
+        indexed = await asyncio.to_thread(self.index.versions)
+
+        counts = {"indexed": 0, "skipped": 0, "failed": 0, "removed": 0}
+        for book_id in indexed.keys() - wanted.keys():
+            try:
+                await asyncio.to_thread(self.index.remove_book, book_id)
+            except Exception:
+                logger.exception("Could not remove book index", book_id=book_id)
+                counts["failed"] += 1
+                continue
+            counts["removed"] += 1
+        for book_id, row in wanted.items():
+            version = row.updated_at.isoformat()
+            if indexed.get(book_id) == version or (book_id, version) in self._skipped:
+                continue
+            # One bad book must not end the pass for the others; retried next pass
+            try:
+                outcome = await self._index_book(
+                    book_id, version, row.format, row.file_url
+                )
+            except Exception:
+                logger.exception("Could not index book", book_id=book_id)
+                outcome = "failed"
+            counts[outcome] += 1
+            RAG_INDEXED_BOOKS.labels(outcome).inc()
+
+        if any(counts.values()):
+            logger.info("Semantic index updated", **counts)
+        return counts
+
+    async def _index_book(
+        self,
+        book_id: str,
+        version: str,
+        book_format: BookFormat,
+        file_url: Optional[str],
+    ) -> str:
+        if book_format != BookFormat.EPUB or not file_url:
+            logger.info(
+                "Book cannot be indexed",
+                book_id=book_id,
+                format=book_format.value,
+                stored=bool(file_url),
+            )
+            self._skipped.add((book_id, version))
+            return "skipped"
+
+        object_name = storage_object_name(file_url)
+        if object_name is None:
+            logger.warning("Book has an unknown file URL", book_id=book_id)
+            self._skipped.add((book_id, version))
+            return "skipped"
+
+        try:
+            data = await self.storage.download_file(object_name)
+        except StorageError as e:
+            # Retried on the next pass
+            logger.warning(
+                "Could not fetch book to index", book_id=book_id, error=str(e)
+            )
+            return "failed"
+
+        try:
+            chunks = await asyncio.to_thread(self._chunks, data)
+        except Exception as e:
+            logger.warning("Could not read book text", book_id=book_id, error=str(e))
+            self._skipped.add((book_id, version))
+            return "skipped"
+        vectors: List[Any] = []
+        for start in range(0, len(chunks), self.batch_size):
+            batch = [chunk.text for chunk in chunks[start : start + self.batch_size]]
+            vectors.extend(await asyncio.to_thread(self.index.embedder.embed, batch))
+        await asyncio.to_thread(
+            self.index.write_book, book_id, version, chunks, vectors
+        )
+        logger.info("Indexed book", book_id=book_id, chunks=len(chunks))
+        return "indexed"
+
+    def _chunks(self, data: bytes) -> List[Chunk]:
+        return chunk_chapters(
+            extract_epub_chapters(data), self.chunk_words, self.overlap_words
+        )
+
+
+@cache
+def get_rag_indexer() -> RagIndexer:
+    """Get the process-wide semantic indexer."""
+    settings = get_settings()
+    return RagIndexer(
+        get_semantic_index(),
+        get_storage_client(),
+        interval=settings.RAG_INDEX_INTERVAL_SECONDS,
+        batch_size=settings.RAG_EMBED_BATCH_SIZE,
+        chunk_words=settings.RAG_CHUNK_WORDS,
+        overlap_words=settings.RAG_CHUNK_OVERLAP_WORDS,
+    )
@@ -0,0 +1,422 @@
+import bisect
+import heapq
+import math
+import mmap
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from array import array
+from collections import Counter
+from functools import cache, lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import orjson
+import structlog
+
+from app.core.cache import LRUCache
+from app.core.config import get_settings
+from app.core.metrics import REGISTRY
+
+logger = structlog.get_logger()
+
+SEARCH_SECONDS = REGISTRY.histogram(
+    "semantic_search_duration_seconds",
+    "Time to embed a query and rank passages, excluding the database lookup.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+WORD_RE = re.compile(r"[^\W_]+")
+# Too common to say anything about a passage; dropped before hashing
+STOPWORDS = frozenset(
+    "a an and are as at be been but by did do does for from had has have he her "
+    "him his i if in into is it its me my no not of on or our she so than that "
+    "the their them then there these they this to was we were what when where "
+    "which who why will with would you your".split()
+)
+
+# Per-chunk metadata, stored as uint32: chapter, start char, end char, and
+# where the chunk's text ends in the text section (it starts where the last ended)
+META_FIELDS = 4
+
+# Vectors are also stored quantized, one component per 16-bit lane holding
+# round(x * 254) + 128 clamped to [1, 255]; see _lane_scores
+QUANT_SCALE = 254
+QUANT_OFFSET = 128
+# Quantized query weights sum to at most this, so a lane never exceeds 255 * 256
+QUERY_WEIGHT_BUDGET = 256
+
+# _AT_LEAST[t] maps each byte value to 1 if it is at least t, else 0
+_AT_LEAST = [bytes(int(v >= t) for v in range(256)) for t in range(256)]
+
+
+class Chunk(NamedTuple):
+    chapter: int
+    start: int
+    end: int
+    text: str
+
+
+class Embedder:
+    """Turns passages into L2-normalized float32 vectors of ``dimensions``.
+
+    ``name`` is recorded in every index, and indexes built by a different
+    embedder are rebuilt. ``embed`` is called with batches of up to
+    ``RAG_EMBED_BATCH_SIZE`` texts from a worker thread.
+    """
+
+    name: str
+    dimensions: int
+
+    def embed(self, texts: Sequence[str]) -> List[array]:
+        raise NotImplementedError
+
+
+class HashingEmbedder(Embedder):
+    """Deterministic embedding from hashed words and word pairs.
+
+    Each feature is hashed with CRC32 to a dimension and a sign and weighted
+    by ``1 + log(count)``. It needs no model and gives the same vector for the
+    same text in every process, so indexes stay valid across restarts; it
+    matches words rather than meanings. A short query only touches a few
+    dimensions, which keeps scoring cheap.
+    """
+
+    def __init__(self, dimensions: int):
+        self.name = f"hashing-{dimensions}"
+        self.dimensions = dimensions
+
+    def embed(self, texts: Sequence[str]) -> List[array]:
+        return [self._embed_one(text) for text in texts]
+
+    def _embed_one(self, text: str) -> array:
+        words = [w for w in WORD_RE.findall(text.lower()) if w not in STOPWORDS]
+        features = Counter(words)
+        features.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+        vector = [0.0] * self.dimensions
+        for feature, count in features.items():
+            h = zlib.crc32(feature.encode())
+            weight = 1.0 + math.log(count)
+            vector[h % self.dimensions] += -weight if h & 0x80000000 else weight
+        return normalized(vector)
+
+
+def normalized(vector: Sequence[float]) -> array:
+    norm = math.sqrt(sum(x * x for x in vector))
+    return array("f", (x / norm for x in vector) if norm else vector)
+
+
+def build_embedder(name: str, dimensions: int) -> Embedder:
+    if name == "hashing":
+        return HashingEmbedder(dimensions)
+    raise ValueError(f"Unknown RAG_EMBEDDER: {name}")
+
+
+def quantize(values: Sequence[float]) -> array:
+    return array(
+        "H",
+        (min(255, max(1, round(x * QUANT_SCALE) + QUANT_OFFSET)) for x in values),
+    )
+
+
+@lru_cache(maxsize=16)
+def _ones(lanes: int) -> int:
+    """An integer with 1 in each of ``lanes`` 16-bit lanes."""
+    return int.from_bytes(array("H", [1]).tobytes() * lanes, sys.byteorder)
+
+
+def _lane_scores(
+    column: Callable[[int], bytes], lanes: int, terms: Sequence[Tuple[int, float]]
+) -> bytes:
+    """Quantized dot products of the query with ``lanes`` rows at once.
+
+    ``column(dim)`` returns a dimension's quantized components for every
+    row. Read as one integer, a column times a small weight adds that weight
+    times each component to every lane in a single multiplication, which
+    CPython runs in C; a query costs a few passes over memory per term
+    instead of a Python operation per row. Weights are scaled to sum to at
+    most ``QUERY_WEIGHT_BUDGET`` and negative ones are offset by 255, so
+    each lane ends in [0, 2**16) and none borrows from or carries into its
+    neighbours. Returns the lanes as uint16 in native byte order.
+    """
+    total = sum(abs(weight) for _, weight in terms)
+    packed = 0
+    negative = 0
+    for dim, weight in terms:
+        scaled = int(weight / total * QUERY_WEIGHT_BUDGET)
+        if scaled:
+            packed += scaled * int.from_bytes(column(dim), sys.byteorder)
+            negative -= min(scaled, 0)
+    packed += negative * 255 * _ones(lanes)
+    return packed.to_bytes(lanes * 2, sys.byteorder)
+
+
+def _top_lanes(scores: bytes, count: int) -> List[int]:
+    """Indices of the ``count`` highest uint16 lanes, best first.
+
+    Lanes are first narrowed down by their high byte with a binary search
+    over thresholds; translating and counting bytes runs in C, so only the
+    lanes that survive are looked at one by one.
+    """
+    high = scores[1::2] if sys.byteorder == "little" else scores[0::2]
+    low, top = 0, 255
+    while low < top:
+        mid = (low + top + 1) // 2
+        if high.translate(_AT_LEAST[mid]).count(1) >= count:
+            low = mid
+        else:
+            top = mid - 1
+    mask = high.translate(_AT_LEAST[low])
+    lanes = memoryview(scores).cast("H")
+    survivors = [match.start() for match in re.finditer(b"\x01", mask)]
+    return heapq.nlargest(count, survivors, key=lanes.__getitem__)
+
+
+def _map(path: str) -> memoryview:
+    with open(path, "rb") as f:
+        # The mapping outlives the file object; it is unmapped once unreferenced
+        return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def _write(path: str, data) -> None:
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _sections(dimensions: int, chunks: int) -> Tuple[int, int, int]:
+    """Byte offsets of the lanes, metadata and text in a book's index file."""
+    lanes = dimensions * chunks * 4
+    meta = lanes + (dimensions * chunks * 2 + 3) // 4 * 4
+    return lanes, meta, meta + chunks * META_FIELDS * 4
+
+
+class BookIndex:
+    """Memory-mapped vectors, offsets and text of one book's chunks.
+
+    The index file holds, in order: float32 vectors, the same vectors
+    quantized to uint16 lanes, uint32 chunk metadata and UTF-8 chunk text.
+    Vectors are dimension-major, every chunk's first component followed by
+    every chunk's second and so on, so a dimension is one contiguous run.
+    """
+
+    def __init__(self, path: str, manifest: Dict[str, Any]):
+        self.book_id = manifest["book_id"]
+        self.version = manifest["version"]
+        self.size = manifest["chunks"]
+        if self.size:
+            data = _map(path)
+            lanes, meta, text = _sections(manifest["dimensions"], self.size)
+            self.vectors = data[:lanes].cast("f")
+            self.lanes = data[lanes:meta]
+            self.meta = data[meta:text].cast("I")
+            self.text = data[text:]
+
+    def column(self, dim: int) -> memoryview:
+        return self.lanes[dim * self.size * 2 : (dim + 1) * self.size * 2]
+
+    def score(self, i: int, terms: Sequence[Tuple[int, float]]) -> float:
+        return sum(weight * self.vectors[dim * self.size + i] for dim, weight in terms)
+
+    def hit(self, i: int, score: float) -> Dict[str, Any]:
+        chapter, start, end, text_end = self.meta[
+            i * META_FIELDS : (i + 1) * META_FIELDS
+        ]
+        text_start = self.meta[i * META_FIELDS - 1] if i else 0
+        return {
+            "book_id": self.book_id,
+            "chapter_index": chapter,
+            "start_char": start,
+            "end_char": end,
+            "text": bytes(self.text[text_start:text_end]).decode(),
+            "score": round(score, 4),
+        }
+
+
+class SemanticIndex:
+    """Per-book semantic indexes on local disk, and top-k search over them.
+
+    Each book has a directory holding ``manifest.json`` and an index file
+    named by its build stamp. A rebuild writes a new index file and then
+    swaps the manifest, so readers in other processes see the old index or
+    the new one, never a mix.
+
+    A query scores every chunk of every requested book on the quantized
+    lanes, then rescores the best ``candidates`` with the float32 vectors.
+    """
+
+    def __init__(
+        self, root: str, embedder: Embedder, candidates: int, open_indexes: int
+    ):
+        self.root = root
+        self.embedder = embedder
+        self.candidates = candidates
+        self._books = LRUCache(open_indexes, math.inf)
+        # Searches run in worker threads, so the open-index cache is shared
+        self._books_lock = threading.Lock()
+        os.makedirs(self._books_dir, exist_ok=True)
+
+    @property
+    def _books_dir(self) -> str:
+        return os.path.join(self.root, "books")
+
+    def _book_dir(self, book_id: str) -> str:
+        return os.path.join(self._books_dir, book_id)
+
+    def _manifest(self, book_id: str) -> Optional[Dict[str, Any]]:
+        """A book's manifest, or None if it has none by the current embedder."""
+        try:
+            with open(
+                os.path.join(self._book_dir(book_id), "manifest.json"), "rb"
+            ) as f:
+                manifest = orjson.loads(f.read())
+        except FileNotFoundError:
+            return None
+        return manifest if manifest["embedder"] == self.embedder.name else None
+
+    # Reading
+
+    def book(self, book_id: str) -> Optional[BookIndex]:
+        """The current index of a book, or None if it has none."""
+        try:
+            mtime = os.stat(
+                os.path.join(self._book_dir(book_id), "manifest.json")
+            ).st_mtime_ns
+        except FileNotFoundError:
+            with self._books_lock:
+                self._books.delete(book_id)
+            return None
+        with self._books_lock:
+            cached = self._books.get(book_id)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        manifest = self._manifest(book_id)
+        if manifest is None:
+            return None
+        path = os.path.join(self._book_dir(book_id), f"{manifest['stamp']}.idx")
+        index = BookIndex(path, manifest)
+        with self._books_lock:
+            self._books.set(book_id, (mtime, index))
+        return index
+
+    def search(
+        self, query: str, versions: Dict[str, str], k: int
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """Best ``k`` passages for ``query`` among the given books.
+
+        ``versions`` maps book IDs to the version the index should be at.
+        Books indexed at an older version are still searched. Returns the
+        hits, best first, and the IDs of books not indexed at their version.
+        """
+        start = time.perf_counter()
+        vector = self.embedder.embed([query])[0]
+        terms = [(dim, weight) for dim, weight in enumerate(vector) if weight]
+        indexes = {book_id: self.book(book_id) for book_id in versions}
+        pending = [
+            book_id
+            for book_id, index in indexes.items()
+            if index is None or index.version != versions[book_id]
+        ]
+        books = [
+            index for index in indexes.values() if index is not None and index.size
+        ]
+        hits = self._rank(terms, books, k) if terms and books else []
+        SEARCH_SECONDS.observe(time.perf_counter() - start)
+        return [index.hit(i, score) for score, index, i in hits], pending
+
+    def _rank(
+        self, terms: Sequence[Tuple[int, float]], books: List[BookIndex], k: int
+    ) -> List[Tuple[float, BookIndex, int]]:
+        offsets = [0]
+        for index in books:
+            offsets.append(offsets[-1] + index.size)
+        lanes = offsets.pop()
+
+        def column(dim: int) -> bytes:
+            return b"".join([index.column(dim) for index in books])
+
+        scores = _lane_scores(column, lanes, terms)
+        rescored = []
+        for lane in _top_lanes(scores, max(k, self.candidates)):
+            position = bisect.bisect_right(offsets, lane) - 1
+            index, i = books[position], lane - offsets[position]
+            rescored.append((index.score(i, terms), index, i))
+        return heapq.nlargest(k, rescored, key=lambda hit: hit[0])
+
+    # Writing; only the process holding the indexer lock calls these
+
+    def versions(self) -> Dict[str, Optional[str]]:
+        """Indexed version of every book directory; None where it needs a rebuild."""
+        versions: Dict[str, Optional[str]] = {}
+        for book_id in os.listdir(self._books_dir):
+            manifest = self._manifest(book_id)
+            versions[book_id] = manifest["version"] if manifest else None
+        return versions
+
+    def write_book(
+        self,
+        book_id: str,
+        version: str,
+        chunks: Sequence[Chunk],
+        vectors: Sequence[array],
+    ) -> None:
+        directory = self._book_dir(book_id)
+        os.makedirs(directory, exist_ok=True)
+        stamp = f"{time.time_ns():x}"
+
+        meta = array("I")
+        text_end = 0
+        encoded = []
+        for chunk in chunks:
+            data = chunk.text.encode()
+            encoded.append(data)
+            text_end += len(data)
+            meta.extend((chunk.chapter, chunk.start, chunk.end, text_end))
+        columns = array("f")
+        for dim in range(self.embedder.dimensions):
+            columns.extend(vector[dim] for vector in vectors)
+
+        lanes = quantize(columns).tobytes()
+        with open(os.path.join(directory, f"{stamp}.idx"), "wb") as f:
+            f.write(columns)
+            f.write(lanes.ljust((len(lanes) + 3) // 4 * 4, b"\0"))
+            f.write(meta)
+            f.write(b"".join(encoded))
+        manifest = os.path.join(directory, "manifest.json")
+        _write(
+            f"{manifest}.tmp",
+            orjson.dumps(
+                {
+                    "book_id": book_id,
+                    "version": version,
+                    "embedder": self.embedder.name,
+                    "dimensions": self.embedder.dimensions,
+                    "chunks": len(chunks),
+                    "stamp": stamp,
+                }
+            ),
+        )
+        os.replace(f"{manifest}.tmp", manifest)
+        # Readers that mapped the old file keep it until they let go
+        for name in os.listdir(directory):
+            if name != "manifest.json" and not name.startswith(stamp):
+                os.unlink(os.path.join(directory, name))
+
+    def remove_book(self, book_id: str) -> None:
+        directory = self._book_dir(book_id)
+        for name in os.listdir(directory):
+            os.unlink(os.path.join(directory, name))
+        os.rmdir(directory)
+
+
+@cache
+def get_semantic_index() -> SemanticIndex:
+    """Get the process-wide semantic index reader."""
+    settings = get_settings()
+    return SemanticIndex(
+        settings.RAG_INDEX_DIR,
+        build_embedder(settings.RAG_EMBEDDER, settings.RAG_EMBEDDING_DIMENSIONS),
+        candidates=settings.RAG_SEARCH_CANDIDATES,
+        open_indexes=settings.RAG_OPEN_INDEXES,
+    )
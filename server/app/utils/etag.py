@@ -0,0 +1,37 @@
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Response, status
+
+
+def weak_etag(*parts: Any) -> str:
+    """Build a weak ETag from the values that identify a resource's version."""
+    digest = hashlib.blake2b(
+        "|".join(str(part) for part in parts).encode(), digest_size=12
+    ).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag using weak comparison."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def set_etag(response: Response, etag: str) -> Response:
+    """Attach an ETag and ask clients to revalidate before reusing it."""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def not_modified(etag: str) -> Response:
+    """An empty 304 response for a matching conditional request."""
+    return set_etag(Response(status_code=status.HTTP_304_NOT_MODIFIED), etag)
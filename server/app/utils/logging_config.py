@@ -1,80 +1,151 @@
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys  # Import sys for console handler
-from typing import Any
+from typing import IO, Any, Optional
 
+import orjson
 import structlog
 
-# Import the Settings model
-from app.schemas.settings import Settings
+from app.core.config import get_settings
+from app.core.metrics import REGISTRY
 
-# Instantiate settings to load configuration
-settings = Settings()
+LOG_RECORDS_DROPPED = REGISTRY.counter(
+    "log_records_dropped",
+    "Log records discarded because the log queue was full.",
+    ("level",),
+)
 
+_listener: Optional[logging.handlers.QueueListener] = None
 
-def setup_logging() -> None:
-    """Configures structlog using values from Settings."""
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that never blocks the caller.
+
+    When the queue is full the record is dropped and counted instead of
+    waiting for the writer thread. Rendering is left to the writer thread's
+    formatter, so ``prepare`` hands the record over untouched.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels(record.levelname).inc()
+
+
+class _DrainingQueueListener(logging.handlers.QueueListener):
+    """Queue listener whose stop waits for room instead of failing on a full queue."""
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+def _orjson_dumps(value: Any, **kwargs: Any) -> str:
+    return orjson.dumps(value, **kwargs).decode()
+
+
+def setup_logging(stream: Optional[IO[str]] = None) -> None:
+    """Configures structlog using values from Settings.
+
+    Log calls only build the event dict and put a record on a bounded queue;
+    a dedicated thread renders records and writes them to ``stream``
+    (stdout by default), so a slow stdout cannot stall the event loop.
+    """
+    global _listener
     if structlog.is_configured():
         return
 
-    # Define shared processors for structlog (unchanged)
+    settings = get_settings()
+    shared_processors: list[Any] = [
+        structlog.contextvars.merge_contextvars,
+        structlog.stdlib.add_logger_name,
+        structlog.stdlib.add_log_level,
+        structlog.processors.TimeStamper(fmt="iso"),
+    ]
     if settings.ENVIRONMENT == "production":
-        shared_processors: list[Any] = [
-            structlog.contextvars.merge_contextvars,
-            structlog.stdlib.add_logger_name,
-            structlog.stdlib.add_log_level,
-            structlog.processors.TimeStamper(fmt="iso"),
-            structlog.processors.dict_tracebacks,
-            structlog.contextvars.merge_contextvars,
-        ]
-        # Configure structlog for standard library integration (unchanged)
-        structlog.configure(
-            processors=shared_processors
-            + [
-                structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
-            ],
-            logger_factory=structlog.stdlib.LoggerFactory(),
-            wrapper_class=structlog.stdlib.BoundLogger,
-            cache_logger_on_first_use=True,
-        )
+        renderer: Any = structlog.processors.JSONRenderer(serializer=_orjson_dumps)
+        shared_processors.append(structlog.processors.dict_tracebacks)
     else:
-        structlog.configure(
-            processors=[
-                structlog.contextvars.merge_contextvars,
-                structlog.processors.add_log_level,
-                structlog.processors.StackInfoRenderer(),
-                structlog.dev.set_exc_info,
-                structlog.processors.TimeStamper(fmt="%Y-%m-%d %H:%M:%S", utc=False),
-                structlog.dev.ConsoleRenderer(),
-            ],
-            wrapper_class=structlog.make_filtering_bound_logger(logging.NOTSET),
-            context_class=dict,
-            logger_factory=structlog.PrintLoggerFactory(),
-            cache_logger_on_first_use=False,
-        )
-
-    console_formatter = structlog.stdlib.ProcessorFormatter(
-        processor=structlog.dev.ConsoleRenderer(colors=True),
+        renderer = structlog.dev.ConsoleRenderer()
+        shared_processors.append(structlog.processors.StackInfoRenderer())
+
+    structlog.configure(
+        processors=shared_processors
+        + [structlog.stdlib.ProcessorFormatter.wrap_for_formatter],
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.make_filtering_bound_logger(
+            logging.getLevelName(settings.LOG_LEVEL)
+        ),
+        cache_logger_on_first_use=True,
+    )
+
+    # Records from plain stdlib loggers (uvicorn, sqlalchemy) get the same
+    # processors before rendering
+    formatter = structlog.stdlib.ProcessorFormatter(
+        processor=renderer,
+        foreign_pre_chain=shared_processors,
     )
+    console_handler = logging.StreamHandler(stream or sys.stdout)
+    console_handler.setFormatter(formatter)
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(
+        maxsize=settings.LOG_QUEUE_SIZE
+    )
+    _listener = _DrainingQueueListener(
+        log_queue, console_handler, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(shutdown_logging)
 
     # Configure root logger
     root_logger = logging.getLogger()
     root_logger.handlers.clear()
-
-    # Always add console handler in development or when LOG_TO_CONSOLE is True
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(console_formatter)
-    root_logger.addHandler(console_handler)
-
-    # Add Loki handler only if not in development environment
-    handlers_active = ["Console"]
+    root_logger.addHandler(DroppingQueueHandler(log_queue))
     root_logger.setLevel(settings.LOG_LEVEL)
 
     log = structlog.get_logger()
     log.info(
         "Structlog logging configured",
-        handlers=handlers_active,
+        handlers=["Queue", "Console"],
         level=settings.LOG_LEVEL,
         environment=settings.ENVIRONMENT,
+        queue_size=settings.LOG_QUEUE_SIZE,
+    )
+
+
+def restart_log_writer() -> None:
+    """Give a forked child its own log queue and writer thread.
+
+    Threads do not survive ``fork``, so a child of a process that already
+    called ``setup_logging`` would queue records nobody writes. The child
+    keeps the parent's processors and formatter and only replaces the
+    queue, the listener and the root logger's queue handler.
+    """
+    global _listener
+    if _listener is None:
+        return
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(
+        maxsize=get_settings().LOG_QUEUE_SIZE
+    )
+    _listener = _DrainingQueueListener(
+        log_queue, *_listener.handlers, respect_handler_level=True
     )
+    _listener.start()
+
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers:
+        if isinstance(handler, DroppingQueueHandler):
+            handler.queue = log_queue
+
 
-    return log
+def shutdown_logging() -> None:
+    """Stop the writer thread after it has written out everything queued."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,43 @@
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+from uuid import UUID
+
+
+def encode_cursor(sort_value: datetime, id: UUID) -> str:
+    """Encode a keyset position as an opaque, URL-safe cursor."""
+    raw = json.dumps([sort_value.isoformat(), str(id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """Decode a cursor produced by ``encode_cursor``.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(sort_value), UUID(id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def encode_sync_cursor(txid: int, seq: int) -> str:
+    """Encode a position in the sync change feed."""
+    return f"{txid}.{seq}"
+
+
+def decode_sync_cursor(cursor: str) -> Tuple[int, int]:
+    """Decode a cursor produced by ``encode_sync_cursor``.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        txid, seq = cursor.split(".")
+        return int(txid), int(seq)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
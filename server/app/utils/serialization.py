@@ -0,0 +1,37 @@
+from typing import Any, Mapping, Optional
+from uuid import UUID
+
+from fastapi import Response, status
+from pydantic import TypeAdapter
+
+
+def pydantic_response(
+    adapter: TypeAdapter,
+    content: Any,
+    status_code: int = status.HTTP_200_OK,
+    headers: Optional[Mapping[str, str]] = None,
+) -> Response:
+    """Validate and encode a payload with a precompiled adapter.
+
+    Skips FastAPI's response_model pass (validate, dump to Python, then
+    encode) in favour of a single validate plus pydantic-core's JSON encoder.
+    The route's ``response_model`` still documents the schema.
+    """
+    body = adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+    return Response(
+        content=body,
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
+
+
+def orjson_default(value: Any) -> str:
+    """``default`` hook for ``orjson.dumps`` on rows read through asyncpg.
+
+    asyncpg returns its own ``UUID`` subclass, which orjson only serializes
+    natively for the exact ``uuid.UUID`` type.
+    """
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
@@ -0,0 +1,141 @@
+"""Concurrent read/write consistency check for the book metadata cache.
+
+Writers commit a new version to a fake store and then invalidate the cache,
+as ``CachedBookRepository`` does. Readers record the newest version whose
+invalidation had finished before they started, and any read older than that
+is a stale read. ``--workers`` caches stand in for the launcher's workers:
+each has its own local tier, and they share the invalidation counters and
+shared tier, with writers and readers going through any of them. Runs
+without a database; exits non-zero on a violation.
+
+Usage:
+    python -m benchmarks.book_cache_consistency --readers 50 --writers 5
+"""
+
+import argparse
+import asyncio
+import pickle
+import random
+import sys
+from typing import Any, Dict
+
+from app.core.cache import (
+    InMemorySharedCache,
+    InvalidationCounters,
+    LRUCache,
+    TieredCache,
+)
+from benchmarks.common import report
+
+KEYS = [f"book-{i}" for i in range(8)]
+
+
+class FakeStore:
+    """Stands in for Postgres: reads take time and may straddle a commit."""
+
+    def __init__(self, max_delay: float):
+        self.max_delay = max_delay
+        self.versions = {key: 0 for key in KEYS}
+
+    async def read(self, key: str) -> Dict[str, Any]:
+        await asyncio.sleep(random.random() * self.max_delay)
+        version = self.versions[key]
+        await asyncio.sleep(random.random() * self.max_delay)
+        return {"key": key, "version": version}
+
+
+async def writer(store, caches, published, stop, max_delay) -> int:
+    writes = 0
+    while not stop.is_set():
+        cache = random.choice(caches)
+        key = random.choice(KEYS)
+        store.versions[key] += 1
+        version = store.versions[key]
+        await asyncio.sleep(random.random() * max_delay)
+        await cache.invalidate(key)
+        published[key] = max(published[key], version)
+        writes += 1
+        await asyncio.sleep(random.random() * max_delay)
+    return writes
+
+
+async def reader(store, caches, published, stop, violations) -> int:
+    reads = 0
+    while not stop.is_set():
+        cache = random.choice(caches)
+        key = random.choice(KEYS)
+        floor = published[key]
+        data = await cache.get_or_load(key, lambda: store.read(key))
+        if data["version"] < floor:
+            violations.append({"key": key, "read": data["version"], "floor": floor})
+        reads += 1
+        await asyncio.sleep(0)
+    return reads
+
+
+async def main(args: argparse.Namespace) -> int:
+    random.seed(args.seed)
+    store = FakeStore(args.max_delay)
+    shared = InMemorySharedCache() if args.shared else None
+    counters = InvalidationCounters()
+    caches = [
+        TieredCache(
+            LRUCache(max_entries=args.max_entries, ttl_seconds=args.ttl),
+            shared,
+            namespace="book",
+            encode=pickle.dumps,
+            decode=pickle.loads,
+            counters=counters,
+        )
+        for _ in range(args.workers)
+    ]
+    published = {key: 0 for key in KEYS}
+    violations: list = []
+    stop = asyncio.Event()
+
+    tasks = [
+        asyncio.create_task(writer(store, caches, published, stop, args.max_delay))
+        for _ in range(args.writers)
+    ] + [
+        asyncio.create_task(reader(store, caches, published, stop, violations))
+        for _ in range(args.readers)
+    ]
+    await asyncio.sleep(args.duration)
+    stop.set()
+    counts = await asyncio.gather(*tasks)
+
+    # Once writes have settled every key must read back its latest version
+    # from every worker
+    for cache in caches:
+        for key in KEYS:
+            data = await cache.get_or_load(key, lambda: store.read(key))
+            if data["version"] != store.versions[key]:
+                violations.append({"key": key, "read": data["version"], "final": True})
+
+    report(
+        "book_cache_consistency",
+        {
+            "writes": sum(counts[: args.writers]),
+            "reads": sum(counts[args.writers :]),
+            "violations": violations[:10],
+            "violation_count": len(violations),
+            "cache": caches[0].stats(),
+        },
+    )
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--readers", type=int, default=50)
+    parser.add_argument("--writers", type=int, default=5)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--max-delay", type=float, default=0.002)
+    parser.add_argument(
+        "--workers", type=int, default=2, help="caches sharing invalidations"
+    )
+    parser.add_argument("--max-entries", type=int, default=4)
+    parser.add_argument("--ttl", type=float, default=60.0)
+    parser.add_argument("--shared", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--seed", type=int, default=0)
+    sys.exit(asyncio.run(main(parser.parse_args())))
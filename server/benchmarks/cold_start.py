@@ -0,0 +1,181 @@
+"""Measure import time, app construction and time to first request.
+
+Each import sample runs in a fresh interpreter, so nothing is cached
+in-process between samples. Startup samples launch
+``uvicorn --factory app.main:create_app`` and time from process start until
+``GET /metrics`` answers. They then time the first and second database-backed
+requests (``GET /api/v1/books/``), to show whether the lifespan warm-up
+spared the first request a connection handshake. The slowest modules from
+``python -X importtime`` are listed as well.
+
+Without ``BENCH_DATABASE_URL`` a throwaway local cluster is started.
+
+Usage:
+    python -m benchmarks.cold_start --samples 5
+"""
+
+import argparse
+import contextlib
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.common import report
+from benchmarks.local_postgres import SERVER_ROOT, LocalPostgres, free_port
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+app.main.create_app()
+built = time.perf_counter()
+print(imported - start, built - imported)
+"""
+
+
+def server_env(database_url: str) -> Dict[str, str]:
+    env = {
+        **os.environ,
+        "SUPABASE_DB_CONNECTION": database_url,
+        "ENVIRONMENT": "benchmark",
+        "LOG_LEVEL": "WARNING",
+    }
+    for name in (
+        "SUPABASE_URL",
+        "SUPABASE_KEY",
+        "SUPABASE_JWT_SECRET",
+        "SUPABASE_SERVICE_ROLE_KEY",
+    ):
+        env.setdefault(name, "unused-by-benchmark")
+    return env
+
+
+def import_sample(env: Dict[str, str]) -> List[float]:
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=SERVER_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return [float(v) for v in out.split()[-2:]]
+
+
+def slowest_imports(env: Dict[str, str], top: int) -> Dict[str, float]:
+    """Cumulative milliseconds of the slowest top-level packages."""
+    err = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            "import app.main; app.main.create_app()",
+        ],
+        cwd=SERVER_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    packages: Dict[str, float] = {}
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        if cumulative.strip().isdigit() and "." not in name:
+            packages[name] = max(packages.get(name, 0), int(cumulative) / 1000)
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+    return {name: round(ms, 1) for name, ms in ranked[:top]}
+
+
+def startup_sample(env: Dict[str, str]) -> Dict[str, float]:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:create_app",
+            "--factory",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ],
+        cwd=SERVER_ROOT,
+        env=env,
+    )
+    try:
+        with httpx.Client(base_url=base_url) as client:
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError("API server exited during startup")
+                try:
+                    if client.get("/metrics").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.perf_counter() - start > 60:
+                    raise RuntimeError("API server did not start within 60s")
+                time.sleep(0.01)
+            ready = time.perf_counter() - start
+
+            timings = []
+            for _ in range(2):
+                request_start = time.perf_counter()
+                client.get("/api/v1/books/", params={"limit": 1}).raise_for_status()
+                timings.append(time.perf_counter() - request_start)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return {
+        "ready_s": ready,
+        "first_db_request_ms": timings[0] * 1000,
+        "second_db_request_ms": timings[1] * 1000,
+    }
+
+
+def median_of(samples: List[Dict[str, float]], key: str, digits: int = 3) -> float:
+    return round(statistics.median(s[key] for s in samples), digits)
+
+
+def main(samples: int, top: int) -> None:
+    with contextlib.ExitStack() as stack:
+        database_url = os.environ.get("BENCH_DATABASE_URL") or stack.enter_context(
+            LocalPostgres()
+        )
+        env = server_env(database_url)
+
+        imports = [import_sample(env) for _ in range(samples)]
+        startups = [startup_sample(env) for _ in range(samples)]
+        results: Dict[str, Any] = {
+            "samples": samples,
+            "import_s": round(statistics.median(i[0] for i in imports), 3),
+            "create_app_s": round(statistics.median(i[1] for i in imports), 3),
+            "ready_s": median_of(startups, "ready_s"),
+            "first_db_request_ms": median_of(startups, "first_db_request_ms", 1),
+            "second_db_request_ms": median_of(startups, "second_db_request_ms", 1),
+            "slowest_imports_ms": slowest_imports(env, top),
+        }
+    report("cold_start", results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest packages to list")
+    args = parser.parse_args()
+    main(args.samples, args.top)
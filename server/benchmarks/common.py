@@ -0,0 +1,127 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks talk to a real Postgres. Point ``BENCH_DATABASE_URL`` at a
+disposable database (it defaults to ``SUPABASE_DB_CONNECTION``); every script
+cleans up the rows it creates.
+"""
+
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+from app.models.book_models import (
+    BookFormat,
+    BookMetadata,
+    Highlight,
+    HighlightColor,
+    HighlightLocation,
+    UserBookLibrary,
+)
+from app.models.user_models import Profile
+
+
+def get_database_url() -> str:
+    url = os.environ.get("BENCH_DATABASE_URL")
+    if not url:
+        from app.core.config import get_settings
+
+        url = get_settings().SUPABASE_DB_CONNECTION
+    return url.replace("postgresql://", "postgresql+asyncpg://")
+
+
+def create_engine() -> AsyncEngine:
+    return create_async_engine(get_database_url(), pool_size=10, max_overflow=0)
+
+
+@contextmanager
+def timed(results: Dict[str, Any], name: str) -> Iterator[None]:
+    """Record the wall-clock duration of the block in ``results[name]``."""
+    start = time.perf_counter()
+    yield
+    results[name] = round(time.perf_counter() - start, 4)
+
+
+def report(name: str, results: Dict[str, Any]) -> None:
+    print(json.dumps({"benchmark": name, **results}, indent=2, default=str))
+
+
+async def seed_user(db: AsyncSession) -> uuid.UUID:
+    user_id = uuid.uuid4()
+    await db.execute(
+        insert(Profile).values(id=user_id, email=f"bench-{user_id}@example.com")
+    )
+    return user_id
+
+
+async def seed_library_entry(db: AsyncSession, user_id: uuid.UUID) -> uuid.UUID:
+    """Create a book and add it to the user's library; returns the book ID."""
+    book_id = (
+        await db.execute(
+            insert(BookMetadata)
+            .values(title=f"Benchmark {uuid.uuid4()}", format=BookFormat.EPUB)
+            .returning(BookMetadata.id)
+        )
+    ).scalar_one()
+    await db.execute(
+        insert(UserBookLibrary).values(user_id=user_id, book_metadata_id=book_id)
+    )
+    return book_id
+
+
+async def seed_highlights(
+    db: AsyncSession, user_id: uuid.UUID, book_id: uuid.UUID, count: int
+) -> List[uuid.UUID]:
+    """Insert ``count`` highlights, each with one location."""
+    lib_id = (
+        await db.execute(
+            select(UserBookLibrary.id).where(
+                UserBookLibrary.user_id == user_id,
+                UserBookLibrary.book_metadata_id == book_id,
+            )
+        )
+    ).scalar_one()
+    highlight_ids = (
+        (
+            await db.execute(
+                insert(Highlight).returning(Highlight.id),
+                [
+                    {
+                        "user_book_lib_id": lib_id,
+                        "color": HighlightColor.YELLOW,
+                        "original_text": f"highlight {i}",
+                    }
+                    for i in range(count)
+                ],
+            )
+        )
+        .scalars()
+        .all()
+    )
+    await db.execute(
+        insert(HighlightLocation),
+        [
+            {"highlight_id": highlight_id, "chapter_idx": i % 40, "page": i % 400}
+            for i, highlight_id in enumerate(highlight_ids)
+        ],
+    )
+    return list(highlight_ids)
+
+
+async def drop_user(db: AsyncSession, user_id: uuid.UUID) -> None:
+    """Remove a benchmark user and their books; everything else cascades."""
+    await db.execute(
+        delete(BookMetadata).where(
+            BookMetadata.id.in_(
+                select(UserBookLibrary.book_metadata_id).where(
+                    UserBookLibrary.user_id == user_id
+                )
+            )
+        )
+    )
+    await db.execute(delete(Profile).where(Profile.id == user_id))
@@ -0,0 +1,190 @@
+"""Compare response size and CPU cost per compression encoding and level.
+
+Payloads are a highlight list, a large ``pdf_toc`` and an NDJSON export,
+built from the same seeded corpus as ``generate_dataset``. Each encoding
+available in this process (gzip always; brotli and zstd when installed) is
+timed at several levels. Whole bodies are compressed in one call, and
+exports in 1000-row chunks as the streaming path does. Transfer time is
+estimated for a ``--link-mbps`` connection. The middleware is also run
+once per payload to check it round-trips. No database needed.
+
+Usage:
+    python -m benchmarks.compression --rows 5000 --link-mbps 2
+"""
+
+import argparse
+import asyncio
+import gzip
+import random
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Tuple
+
+import orjson
+
+from app.core import compression
+from app.core.compression import (
+    BrotliEncoder,
+    CompressionMiddleware,
+    Encoder,
+    GzipEncoder,
+    ZstdEncoder,
+)
+from app.schemas.highlights import HighlightListAdapter
+from benchmarks.common import report
+from benchmarks.generate_dataset import _corpus, _passage
+from benchmarks.serialization import build_rows
+
+LEVELS: Dict[str, Tuple[Callable[[int], Encoder], List[int]]] = {
+    "gzip": (GzipEncoder, [1, 3, 5, 6, 9]),
+    "br": (BrotliEncoder, [1, 4, 6, 9, 11]),
+    "zstd": (ZstdEncoder, [1, 3, 6, 9, 19]),
+}
+
+
+def build_payloads(rows: int, seed: int) -> Dict[str, List[bytes]]:
+    rng = random.Random(seed)
+    corpus = _corpus(seed)
+    highlights = build_rows(rows)
+    for row in highlights:
+        row["text"] = _passage(rng, corpus, 8, 60)
+        row["note"] = _passage(rng, corpus, 3, 20) if rng.random() < 0.25 else None
+
+    def toc(depth: int, page: int) -> List[Dict[str, Any]]:
+        entries = []
+        for _ in range(rng.randint(4, 12)):
+            entries.append(
+                {
+                    "title": _passage(rng, corpus, 2, 8),
+                    "page": page,
+                    "children": toc(depth + 1, page) if depth < 2 else [],
+                }
+            )
+            page += rng.randint(1, 20)
+        return entries
+
+    export_rows = [
+        {
+            "book_title": f"Book {i // 200}",
+            "chapter_title": f"Chapter {i % 40}",
+            "page": i % 400,
+            "color": "yellow",
+            "text": row["text"],
+            "note": row["note"],
+            "created_at": row["created_at"].isoformat(),
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        }
+        for i, row in enumerate(highlights)
+    ]
+    return {
+        "highlight_list": [
+            HighlightListAdapter.dump_json(
+                HighlightListAdapter.validate_python(highlights)
+            )
+        ],
+        "pdf_toc": [orjson.dumps(toc(0, 1))],
+        "ndjson_export": [
+            b"".join(orjson.dumps(row) + b"\n" for row in export_rows[i : i + 1000])
+            for i in range(0, len(export_rows), 1000)
+        ],
+    }
+
+
+def available(name: str) -> bool:
+    return name == "gzip" or name in compression.get_encoders()
+
+
+def measure(
+    factory: Callable[[], Encoder], chunks: List[bytes], repeat: int, link_bps: float
+):
+    raw = sum(len(c) for c in chunks)
+    start = time.process_time()
+    for _ in range(repeat):
+        encoder = factory()
+        encoded = b"".join(encoder.compress(c) for c in chunks) + encoder.finish()
+    cpu_ms = (time.process_time() - start) / repeat * 1000
+    return {
+        "bytes": len(encoded),
+        "ratio": round(raw / len(encoded), 2),
+        "cpu_ms": round(cpu_ms, 2),
+        "mb_per_cpu_s": round(raw / 1e6 / (cpu_ms / 1000), 1),
+        "transfer_ms": round(len(encoded) * 8 / link_bps * 1000, 1),
+    }
+
+
+async def through_middleware(
+    chunks: List[bytes], content_type: bytes
+) -> Dict[str, Any]:
+    async def app(scope, receive, send):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", content_type)],
+            }
+        )
+        for i, chunk in enumerate(chunks):
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": i < len(chunks) - 1,
+                }
+            )
+
+    messages: List[Dict[str, Any]] = []
+
+    async def collect(message):
+        messages.append(message)
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", b"gzip")]}
+    await CompressionMiddleware(app)(scope, None, collect)
+    headers = dict(messages[0]["headers"])
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    encoding = headers.get(b"content-encoding")
+    if encoding == b"gzip":
+        body = gzip.decompress(body)
+    return {
+        "encoding": encoding.decode() if encoding else None,
+        "round_trips": body == b"".join(chunks),
+    }
+
+
+def main(rows: int, repeat: int, link_mbps: float, seed: int) -> None:
+    payloads = build_payloads(rows, seed)
+    link_bps = link_mbps * 1e6
+    results: Dict[str, Any] = {"rows": rows, "link_mbps": link_mbps}
+    for payload, chunks in payloads.items():
+        raw = sum(len(c) for c in chunks)
+        entry: Dict[str, Any] = {
+            "raw_bytes": raw,
+            "raw_transfer_ms": round(raw * 8 / link_bps * 1000, 1),
+        }
+        for name, (encoder_class, levels) in LEVELS.items():
+            if not available(name):
+                entry[name] = "not installed"
+                continue
+            entry[name] = {
+                level: measure(lambda: encoder_class(level), chunks, repeat, link_bps)
+                for level in levels
+            }
+        entry["middleware"] = asyncio.run(
+            through_middleware(chunks, b"application/json")
+        )
+        results[payload] = entry
+
+    book = [random.Random(seed).randbytes(256 * 1024)]
+    results["book_file_middleware"] = asyncio.run(
+        through_middleware(book, b"application/epub+zip")
+    )
+    report("compression", results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--link-mbps", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    main(args.rows, args.repeat, args.link_mbps, args.seed)
@@ -0,0 +1,59 @@
+"""Local stand-ins for external services used by the load test."""
+
+import asyncio
+from pathlib import Path
+from typing import Optional
+
+from app.repositories.supabase import StorageError
+
+
+class FilesystemStorageClient:
+    """Drop-in for ``SupabaseStorageClient`` that stores objects on disk.
+
+    Paths follow the bucket layout of the real client. File I/O runs in a
+    worker thread so it behaves like a network call from the event loop's
+    point of view.
+    """
+
+    def __init__(self, root: str, bucket_name: str = "documents"):
+        self.bucket_name = bucket_name
+        self.root = Path(root) / bucket_name
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, object_name: str, user_id: Optional[str] = None) -> Path:
+        path = f"{user_id}/{object_name}" if user_id else object_name
+        resolved = (self.root / path).resolve()
+        if self.root.resolve() not in resolved.parents:
+            raise StorageError(f"Invalid object path: {path}")
+        return resolved
+
+    async def ping(self, timeout: float = 5.0) -> None:
+        if not await asyncio.to_thread(self.root.is_dir):
+            raise StorageError(f"Storage unreachable: {self.root} is missing")
+
+    async def upload_file(
+        self,
+        object_name: str,
+        file_bytes: bytes,
+        user_id: Optional[str] = None,
+    ) -> str:
+        path = self._path(object_name, user_id)
+
+        def write() -> None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(file_bytes)
+
+        await asyncio.to_thread(write)
+        return str(path.relative_to(self.root))
+
+    async def download_file(self, object_name: str) -> bytes:
+        path = self._path(object_name)
+        try:
+            return await asyncio.to_thread(path.read_bytes)
+        except FileNotFoundError:
+            raise StorageError(f"Failed to download file: {object_name} not found")
+
+    async def delete_file(self, object_name: str) -> bool:
+        path = self._path(object_name)
+        await asyncio.to_thread(path.unlink, missing_ok=True)
+        return True
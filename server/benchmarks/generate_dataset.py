@@ -0,0 +1,642 @@
+"""Bulk-load a synthetic dataset at production scale.
+
+Fills ``profiles``, ``book_metadata``, ``user_book_library``, ``highlights``
+and ``highlight_locations`` with COPY. The data is skewed the way real
+usage is: a few heavy readers own most of the library entries (Pareto),
+a few popular books show up in most libraries (Zipf), and highlights per
+entry are log-normal. The skewed shares are rounded so the load has exactly
+``--library-entries`` entries and ``--highlights`` highlights. Every user's
+rows come from an RNG seeded by ``(seed, user index)``, so the same
+arguments produce the same rows regardless of ``--jobs`` or ``--batch-size``.
+
+Unlike the other benchmarks this does not clean up after itself; point
+``BENCH_DATABASE_URL`` at a database you can throw away.
+
+Usage:
+    python -m benchmarks.generate_dataset --users 100000 --books 200000 \\
+        --library-entries 1000000 --highlights 50000000 --jobs 8 --defer-indexes
+"""
+
+import argparse
+import asyncio
+import itertools
+import math
+import random
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import asyncpg
+import orjson
+
+from benchmarks.common import get_database_url, report, timed
+
+DATASET_EPOCH = datetime(2023, 1, 1, tzinfo=timezone.utc)
+DATASET_SPAN_SECONDS = 3 * 365 * 24 * 3600
+
+# Shape of the distributions; see the module docstring
+LIBRARY_SIZE_ALPHA = 1.5
+BOOK_POPULARITY_EXPONENT = 1.0
+HIGHLIGHTS_PER_ENTRY_SIGMA = 1.2
+
+PDF_SHARE = 0.15
+NOTE_SHARE = 0.15
+PROGRESS_SHARE = 0.6
+COLOR_WEIGHTS = (("yellow", 70), ("green", 15), ("blue", 15))
+
+SYNCED_TABLES = ("user_book_library", "highlights", "highlight_locations")
+LOADED_TABLES = ("profiles", "book_metadata") + SYNCED_TABLES
+
+PROFILE_COLUMNS = ("id", "email", "created_at", "updated_at")
+BOOK_COLUMNS = (
+    "id",
+    "title",
+    "author",
+    "description",
+    "cover_url",
+    "file_url",
+    "format",
+    "num_pages",
+    "file_size_bytes",
+    "epub_chapter_char_counts",
+    "pdf_toc",
+    "created_at",
+    "updated_at",
+)
+LIBRARY_COLUMNS = (
+    "id",
+    "user_id",
+    "book_metadata_id",
+    "date_added",
+    "epub_progress",
+    "pdf_current_page",
+    "updated_at",
+)
+HIGHLIGHT_COLUMNS = (
+    "id",
+    "user_book_lib_id",
+    "color",
+    "original_text",
+    "note",
+    "created_at",
+    "updated_at",
+)
+LOCATION_COLUMNS = (
+    "id",
+    "highlight_id",
+    "chapter_idx",
+    "chapter_href",
+    "chapter_title",
+    "page",
+    "html_range",
+    "pdf_rect_position",
+    "created_at",
+)
+
+WORDS = (
+    "the of and to in that it was he for on are as with his they at be this "
+    "from have or by one had not but what all were when we there can an your "
+    "which their said if do will each about how up out them then she many some "
+    "so these would other into has more her two like him see time could no make "
+    "than first been its who now people my made over did down only way find use "
+    "may water long little very after words called just where most know memory "
+    "river silence window garden morning letter promise shadow winter history "
+    "reason nature freedom courage stranger journey harbor lantern mirror"
+).split()
+SURNAMES = (
+    "Adams Baker Chen Dubois Evans Fischer Garcia Haddad Ito Jensen Kowalski "
+    "Lopez Moreau Nakamura Okafor Petrov Quinn Rossi Singh Tanaka Umar Vance "
+    "Wagner Xu Yilmaz Zhang"
+).split()
+
+
+def _uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def _between(rng: random.Random, low: int, high: int) -> int:
+    """``rng.randint`` without its argument checks, for the per-row hot path."""
+    return low + int(rng.random() * (high - low + 1))
+
+
+def _timestamp(rng: random.Random, after: datetime = DATASET_EPOCH) -> datetime:
+    remaining = DATASET_SPAN_SECONDS - (after - DATASET_EPOCH).total_seconds()
+    return after + timedelta(seconds=rng.random() * max(remaining, 1))
+
+
+def _sentence(rng: random.Random, low: int, high: int) -> str:
+    return " ".join(rng.choices(WORDS, k=rng.randint(low, high))).capitalize() + "."
+
+
+def _corpus(seed: int, size: int = 200_000) -> List[str]:
+    rng = random.Random(f"{seed}:corpus")
+    return rng.choices(WORDS, k=size)
+
+
+def _passage(rng: random.Random, corpus: List[str], low: int, high: int) -> str:
+    """A run of corpus words; much cheaper than drawing every word."""
+    length = _between(rng, low, high)
+    start = _between(rng, 0, len(corpus) - length - 1)
+    return " ".join(corpus[start : start + length]).capitalize() + "."
+
+
+def _json(value) -> str:
+    return orjson.dumps(value).decode()
+
+
+@dataclass(frozen=True)
+class DatasetPlan:
+    """Sizes and seed of a dataset; everything else is derived from these."""
+
+    seed: int
+    users: int
+    books: int
+    library_entries: int
+    highlights: int
+
+    def book_ids(self) -> List[uuid.UUID]:
+        rng = random.Random(f"{self.seed}:book-ids")
+        return [_uuid(rng) for _ in range(self.books)]
+
+    def book_formats(self) -> List[str]:
+        rng = random.Random(f"{self.seed}:book-formats")
+        return [
+            "pdf" if rng.random() < PDF_SHARE else "epub" for _ in range(self.books)
+        ]
+
+    def book_popularity(self) -> List[float]:
+        """Cumulative Zipf weights over book indexes, most popular first."""
+        return list(
+            itertools.accumulate(
+                1 / (rank + 1) ** BOOK_POPULARITY_EXPONENT for rank in range(self.books)
+            )
+        )
+
+    def library_sizes(self) -> List[int]:
+        """Library entries per user, summing to ``library_entries``."""
+        rng = random.Random(f"{self.seed}:library-sizes")
+        weights = [rng.paretovariate(LIBRARY_SIZE_ALPHA) for _ in range(self.users)]
+        return _apportion(self.library_entries, weights, low=1, high=self.books)
+
+    def highlight_quotas(self) -> List[int]:
+        """Highlights per user, in proportion to library size, summing to ``highlights``."""
+        return _apportion(self.highlights, self.library_sizes())
+
+
+def _apportion(
+    total: int, weights: Sequence[float], low: int = 0, high: Optional[int] = None
+) -> List[int]:
+    """Split ``total`` into integers proportional to ``weights`` within ``[low, high]``.
+
+    Shares are rounded down, then the remainder goes one unit at a time to
+    the largest fractional parts. The counts sum to ``total`` unless the
+    bounds make that impossible.
+    """
+    scale = total / sum(weights)
+    shares = [weight * scale for weight in weights]
+    counts = [max(low, int(share)) for share in shares]
+    if high is not None:
+        counts = [min(high, count) for count in counts]
+    remainder = total - sum(counts)
+    step = 1 if remainder > 0 else -1
+    order = sorted(
+        range(len(counts)), key=lambda i: shares[i] - counts[i], reverse=step > 0
+    )
+    while remainder:
+        moved = False
+        for i in order:
+            count = counts[i] + step
+            if count < low or (high is not None and count > high):
+                continue
+            counts[i] = count
+            remainder -= step
+            moved = True
+            if not remainder:
+                break
+        if not moved:
+            break
+    return counts
+
+
+def _pick_books(rng: random.Random, count: int, popularity: List[float]) -> List[int]:
+    """Distinct book indexes drawn by popularity, in draw order."""
+    total = len(popularity)
+    if count * 4 > total:
+        return rng.sample(range(total), count)
+    picked: Dict[int, None] = {}
+    while len(picked) < count:
+        for index in rng.choices(
+            range(total), cum_weights=popularity, k=count - len(picked)
+        ):
+            picked[index] = None
+    return list(picked)
+
+
+def profile_rows(plan: DatasetPlan, start: int, stop: int) -> List[Tuple]:
+    rows = []
+    for index in range(start, stop):
+        rng = random.Random(f"{plan.seed}:user:{index}")
+        user_id = _uuid(rng)
+        created_at = _timestamp(rng)
+        rows.append(
+            (user_id, f"reader-{plan.seed}-{index}@example.com", created_at, created_at)
+        )
+    return rows
+
+
+def book_rows(
+    plan: DatasetPlan, ids: List[uuid.UUID], formats: List[str], start: int, stop: int
+) -> List[Tuple]:
+    rows = []
+    for index in range(start, stop):
+        rng = random.Random(f"{plan.seed}:book:{index}")
+        book_id, book_format = ids[index], formats[index]
+        num_pages = rng.randint(80, 1200)
+        chapter_counts = None
+        pdf_toc = None
+        if book_format == "epub":
+            chapter_counts = [
+                rng.randint(2_000, 40_000) for _ in range(rng.randint(8, 60))
+            ]
+        else:
+            pdf_toc = _json(
+                [
+                    {"title": f"Chapter {n + 1}", "page": page}
+                    for n, page in enumerate(
+                        sorted(rng.sample(range(1, num_pages), min(20, num_pages - 1)))
+                    )
+                ]
+            )
+        created_at = _timestamp(rng)
+        rows.append(
+            (
+                book_id,
+                _sentence(rng, 1, 6).rstrip("."),
+                f"{rng.choice(WORDS).capitalize()} {rng.choice(SURNAMES)}",
+                _sentence(rng, 20, 80) if rng.random() < 0.7 else None,
+                f"covers/{book_id}.jpg",
+                f"{book_id}.{book_format}",
+                book_format,
+                num_pages,
+                rng.randint(200_000, 40_000_000),
+                chapter_counts,
+                pdf_toc,
+                created_at,
+                created_at,
+            )
+        )
+    return rows
+
+
+class UserRows:
+    """Library, highlight and location rows for a range of users."""
+
+    def __init__(self, plan: DatasetPlan):
+        self.plan = plan
+        self.book_ids = plan.book_ids()
+        self.book_formats = plan.book_formats()
+        self.popularity = plan.book_popularity()
+        self.library_sizes = plan.library_sizes()
+        self.highlight_quotas = plan.highlight_quotas()
+        self.corpus = _corpus(plan.seed)
+        self.library: List[Tuple] = []
+        self.highlights: List[Tuple] = []
+        self.locations: List[Tuple] = []
+
+    def take(self) -> Tuple[List[Tuple], List[Tuple], List[Tuple]]:
+        batch = (self.library, self.highlights, self.locations)
+        self.library, self.highlights, self.locations = [], [], []
+        return batch
+
+    def add_user(self, index: int) -> None:
+        rng = random.Random(f"{self.plan.seed}:user:{index}")
+        # Same draws as profile_rows, so the IDs and timestamps line up
+        user_id = _uuid(rng)
+        joined_at = _timestamp(rng)
+        book_indexes = _pick_books(rng, self.library_sizes[index], self.popularity)
+        highlight_counts = _apportion(
+            self.highlight_quotas[index],
+            [rng.lognormvariate(0, HIGHLIGHTS_PER_ENTRY_SIGMA) for _ in book_indexes],
+        )
+        for book_index, count in zip(book_indexes, highlight_counts):
+            self._add_entry(rng, user_id, book_index, joined_at, count)
+
+    def _add_entry(
+        self,
+        rng: random.Random,
+        user_id: uuid.UUID,
+        book_index: int,
+        joined_at: datetime,
+        highlight_count: int,
+    ) -> None:
+        entry_id = _uuid(rng)
+        is_epub = self.book_formats[book_index] == "epub"
+        date_added = _timestamp(rng, joined_at)
+        updated_at = date_added
+        epub_progress = None
+        pdf_current_page = None
+        if rng.random() < PROGRESS_SHARE:
+            updated_at = _timestamp(rng, date_added)
+            if is_epub:
+                epub_progress = _json(
+                    {
+                        "chapter_idx": _between(rng, 0, 40),
+                        "percentage": round(rng.random(), 4),
+                    }
+                )
+            else:
+                pdf_current_page = _between(rng, 1, 600)
+        self.library.append(
+            (
+                entry_id,
+                user_id,
+                self.book_ids[book_index],
+                date_added,
+                epub_progress,
+                pdf_current_page,
+                updated_at,
+            )
+        )
+
+        colors, color_weights = zip(*COLOR_WEIGHTS)
+        for color in rng.choices(colors, weights=color_weights, k=highlight_count):
+            highlight_id = _uuid(rng)
+            created_at = _timestamp(rng, date_added)
+            self.highlights.append(
+                (
+                    highlight_id,
+                    entry_id,
+                    color,
+                    _passage(rng, self.corpus, 6, 60),
+                    _passage(rng, self.corpus, 3, 25)
+                    if rng.random() < NOTE_SHARE
+                    else None,
+                    created_at,
+                    created_at,
+                )
+            )
+            if is_epub:
+                chapter = _between(rng, 0, 40)
+                offset = _between(rng, 0, 30_000)
+                location = (
+                    chapter,
+                    f"chapter{chapter:03d}.xhtml",
+                    f"Chapter {chapter + 1}",
+                    None,
+                    _json(
+                        {
+                            "startOffset": offset,
+                            "endOffset": offset + _between(rng, 20, 600),
+                        }
+                    ),
+                    None,
+                )
+            else:
+                location = (
+                    None,
+                    None,
+                    None,
+                    _between(rng, 1, 600),
+                    None,
+                    _json(
+                        {
+                            "x": _between(rng, 0, 500),
+                            "y": _between(rng, 0, 700),
+                            "width": 400,
+                            "height": 40,
+                        }
+                    ),
+                )
+            self.locations.append((_uuid(rng), highlight_id, *location, created_at))
+
+
+def _dsn() -> str:
+    return get_database_url().replace("postgresql+asyncpg://", "postgresql://")
+
+
+async def _copy(
+    conn: asyncpg.Connection, table: str, columns: Sequence[str], rows: List[Tuple]
+) -> None:
+    if rows:
+        await conn.copy_records_to_table(table, records=rows, columns=columns)
+
+
+async def _load_users(
+    plan: DatasetPlan, start: int, stop: int, batch_size: int
+) -> Tuple[int, int, int]:
+    """Load one slice of users' libraries and highlights; returns row counts."""
+    rows = UserRows(plan)
+    totals = [0, 0, 0]
+    conn = await asyncpg.connect(_dsn())
+    try:
+        await conn.execute("SET synchronous_commit = off")
+
+        async def flush() -> None:
+            library, highlights, locations = rows.take()
+            async with conn.transaction():
+                await _copy(conn, "user_book_library", LIBRARY_COLUMNS, library)
+                await _copy(conn, "highlights", HIGHLIGHT_COLUMNS, highlights)
+                await _copy(conn, "highlight_locations", LOCATION_COLUMNS, locations)
+            for i, batch in enumerate((library, highlights, locations)):
+                totals[i] += len(batch)
+
+        for index in range(start, stop):
+            rows.add_user(index)
+            if len(rows.highlights) + len(rows.library) >= batch_size:
+                await flush()
+        await flush()
+    finally:
+        await conn.close()
+    return tuple(totals)
+
+
+def _load_users_worker(
+    plan: DatasetPlan, start: int, stop: int, batch_size: int
+) -> Tuple[int, int, int]:
+    return asyncio.run(_load_users(plan, start, stop, batch_size))
+
+
+async def _secondary_indexes(conn: asyncpg.Connection) -> List[Tuple[str, str]]:
+    """Indexes on the loaded tables that no constraint depends on."""
+    rows = await conn.fetch(
+        """
+        SELECT i.relname AS name, pg_get_indexdef(i.oid) AS definition
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        JOIN pg_class t ON t.oid = x.indrelid
+        JOIN pg_namespace n ON n.oid = t.relnamespace
+        WHERE n.nspname = 'public'
+          AND t.relname = ANY($1::text[])
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.oid)
+        """,
+        list(LOADED_TABLES),
+    )
+    return [(row["name"], row["definition"]) for row in rows]
+
+
+async def _set_sync_triggers(conn: asyncpg.Connection, enabled: bool) -> None:
+    action = "ENABLE" if enabled else "DISABLE"
+    for table in SYNCED_TABLES:
+        await conn.execute(
+            f"ALTER TABLE public.{table} {action} TRIGGER {table}_sync_change"
+        )
+
+
+async def _backfill_change_feed(conn: asyncpg.Connection) -> None:
+    """Add the loaded rows to the sync feed in three set-based inserts."""
+    await conn.execute(
+        """
+        INSERT INTO sync_changes (entity_type, entity_id, user_id)
+        SELECT 'library', id, user_id FROM user_book_library
+        ON CONFLICT (entity_type, entity_id) DO NOTHING
+        """
+    )
+    await conn.execute(
+        """
+        INSERT INTO sync_changes (entity_type, entity_id, user_id)
+        SELECT 'highlight', h.id, l.user_id
+        FROM highlights h JOIN user_book_library l ON l.id = h.user_book_lib_id
+        ON CONFLICT (entity_type, entity_id) DO NOTHING
+        """
+    )
+    await conn.execute(
+        """
+        INSERT INTO sync_changes (entity_type, entity_id, user_id)
+        SELECT 'highlight_location', hl.id, l.user_id
+        FROM highlight_locations hl
+        JOIN highlights h ON h.id = hl.highlight_id
+        JOIN user_book_library l ON l.id = h.user_book_lib_id
+        ON CONFLICT (entity_type, entity_id) DO NOTHING
+        """
+    )
+
+
+def _slices(total: int, parts: int) -> List[Tuple[int, int]]:
+    step = math.ceil(total / parts)
+    return [(start, min(start + step, total)) for start in range(0, total, step)]
+
+
+async def main(
+    plan: DatasetPlan,
+    jobs: int,
+    batch_size: int,
+    defer_indexes: bool,
+    change_feed: bool,
+) -> None:
+    results: Dict[str, object] = {"seed": plan.seed, "jobs": jobs}
+    conn = await asyncpg.connect(_dsn())
+    dropped: List[Tuple[str, str]] = []
+    try:
+        await _set_sync_triggers(conn, enabled=False)
+        if defer_indexes:
+            dropped = await _secondary_indexes(conn)
+            for name, _ in dropped:
+                await conn.execute(f'DROP INDEX public."{name}"')
+
+        with timed(results, "profiles_seconds"):
+            for start, stop in _slices(plan.users, max(1, plan.users // batch_size)):
+                await _copy(
+                    conn, "profiles", PROFILE_COLUMNS, profile_rows(plan, start, stop)
+                )
+
+        with timed(results, "books_seconds"):
+            ids, formats = plan.book_ids(), plan.book_formats()
+            for start, stop in _slices(plan.books, max(1, plan.books // batch_size)):
+                await _copy(
+                    conn,
+                    "book_metadata",
+                    BOOK_COLUMNS,
+                    book_rows(plan, ids, formats, start, stop),
+                )
+
+        with timed(results, "libraries_seconds"):
+            loop = asyncio.get_running_loop()
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                counts = await asyncio.gather(
+                    *(
+                        loop.run_in_executor(
+                            pool, _load_users_worker, plan, start, stop, batch_size
+                        )
+                        for start, stop in _slices(plan.users, jobs)
+                    )
+                )
+
+        if dropped:
+            with timed(results, "index_build_seconds"):
+                for _, definition in dropped:
+                    await conn.execute(definition)
+            dropped = []
+
+        if change_feed:
+            with timed(results, "change_feed_seconds"):
+                await _backfill_change_feed(conn)
+
+        with timed(results, "analyze_seconds"):
+            for table in LOADED_TABLES + ("sync_changes",):
+                await conn.execute(f"ANALYZE public.{table}")
+    finally:
+        # Leave the schema as the migrations define it even if the load failed
+        for _, definition in dropped:
+            await conn.execute(definition)
+        await _set_sync_triggers(conn, enabled=True)
+        await conn.close()
+
+    library, highlights, locations = (sum(c[i] for c in counts) for i in range(3))
+    results.update(
+        profiles=plan.users,
+        books=plan.books,
+        library_entries_requested=plan.library_entries,
+        library_entries=library,
+        highlights_requested=plan.highlights,
+        highlights=highlights,
+        highlight_locations=locations,
+        highlights_per_second=round(
+            highlights / max(results["libraries_seconds"], 1e-9)
+        ),
+    )
+    report("generate_dataset", results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--books", type=int, default=20_000)
+    parser.add_argument("--library-entries", type=int, default=100_000)
+    parser.add_argument("--highlights", type=int, default=2_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="worker processes for libraries and highlights",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=50_000, help="rows per COPY transaction"
+    )
+    parser.add_argument(
+        "--defer-indexes",
+        action="store_true",
+        help="drop secondary indexes during the load and rebuild them afterwards",
+    )
+    parser.add_argument(
+        "--no-change-feed",
+        dest="change_feed",
+        action="store_false",
+        help="do not add the loaded rows to sync_changes",
+    )
+    args = parser.parse_args()
+    # Every user gets at least one book and no user a book twice
+    if not args.users <= args.library_entries <= args.users * args.books:
+        parser.error("--library-entries must be between --users and --users * --books")
+    dataset = DatasetPlan(
+        seed=args.seed,
+        users=args.users,
+        books=args.books,
+        library_entries=args.library_entries,
+        highlights=args.highlights,
+    )
+    asyncio.run(
+        main(dataset, args.jobs, args.batch_size, args.defer_indexes, args.change_feed)
+    )
@@ -0,0 +1,83 @@
+"""Compare per-row ORM deletes with the set-based highlight delete.
+
+Usage:
+    python -m benchmarks.highlight_delete --rows 10000
+"""
+
+import argparse
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import selectinload
+
+from app.models.book_models import Highlight, UserBookLibrary
+from app.repositories.highlights import HighlightRepository
+from benchmarks.common import (
+    create_engine,
+    drop_user,
+    report,
+    seed_highlights,
+    seed_library_entry,
+    seed_user,
+    timed,
+)
+
+
+async def delete_row_by_row(db: AsyncSession, user_id, book_id) -> int:
+    """The previous approach: load every highlight and delete it through the ORM."""
+    query = (
+        select(Highlight)
+        .join(UserBookLibrary)
+        .where(
+            UserBookLibrary.user_id == user_id,
+            UserBookLibrary.book_metadata_id == book_id,
+        )
+        .options(selectinload(Highlight.locations))
+    )
+    highlights = (await db.execute(query)).scalars().all()
+    for highlight in highlights:
+        for location in highlight.locations:
+            await db.delete(location)
+        await db.delete(highlight)
+    await db.commit()
+    return len(highlights)
+
+
+async def main(rows: int) -> None:
+    engine = create_engine()
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    repo = HighlightRepository()
+    results = {"rows": rows}
+
+    async with session_factory() as db:
+        user_id = await seed_user(db)
+        book_id = await seed_library_entry(db, user_id)
+        await db.commit()
+
+        try:
+            await seed_highlights(db, user_id, book_id, rows)
+            await db.commit()
+            with timed(results, "row_by_row_seconds"):
+                await delete_row_by_row(db, user_id, book_id)
+
+            await seed_highlights(db, user_id, book_id, rows)
+            await db.commit()
+            with timed(results, "set_based_seconds"):
+                deleted = await repo.delete_by_book(db, user_id, book_id)
+            results["set_based_deleted"] = len(deleted)
+        finally:
+            await drop_user(db, user_id)
+            await db.commit()
+
+    await engine.dispose()
+    results["speedup"] = round(
+        results["row_by_row_seconds"] / results["set_based_seconds"], 1
+    )
+    report("highlight_delete", results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    asyncio.run(main(parser.parse_args().rows))
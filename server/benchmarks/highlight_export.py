@@ -0,0 +1,128 @@
+"""Export a seeded user's highlights through the API in every format.
+
+Calls ``GET /api/v1/highlights/export`` on the app from
+``benchmarks.loadtest_app`` in-process, checks each body has one entry per
+highlight (and that Markdown files chapterless highlights under their own
+heading), and reports time and throughput. Exits non-zero on a mismatch.
+
+The app reads from ``SUPABASE_DB_CONNECTION``, so point
+``BENCH_DATABASE_URL`` at the same database, or pass ``--local`` to start a
+throwaway one.
+
+Usage:
+    python -m benchmarks.highlight_export --local --rows 20000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from typing import Any, Dict, List
+
+import httpx
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models.book_models import HighlightLocation
+from benchmarks.common import (
+    create_engine,
+    drop_user,
+    report,
+    seed_highlights,
+    seed_library_entry,
+    seed_user,
+)
+
+
+def check(export_format: str, body: str, rows: int) -> List[str]:
+    lines = body.splitlines()
+    if export_format == "ndjson":
+        count = len(lines)
+    elif export_format == "csv":
+        count = len(lines) - 1
+    else:
+        count = sum(line.startswith("> ") for line in lines)
+    problems = [] if count == rows else [f"{count} entries, expected {rows}"]
+    if export_format == "markdown" and body.count("### Other highlights") != 1:
+        problems.append(
+            "chapterless highlights not under one 'Other highlights' heading"
+        )
+    return problems
+
+
+async def main(rows: int, chapterless: int) -> int:
+    from benchmarks.loadtest_app import BENCH_USER_HEADER, create_app
+
+    engine = create_engine()
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    results: Dict[str, Any] = {"rows": rows, "formats": {}}
+    failures = 0
+
+    async with session_factory() as db:
+        user_id = await seed_user(db)
+        try:
+            per_book = rows // 2
+            for count in (per_book, rows - per_book):
+                book_id = await seed_library_entry(db, user_id)
+                highlight_ids = await seed_highlights(db, user_id, book_id, count)
+            # The last book mixes highlights with and without a chapter
+            await db.execute(
+                update(HighlightLocation)
+                .where(HighlightLocation.highlight_id.in_(highlight_ids[:chapterless]))
+                .values(chapter_idx=None)
+            )
+            await db.commit()
+
+            transport = httpx.ASGITransport(app=create_app())
+            async with httpx.AsyncClient(
+                transport=transport,
+                base_url="http://bench",
+                headers={BENCH_USER_HEADER: str(user_id)},
+                timeout=None,
+            ) as client:
+                for export_format in ("ndjson", "csv", "markdown"):
+                    start = asyncio.get_running_loop().time()
+                    response = await client.get(
+                        "/api/v1/highlights/export", params={"format": export_format}
+                    )
+                    seconds = asyncio.get_running_loop().time() - start
+                    problems = (
+                        [f"status {response.status_code}"]
+                        if response.status_code != 200
+                        else check(export_format, response.text, rows)
+                    )
+                    failures += bool(problems)
+                    results["formats"][export_format] = {
+                        "seconds": round(seconds, 3),
+                        "bytes": len(response.content),
+                        "mb_per_second": round(
+                            len(response.content) / seconds / 1e6, 1
+                        ),
+                        "problems": problems,
+                    }
+        finally:
+            await drop_user(db, user_id)
+            await db.commit()
+
+    await engine.dispose()
+    results["failures"] = failures
+    report("highlight_export", results)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--chapterless", type=int, default=100)
+    parser.add_argument(
+        "--local", action="store_true", help="start a throwaway Postgres first"
+    )
+    args = parser.parse_args()
+    if args.local:
+        from benchmarks.local_postgres import LocalPostgres
+
+        with LocalPostgres() as url:
+            os.environ["BENCH_DATABASE_URL"] = url
+            os.environ["SUPABASE_DB_CONNECTION"] = url
+            sys.exit(asyncio.run(main(args.rows, args.chapterless)))
+    sys.exit(asyncio.run(main(args.rows, args.chapterless)))
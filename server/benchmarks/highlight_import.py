@@ -0,0 +1,117 @@
+"""Time a bulk highlight import through the COPY + merge path.
+
+The file ends with a few rows that cannot be imported (a truncated line and
+JSON values that are not objects); they must be counted as skipped.
+
+Usage:
+    python -m benchmarks.highlight_import --rows 100000
+    python -m benchmarks.highlight_import --local --rows 20000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+
+import orjson
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.schemas.highlights import ExportFormat
+from app.services import imports as import_service
+from benchmarks.common import (
+    create_engine,
+    drop_user,
+    report,
+    seed_library_entry,
+    seed_user,
+    timed,
+)
+
+BAD_ROWS = [b'{"book_id": "truncated", "te\n', b"[1, 2]\n", b'"text"\n', b"null\n"]
+
+
+def write_import_file(path: str, book_ids: list, rows: int, duplicate_ratio: float):
+    rng = random.Random(0)
+    with open(path, "wb") as f:
+        for i in range(rows):
+            n = rng.randrange(i) if i and rng.random() < duplicate_ratio else i
+            f.write(
+                orjson.dumps(
+                    {
+                        "book_id": str(book_ids[n % len(book_ids)]),
+                        "text": f"Imported highlight number {n}",
+                        "color": rng.choice(["yellow", "green", "blue"]),
+                        "note": "a note" if n % 5 == 0 else None,
+                        "chapter_idx": n % 30,
+                        "chapter_title": f"Chapter {n % 30 + 1}",
+                        "page": n % 300,
+                    }
+                )
+                + b"\n"
+            )
+        f.writelines(BAD_ROWS)
+
+
+async def main(rows: int, books: int, duplicate_ratio: float) -> int:
+    engine = create_engine()
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    results = {"rows": rows, "books": books}
+
+    async with session_factory() as db:
+        user_id = await seed_user(db)
+        book_ids = [await seed_library_entry(db, user_id) for _ in range(books)]
+        await db.commit()
+
+    fd, path = tempfile.mkstemp(suffix=".ndjson")
+    os.close(fd)
+    write_import_file(path, book_ids, rows, duplicate_ratio)
+    results["file_bytes"] = os.path.getsize(path)
+
+    try:
+        async with session_factory() as db:
+            job = await import_service.create_import(db, user_id, ExportFormat.NDJSON)
+        with timed(results, "import_seconds"):
+            await import_service.run_import(job, path, session_factory)
+        results["job"] = job.model_dump(mode="json", exclude={"user_id"})
+        async with session_factory() as db:
+            stored = await import_service.get_import(db, user_id, job.id)
+        # Stored timestamps come back timezone-aware
+        timestamps = {"created_at", "finished_at"}
+        results["stored_status_matches"] = stored is not None and stored.model_dump(
+            exclude=timestamps
+        ) == job.model_dump(exclude=timestamps)
+        results["rows_per_second"] = round(rows / results["import_seconds"])
+    finally:
+        async with session_factory() as db:
+            await drop_user(db, user_id)
+            await db.commit()
+        await engine.dispose()
+
+    report("highlight_import", results)
+    job = results["job"]
+    ok = (
+        job["status"] == "completed"
+        and job["rows_skipped"] == len(BAD_ROWS)
+        and results["stored_status_matches"]
+    )
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--books", type=int, default=20)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.05)
+    parser.add_argument(
+        "--local", action="store_true", help="start a throwaway Postgres first"
+    )
+    args = parser.parse_args()
+    if args.local:
+        from benchmarks.local_postgres import LocalPostgres
+
+        with LocalPostgres() as url:
+            os.environ["BENCH_DATABASE_URL"] = url
+            sys.exit(asyncio.run(main(args.rows, args.books, args.duplicate_ratio)))
+    sys.exit(asyncio.run(main(args.rows, args.books, args.duplicate_ratio)))
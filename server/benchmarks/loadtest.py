@@ -0,0 +1,461 @@
+"""End-to-end load test against a locally started API server.
+
+Seeds users with books and highlights, starts ``benchmarks.loadtest_app``
+under uvicorn, and drives a weighted mix of library listing, progress
+updates, highlight CRUD and uploads from ``--concurrency`` workers. Prints
+throughput and p50/p95/p99 latency per operation as JSON.
+
+Without ``BENCH_DATABASE_URL`` a throwaway local cluster is started (see
+``benchmarks.local_postgres``). Save a run with ``--output`` and pass it as
+``--baseline`` on a later commit to flag regressions; the exit status is 1
+when any operation regressed by more than ``--tolerance``.
+
+Usage:
+    python -m benchmarks.loadtest --concurrency 32 --duration 30 --output base.json
+    python -m benchmarks.loadtest --concurrency 32 --duration 30 --baseline base.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from benchmarks.common import (
+    create_engine,
+    drop_user,
+    report,
+    seed_highlights,
+    seed_library_entry,
+    seed_user,
+)
+from benchmarks.local_postgres import SERVER_ROOT, LocalPostgres, free_port
+
+API = "/api/v1"
+
+# Relative frequency of each operation in the mix
+DEFAULT_MIX = {
+    "library": 20,
+    "progress": 25,
+    "highlights_list": 20,
+    "highlight_create": 10,
+    "highlight_note": 8,
+    "highlights_batch_get": 7,
+    "highlight_delete": 5,
+    "upload": 5,
+}
+
+UPLOAD_BYTES = 256 * 1024
+
+
+@dataclass
+class UserState:
+    user_id: uuid.UUID
+    book_ids: List[uuid.UUID]
+    highlight_ids: List[uuid.UUID] = field(default_factory=list)
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"X-Bench-User": str(self.user_id)}
+
+
+@dataclass
+class Recorder:
+    warmup_until: float
+    latencies: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
+    errors: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    def record(self, op: str, seconds: float, ok: bool) -> None:
+        if time.perf_counter() < self.warmup_until:
+            return
+        self.latencies[op].append(seconds)
+        if not ok:
+            self.errors[op] += 1
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Operations:
+    """The request mix; each method issues one request and returns its response."""
+
+    def __init__(self, client: httpx.AsyncClient, rng: random.Random):
+        self.client = client
+        self.rng = rng
+        self.upload_body = rng.randbytes(UPLOAD_BYTES)
+
+    async def library(self, user: UserState) -> httpx.Response:
+        return await self.client.get(
+            f"{API}/books/library", params={"limit": 50}, headers=user.headers
+        )
+
+    async def progress(self, user: UserState) -> httpx.Response:
+        book_id = self.rng.choice(user.book_ids)
+        return await self.client.put(
+            f"{API}/books/{book_id}/progress",
+            json={
+                "epub_progress": {
+                    "chapter": self.rng.randrange(40),
+                    "percentage": self.rng.random(),
+                }
+            },
+            headers=user.headers,
+        )
+
+    async def highlights_list(self, user: UserState) -> httpx.Response:
+        book_id = self.rng.choice(user.book_ids)
+        return await self.client.get(
+            f"{API}/highlights/book/{book_id}", headers=user.headers
+        )
+
+    async def highlight_create(self, user: UserState) -> httpx.Response:
+        response = await self.client.post(
+            f"{API}/highlights/",
+            json={
+                "book_id": str(self.rng.choice(user.book_ids)),
+                "text": f"load test highlight {self.rng.random()}",
+                "color": "yellow",
+                "epub_chapter_idx": self.rng.randrange(40),
+                "epub_est_page": self.rng.randrange(400),
+            },
+            headers=user.headers,
+        )
+        if response.status_code == 200:
+            user.highlight_ids.append(uuid.UUID(response.json()["id"]))
+        return response
+
+    async def highlight_note(self, user: UserState) -> httpx.Response:
+        highlight_id = self.rng.choice(user.highlight_ids)
+        return await self.client.put(
+            f"{API}/highlights/{highlight_id}/note",
+            params={"note": f"note {self.rng.random()}"},
+            headers=user.headers,
+        )
+
+    async def highlights_batch_get(self, user: UserState) -> httpx.Response:
+        ids = self.rng.sample(user.highlight_ids, min(20, len(user.highlight_ids)))
+        return await self.client.post(
+            f"{API}/highlights:batchGet",
+            json={"ids": [str(i) for i in ids]},
+            headers=user.headers,
+        )
+
+    async def highlight_delete(self, user: UserState) -> httpx.Response:
+        index = self.rng.randrange(len(user.highlight_ids))
+        highlight_id = user.highlight_ids.pop(index)
+        return await self.client.delete(
+            f"{API}/highlights/{highlight_id}", headers=user.headers
+        )
+
+    async def upload(self, user: UserState) -> httpx.Response:
+        book_id = self.rng.choice(user.book_ids)
+        return await self.client.post(
+            f"{API}/upload/",
+            params={"book_id": str(book_id)},
+            files={"file": ("book.epub", self.upload_body, "application/epub+zip")},
+            headers=user.headers,
+        )
+
+
+async def seed(users: int, books: int, highlights: int) -> List[UserState]:
+    engine = create_engine()
+    states = []
+    async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+        for _ in range(users):
+            user_id = await seed_user(db)
+            state = UserState(user_id=user_id, book_ids=[])
+            for _ in range(books):
+                book_id = await seed_library_entry(db, user_id)
+                state.book_ids.append(book_id)
+                state.highlight_ids.extend(
+                    await seed_highlights(db, user_id, book_id, highlights)
+                )
+            states.append(state)
+        await db.commit()
+    await engine.dispose()
+    return states
+
+
+async def cleanup(states: List[UserState]) -> None:
+    engine = create_engine()
+    async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+        for state in states:
+            await drop_user(db, state.user_id)
+        await db.commit()
+    await engine.dispose()
+
+
+@contextlib.contextmanager
+def api_server(database_url: str, storage_dir: str, workers: Optional[int] = None):
+    """Start the load-test app and yield its base URL.
+
+    Runs a single uvicorn process, or ``workers`` workers under the
+    production launcher ``app.server``.
+    """
+    port = free_port()
+    env = {
+        **os.environ,
+        "SUPABASE_DB_CONNECTION": database_url,
+        "BENCH_STORAGE_DIR": storage_dir,
+        "ENVIRONMENT": "benchmark",
+        "LOG_LEVEL": "WARNING",
+        "ACCESS_LOG_SAMPLE_RATE": "0",
+    }
+    for name in (
+        "SUPABASE_URL",
+        "SUPABASE_KEY",
+        "SUPABASE_JWT_SECRET",
+        "SUPABASE_SERVICE_ROLE_KEY",
+    ):
+        env.setdefault(name, "unused-by-loadtest")
+    # A few users stand in for many clients, so per-user limits would only
+    # measure the limiter; set RATE_LIMIT_ENABLED=true to include it
+    env.setdefault("RATE_LIMIT_ENABLED", "false")
+    if workers:
+        command = [
+            sys.executable,
+            "-m",
+            "app.server",
+            "--app",
+            "benchmarks.loadtest_app:create_app",
+            "--workers",
+            str(workers),
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ]
+    else:
+        command = [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "benchmarks.loadtest_app:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ]
+    process = subprocess.Popen(command, cwd=SERVER_ROOT, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError("API server exited during startup")
+            try:
+                if httpx.get(f"{base_url}/metrics").status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError("API server did not start within 30s")
+            time.sleep(0.2)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+async def drive(
+    base_url: str,
+    states: List[UserState],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    mix: Dict[str, int],
+    seed_value: int,
+) -> Recorder:
+    start = time.perf_counter()
+    recorder = Recorder(warmup_until=start + warmup)
+    stop_at = start + warmup + duration
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    names = list(mix)
+    weights = [mix[name] for name in names]
+
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=30
+    ) as client:
+
+        async def worker(index: int) -> None:
+            rng = random.Random(seed_value + index)
+            ops = Operations(client, rng)
+            user = states[index % len(states)]
+            while time.perf_counter() < stop_at:
+                op = rng.choices(names, weights)[0]
+                # Keep a pool of highlights for the id-based operations
+                if (
+                    op in ("highlight_note", "highlights_batch_get", "highlight_delete")
+                    and len(user.highlight_ids) < 10
+                ):
+                    op = "highlight_create"
+                call: Callable = getattr(ops, op)
+                op_start = time.perf_counter()
+                try:
+                    response = await call(user)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                recorder.record(op, time.perf_counter() - op_start, ok)
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return recorder
+
+
+def summarize(recorder: Recorder, duration: float) -> Dict[str, Any]:
+    endpoints = {}
+    for op, latencies in sorted(recorder.latencies.items()):
+        latencies.sort()
+        endpoints[op] = {
+            "requests": len(latencies),
+            "errors": recorder.errors.get(op, 0),
+            "throughput_rps": round(len(latencies) / duration, 1),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2),
+        }
+    total = sum(e["requests"] for e in endpoints.values())
+    return {
+        "total_requests": total,
+        "total_errors": sum(e["errors"] for e in endpoints.values()),
+        "throughput_rps": round(total / duration, 1),
+        "endpoints": endpoints,
+    }
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    """List operations whose p99 or throughput moved past ``tolerance``."""
+    regressions = []
+    for op, current in results["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(op)
+        if not before:
+            continue
+        if before["p99_ms"] and current["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{op}: p99 {before['p99_ms']}ms -> {current['p99_ms']}ms"
+            )
+        if before["throughput_rps"] and current["throughput_rps"] < before[
+            "throughput_rps"
+        ] * (1 - tolerance):
+            regressions.append(
+                f"{op}: throughput {before['throughput_rps']} -> {current['throughput_rps']} rps"
+            )
+    return regressions
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=SERVER_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace, database_url: str) -> Dict[str, Any]:
+    os.environ["BENCH_DATABASE_URL"] = database_url
+    states = await seed(args.users, args.books, args.highlights)
+    storage_dir = tempfile.mkdtemp(prefix="readspace-bench-storage-")
+    try:
+        with api_server(database_url, storage_dir, args.workers) as base_url:
+            recorder = await drive(
+                base_url,
+                states,
+                args.concurrency,
+                args.duration,
+                args.warmup,
+                DEFAULT_MIX,
+                args.seed,
+            )
+    finally:
+        shutil.rmtree(storage_dir, ignore_errors=True)
+        await cleanup(states)
+
+    return {
+        "commit": git_commit(),
+        "config": {
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "users": args.users,
+            "books_per_user": args.books,
+            "highlights_per_book": args.highlights,
+            "seed": args.seed,
+            "mix": DEFAULT_MIX,
+        },
+        **summarize(recorder, args.duration),
+    }
+
+
+def main(args: argparse.Namespace) -> int:
+    database_url = os.environ.get("BENCH_DATABASE_URL")
+    with contextlib.ExitStack() as stack:
+        if not database_url:
+            database_url = stack.enter_context(LocalPostgres())
+        results = asyncio.run(run(args, database_url))
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        results["regressions"] = regressions
+        status = 1 if regressions else 0
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    report("loadtest", results)
+    return status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument(
+        "--workers", type=int, help="serve with app.server and this many workers"
+    )
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument(
+        "--warmup", type=float, default=5, help="unmeasured seconds first"
+    )
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--books", type=int, default=20, help="books per user")
+    parser.add_argument(
+        "--highlights", type=int, default=50, help="highlights per book"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,51 @@
+"""The API as served to the load test.
+
+Wraps ``app.main:app`` with dependency overrides so no Supabase project is
+needed: the caller picks its user with ``X-Bench-User`` instead of a JWT,
+and uploads go to ``FilesystemStorageClient`` under ``BENCH_STORAGE_DIR``.
+
+Run with ``uvicorn benchmarks.loadtest_app:app``, or under the production
+launcher with ``python -m app.server --app benchmarks.loadtest_app:create_app``.
+"""
+
+import os
+import tempfile
+
+from fastapi import FastAPI, HTTPException, Request, status
+
+from app import main
+from app.repositories.supabase import get_storage_client
+from app.schemas.auth import TokenData
+from app.services.auth import get_current_user
+from benchmarks.fakes import FilesystemStorageClient
+
+BENCH_USER_HEADER = "X-Bench-User"
+
+storage_client = FilesystemStorageClient(
+    os.environ.get("BENCH_STORAGE_DIR")
+    or tempfile.mkdtemp(prefix="readspace-bench-storage-")
+)
+
+
+def bench_user(request: Request) -> TokenData:
+    user_id = request.headers.get(BENCH_USER_HEADER)
+    if not user_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=f"Missing {BENCH_USER_HEADER} header",
+        )
+    return TokenData(sub=user_id, role="user")
+
+
+def create_app() -> FastAPI:
+    app = main.create_app()
+    app.dependency_overrides[get_current_user] = bench_user
+    app.dependency_overrides[get_storage_client] = lambda: storage_client
+    return app
+
+
+def __getattr__(name: str):
+    if name == "app":
+        app = globals()["app"] = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
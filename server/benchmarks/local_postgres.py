@@ -0,0 +1,133 @@
+"""Throwaway Postgres cluster for benchmarks, without containers.
+
+Uses the ``initdb`` and ``pg_ctl`` binaries found on PATH (or under
+``PG_BIN``) to start a cluster in a temporary directory, adds the small
+slice of Supabase's ``auth`` schema the migrations depend on, and runs the
+alembic migrations against it. Durability is switched off; the cluster is
+deleted on exit.
+"""
+
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+SERVER_ROOT = Path(__file__).resolve().parent.parent
+
+# Enough of Supabase's auth schema for the profiles trigger in the migrations
+AUTH_SCHEMA_SQL = """
+CREATE SCHEMA IF NOT EXISTS auth;
+CREATE TABLE IF NOT EXISTS auth.users (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    email text,
+    raw_user_meta_data jsonb,
+    created_at timestamptz DEFAULT now(),
+    updated_at timestamptz DEFAULT now()
+);
+"""
+
+
+def _find_binary(name: str) -> str:
+    pg_bin = os.environ.get("PG_BIN")
+    path = shutil.which(name, path=pg_bin) if pg_bin else shutil.which(name)
+    if path is None:
+        raise RuntimeError(
+            f"{name} not found; install Postgres or set PG_BIN, "
+            "or point BENCH_DATABASE_URL at an existing database"
+        )
+    return path
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class LocalPostgres:
+    """Context manager that yields a migrated ``postgresql://`` URL."""
+
+    def __init__(self, port: Optional[int] = None):
+        self.port = port or free_port()
+        self.data_dir: Optional[str] = None
+
+    @property
+    def url(self) -> str:
+        return f"postgresql://postgres@127.0.0.1:{self.port}/postgres"
+
+    def __enter__(self) -> str:
+        self.data_dir = tempfile.mkdtemp(prefix="readspace-bench-pg-")
+        subprocess.run(
+            [
+                _find_binary("initdb"),
+                "-D",
+                self.data_dir,
+                "-U",
+                "postgres",
+                "-A",
+                "trust",
+                "--no-sync",
+            ],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        subprocess.run(
+            [
+                _find_binary("pg_ctl"),
+                "-D",
+                self.data_dir,
+                "-w",
+                "-l",
+                os.path.join(self.data_dir, "server.log"),
+                "-o",
+                f"-p {self.port} -k {self.data_dir} -c fsync=off "
+                "-c synchronous_commit=off -c full_page_writes=off "
+                "-c max_connections=200",
+                "start",
+            ],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            subprocess.run(
+                [
+                    _find_binary("psql"),
+                    "-h",
+                    "127.0.0.1",
+                    "-p",
+                    str(self.port),
+                    "-U",
+                    "postgres",
+                    "-q",
+                    "-v",
+                    "ON_ERROR_STOP=1",
+                    "-c",
+                    AUTH_SCHEMA_SQL,
+                ],
+                check=True,
+            )
+            subprocess.run(
+                [sys.executable, "-m", "alembic", "upgrade", "head"],
+                check=True,
+                cwd=SERVER_ROOT,
+                env={**os.environ, "SUPABASE_DB_CONNECTION": self.url},
+            )
+        except BaseException:
+            self.__exit__(None, None, None)
+            raise
+        return self.url
+
+    def __exit__(self, *exc) -> None:
+        if self.data_dir is None:
+            return
+        subprocess.run(
+            [_find_binary("pg_ctl"), "-D", self.data_dir, "-m", "immediate", "stop"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+        self.data_dir = None
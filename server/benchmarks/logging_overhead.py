@@ -0,0 +1,93 @@
+"""Measure what a log call costs the request path when stdout is slow.
+
+Compares structlog writing straight to the stream (the previous setup)
+with the queued pipeline from ``setup_logging``, against a stream that
+takes ``--write-delay-us`` per write to stand in for a blocked pipe or a
+slow log collector. No database needed.
+
+Usage:
+    python -m benchmarks.logging_overhead --calls 20000 --write-delay-us 50
+"""
+
+import argparse
+import io
+import time
+from typing import Any, Callable, Dict, List
+
+import structlog
+
+from app.utils import logging_config
+from benchmarks.common import report
+
+
+class SlowStream(io.TextIOBase):
+    """Text stream whose writes block for a fixed time, releasing the GIL like real I/O."""
+
+    def __init__(self, delay_seconds: float):
+        self.delay_seconds = delay_seconds
+        self.lines = 0
+
+    def write(self, text: str) -> int:
+        time.sleep(self.delay_seconds)
+        self.lines += text.count("\n")
+        return len(text)
+
+
+def configure_direct(stream: SlowStream) -> None:
+    structlog.reset_defaults()
+    structlog.configure(
+        processors=[
+            structlog.contextvars.merge_contextvars,
+            structlog.processors.add_log_level,
+            structlog.processors.TimeStamper(fmt="iso"),
+            structlog.processors.JSONRenderer(),
+        ],
+        logger_factory=structlog.PrintLoggerFactory(stream),
+        cache_logger_on_first_use=True,
+    )
+
+
+def configure_queued(stream: SlowStream) -> None:
+    structlog.reset_defaults()
+    logging_config.setup_logging(stream)
+
+
+def measure(
+    configure: Callable[[SlowStream], None], calls: int, delay: float
+) -> Dict[str, Any]:
+    stream = SlowStream(delay)
+    configure(stream)
+    logger = structlog.get_logger("bench")
+    durations: List[float] = []
+    start = time.perf_counter()
+    for i in range(calls):
+        call_start = time.perf_counter()
+        logger.info("Request completed", route="/books/{book_id}", status_code=200, n=i)
+        durations.append(time.perf_counter() - call_start)
+    caller_seconds = time.perf_counter() - start
+    logging_config.shutdown_logging()
+    durations.sort()
+    return {
+        "caller_seconds": round(caller_seconds, 4),
+        "us_per_call_p50": round(durations[len(durations) // 2] * 1e6, 1),
+        "us_per_call_p99": round(durations[int(len(durations) * 0.99)] * 1e6, 1),
+        "lines_written": stream.lines,
+    }
+
+
+def main(calls: int, write_delay_us: float) -> None:
+    delay = write_delay_us / 1e6
+    results: Dict[str, Any] = {"calls": calls, "write_delay_us": write_delay_us}
+    results["direct"] = measure(configure_direct, calls, delay)
+    results["queued"] = measure(configure_queued, calls, delay)
+    # setup_logging writes one line of its own
+    results["queued"]["dropped"] = calls + 1 - results["queued"]["lines_written"]
+    report("logging_overhead", results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=20_000)
+    parser.add_argument("--write-delay-us", type=float, default=50)
+    args = parser.parse_args()
+    main(args.calls, args.write_delay_us)
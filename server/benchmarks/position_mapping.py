@@ -0,0 +1,113 @@
+"""Compare location/page conversion by linear scan with prefix-sum lookups.
+
+Runs without a database. The linear paths do what the web reader does for
+every conversion: sum the counts of the chapters (or pages) before the
+target, or walk them until the target offset is passed. The indexed paths
+use ``PositionMap``, whose prefix sums are built once per book.
+
+Usage:
+    python -m benchmarks.position_mapping --chapters 300 --pages 2000
+"""
+
+import argparse
+import random
+import time
+from typing import Callable, Dict, List, Tuple
+
+from app.services.positions import PositionMap
+from benchmarks.common import report
+
+
+def linear_page_of(
+    chapter_counts: List[int], page_counts: List[int], chapter: int, char: int
+) -> int:
+    offset = sum(chapter_counts[:chapter]) + char
+    cumulative = 0
+    for page, count in enumerate(page_counts, start=1):
+        cumulative += count
+        if offset < cumulative:
+            return page
+    return len(page_counts)
+
+
+def linear_location_of(
+    chapter_counts: List[int], page_counts: List[int], page: int
+) -> Tuple[int, int]:
+    offset = sum(page_counts[: page - 1])
+    cumulative = 0
+    for chapter, count in enumerate(chapter_counts):
+        if offset < cumulative + count:
+            return chapter, offset - cumulative
+        cumulative += count
+    return len(chapter_counts) - 1, offset - cumulative + chapter_counts[-1]
+
+
+def timed_us(call: Callable[[], object], lookups: int) -> float:
+    start = time.perf_counter()
+    call()
+    return round((time.perf_counter() - start) / lookups * 1e6, 3)
+
+
+def main(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    page_counts = [rng.randint(1800, 2800) for _ in range(args.pages)]
+    total = sum(page_counts)
+    cuts = sorted(rng.sample(range(1, total), args.chapters - 1))
+    chapter_counts = [b - a for a, b in zip([0] + cuts, cuts + [total])]
+
+    locations = []
+    for _ in range(args.lookups):
+        chapter = rng.randrange(args.chapters)
+        locations.append((chapter, rng.randrange(chapter_counts[chapter] or 1)))
+    pages = [rng.randint(1, args.pages) for _ in range(args.lookups)]
+
+    start = time.perf_counter()
+    positions = PositionMap(chapter_counts, page_counts)
+    build_us = (time.perf_counter() - start) * 1e6
+
+    # Both paths must agree before their speed means anything
+    for chapter, char in locations[:100]:
+        assert positions.page_of(chapter, char) == linear_page_of(
+            chapter_counts, page_counts, chapter, char
+        )
+    for page in pages[:100]:
+        assert positions.location_of(page) == linear_location_of(
+            chapter_counts, page_counts, page
+        )
+
+    results: Dict[str, object] = {
+        "chapters": args.chapters,
+        "pages": args.pages,
+        "lookups": args.lookups,
+        "build_us": round(build_us, 1),
+    }
+    results["to_page_us"] = {
+        "linear": timed_us(
+            lambda: [
+                linear_page_of(chapter_counts, page_counts, c, o) for c, o in locations
+            ],
+            args.lookups,
+        ),
+        "prefix_sums": timed_us(
+            lambda: [positions.page_of(c, o) for c, o in locations], args.lookups
+        ),
+    }
+    results["to_location_us"] = {
+        "linear": timed_us(
+            lambda: [linear_location_of(chapter_counts, page_counts, p) for p in pages],
+            args.lookups,
+        ),
+        "prefix_sums": timed_us(
+            lambda: [positions.location_of(p) for p in pages], args.lookups
+        ),
+    }
+    report("position_mapping", results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chapters", type=int, default=300)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    main(parser.parse_args())
@@ -0,0 +1,493 @@
+"""Check the query plans of repository methods against a large dataset.
+
+Each case calls one repository method inside a transaction that is rolled
+back afterwards, records every statement the method sends, and runs
+``EXPLAIN (FORMAT JSON)`` on it (with ANALYZE for reads, so estimates can
+be compared with actual row counts). A case fails when a plan
+
+* sequentially scans a table with more than ``--min-table-rows`` rows,
+* does not use an index the case expects, or
+* estimates more rows than the case allows, or misestimates the rows it
+  actually returned by more than ``--max-misestimate`` times.
+
+The subject user is taken from the top percentile by library size, so
+plans are checked where they hurt most. Load a dataset with
+``benchmarks.generate_dataset`` first, or pass ``--local`` to start a
+throwaway cluster and generate one. Exits with status 1 on any failure.
+
+Usage:
+    python -m benchmarks.query_plans
+    python -m benchmarks.query_plans --local --users 5000 --highlights 1000000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.repositories.books import BookRepository
+from app.repositories.highlights import HighlightRepository
+from app.repositories.sync import SyncRepository
+from app.schemas.highlights import HighlightCreate
+from benchmarks.common import create_engine, report
+
+books = BookRepository()
+highlights = HighlightRepository()
+sync = SyncRepository()
+
+# Catalog-wide listings read the whole table by design
+CATALOG_TABLES = ("book_metadata",)
+
+
+@dataclass
+class Subject:
+    """Rows of one heavy user that the cases run against."""
+
+    user_id: Any
+    book_id: Any
+    book_ids: List[Any]
+    highlight_ids: List[Any]
+    highlight_text: str
+    library_ids: List[Any]
+
+
+@dataclass
+class PlanCase:
+    name: str
+    run: Callable[[AsyncSession, Subject], Awaitable[Any]]
+    expect_indexes: Tuple[str, ...] = ()
+    allow_seq_scan: Tuple[str, ...] = ()
+    max_rows: Optional[int] = None
+
+
+@dataclass
+class Statement:
+    sql: str
+    parameters: Any
+    plan: Dict[str, Any] = field(default_factory=dict)
+    analyzed: bool = False
+
+
+async def _drain(rows) -> None:
+    async for _ in rows:
+        pass
+
+
+async def _second_overview_page(db: AsyncSession, s: Subject) -> Any:
+    page = await books.get_library_overview(db, s.user_id, limit=50)
+    if page:
+        last = page[-1]
+        await books.get_library_overview(
+            db, s.user_id, after=(last["date_added"], last["library_id"]), limit=50
+        )
+
+
+CASES = [
+    PlanCase(
+        "books.get",
+        lambda db, s: books.get(db, s.book_id),
+        expect_indexes=("book_metadata_pkey",),
+        max_rows=1,
+    ),
+    PlanCase(
+        "books.get_many",
+        lambda db, s: books.get_many(db, s.book_ids),
+        expect_indexes=("book_metadata_pkey",),
+        max_rows=100,
+    ),
+    PlanCase(
+        "books.get_multi",
+        lambda db, s: books.get_multi(db, limit=100),
+        allow_seq_scan=CATALOG_TABLES,
+        max_rows=100,
+    ),
+    PlanCase(
+        "books.get_multi_version",
+        lambda db, s: books.get_multi_version(db),
+        allow_seq_scan=CATALOG_TABLES,
+    ),
+    PlanCase(
+        "books.get_user_books",
+        lambda db, s: books.get_user_books(db, s.user_id),
+        max_rows=100,
+    ),
+    PlanCase(
+        "books.update_progress",
+        lambda db, s: books.update_progress(
+            db, s.user_id, s.book_id, {"epub_progress": {"chapter_idx": 3}}
+        ),
+        expect_indexes=("uix_user_book",),
+    ),
+    PlanCase(
+        "books.get_in_progress",
+        lambda db, s: books.get_in_progress(db, s.user_id),
+        expect_indexes=("ix_user_book_library_in_progress",),
+        max_rows=20,
+    ),
+    PlanCase(
+        "books.get_library_overview",
+        lambda db, s: books.get_library_overview(db, s.user_id, limit=50),
+        expect_indexes=(
+            "ix_user_book_library_user_id_date_added",
+            "ix_highlights_user_book_lib_id_created_at",
+        ),
+        max_rows=50,
+    ),
+    PlanCase(
+        "books.get_library_overview:after",
+        _second_overview_page,
+        expect_indexes=("ix_user_book_library_user_id_date_added",),
+        max_rows=50,
+    ),
+    PlanCase(
+        "highlights.get_book_highlights",
+        lambda db, s: highlights.get_book_highlights(db, s.user_id, s.book_id),
+        expect_indexes=("ix_highlights_user_book_lib_id_created_at",),
+    ),
+    PlanCase(
+        "highlights.get_highlights_by_ids",
+        lambda db, s: highlights.get_highlights_by_ids(db, s.user_id, s.highlight_ids),
+        expect_indexes=("highlights_pkey",),
+        max_rows=100,
+    ),
+    PlanCase(
+        "highlights.get_book_highlights_version",
+        lambda db, s: highlights.get_book_highlights_version(db, s.user_id, s.book_id),
+        expect_indexes=("ix_highlights_user_book_lib_id_created_at",),
+        max_rows=1,
+    ),
+    PlanCase(
+        "highlights.stream_export_rows",
+        lambda db, s: _drain(highlights.stream_export_rows(db, s.user_id)),
+    ),
+    PlanCase(
+        "highlights.get_import_targets",
+        lambda db, s: highlights.get_import_targets(db, s.user_id),
+    ),
+    PlanCase(
+        "highlights.create_for_user",
+        lambda db, s: highlights.create_for_user(
+            db,
+            s.user_id,
+            HighlightCreate(
+                book_id=s.book_id, text="Query plan check", epub_chapter_idx=1
+            ),
+        ),
+    ),
+    PlanCase(
+        "highlights.update_note",
+        lambda db, s: highlights.update_note(
+            db, s.user_id, s.highlight_ids[0], "Query plan check"
+        ),
+        expect_indexes=("highlights_pkey",),
+    ),
+    PlanCase(
+        "highlights.delete_by_ids",
+        lambda db, s: highlights.delete_by_ids(db, s.user_id, s.highlight_ids),
+        expect_indexes=("highlights_pkey",),
+    ),
+    PlanCase(
+        "highlights.delete_by_text",
+        lambda db, s: highlights.delete_by_text(db, s.user_id, s.highlight_text),
+    ),
+    PlanCase(
+        "highlights.delete_by_book",
+        lambda db, s: highlights.delete_by_book(db, s.user_id, s.book_id),
+    ),
+    PlanCase(
+        "sync.get_changes",
+        lambda db, s: sync.get_changes(db, s.user_id, limit=500),
+        expect_indexes=("ix_sync_changes_user_id_txid_seq",),
+        max_rows=501,
+    ),
+    PlanCase(
+        "sync.get_changed_rows",
+        lambda db, s: sync.get_changed_rows(
+            db,
+            s.user_id,
+            {"library": s.library_ids, "highlight": s.highlight_ids},
+        ),
+        max_rows=100,
+    ),
+]
+
+
+async def load_subject(conn: AsyncConnection) -> Subject:
+    """Pick a user at the 99th percentile of library size and their busiest book."""
+    user_id = (
+        await conn.execute(
+            text(
+                """
+                SELECT user_id FROM user_book_library
+                GROUP BY user_id
+                ORDER BY count(*) DESC, user_id
+                OFFSET (SELECT count(*) / 100 FROM profiles) LIMIT 1
+                """
+            )
+        )
+    ).scalar_one()
+    library = (
+        await conn.execute(
+            text(
+                """
+                SELECT l.id, l.book_metadata_id, count(h.id) AS highlights
+                FROM user_book_library l
+                LEFT JOIN highlights h ON h.user_book_lib_id = l.id
+                WHERE l.user_id = :user_id
+                GROUP BY l.id
+                ORDER BY highlights DESC, l.id
+                """
+            ),
+            {"user_id": user_id},
+        )
+    ).all()
+    busiest = library[0]
+    sample = (
+        await conn.execute(
+            text(
+                """
+                SELECT id, original_text FROM highlights
+                WHERE user_book_lib_id = :library_id
+                ORDER BY created_at DESC LIMIT 100
+                """
+            ),
+            {"library_id": busiest.id},
+        )
+    ).all()
+    if not sample:
+        raise RuntimeError("Subject user has no highlights; load a larger dataset")
+    return Subject(
+        user_id=user_id,
+        book_id=busiest.book_metadata_id,
+        book_ids=[row.book_metadata_id for row in library[:100]],
+        highlight_ids=[row.id for row in sample],
+        highlight_text=sample[0].original_text,
+        library_ids=[row.id for row in library[:100]],
+    )
+
+
+async def table_sizes(conn: AsyncConnection) -> Dict[str, float]:
+    rows = await conn.execute(
+        text(
+            """
+            SELECT c.relname, c.reltuples FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = 'public' AND c.relkind = 'r'
+            """
+        )
+    )
+    return dict(rows.all())
+
+
+def plan_nodes(node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield node
+    for child in node.get("Plans", ()):
+        yield from plan_nodes(child)
+
+
+def _is_read(sql: str) -> bool:
+    return sql.lstrip().split(None, 1)[0].upper() in ("SELECT", "WITH")
+
+
+async def explain(conn: AsyncConnection, statement: Statement) -> None:
+    statement.analyzed = _is_read(statement.sql)
+    options = "ANALYZE, BUFFERS, FORMAT JSON" if statement.analyzed else "FORMAT JSON"
+    result = await conn.exec_driver_sql(
+        f"EXPLAIN ({options}) {statement.sql}", statement.parameters
+    )
+    plan = result.scalar_one()
+    statement.plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+
+
+def check(
+    case: PlanCase,
+    statement: Statement,
+    sizes: Dict[str, float],
+    min_table_rows: int,
+    max_misestimate: float,
+) -> List[str]:
+    problems = []
+    for node in plan_nodes(statement.plan):
+        relation = node.get("Relation Name")
+        if (
+            node["Node Type"] == "Seq Scan"
+            and relation not in case.allow_seq_scan
+            and sizes.get(relation, 0) > min_table_rows
+        ):
+            problems.append(f"seq scan on {relation} (~{int(sizes[relation])} rows)")
+
+    root = statement.plan
+    if case.max_rows is not None and root["Plan Rows"] > case.max_rows:
+        problems.append(
+            f"estimates {root['Plan Rows']} rows, expected at most {case.max_rows}"
+        )
+    if statement.analyzed:
+        estimated = max(root["Plan Rows"], 1)
+        actual = max(root["Actual Rows"], 1)
+        ratio = max(estimated / actual, actual / estimated)
+        if ratio > max_misestimate:
+            problems.append(
+                f"estimated {root['Plan Rows']} rows but returned {root['Actual Rows']}"
+            )
+    return problems
+
+
+def summarize(statement: Statement) -> Dict[str, Any]:
+    root = statement.plan
+    scans = [
+        " ".join(
+            str(part)
+            for part in (
+                node["Node Type"],
+                node.get("Index Name"),
+                node.get("Relation Name"),
+            )
+            if part
+        )
+        for node in plan_nodes(root)
+        if "Relation Name" in node or "Index Name" in node
+    ]
+    summary = {
+        "sql": " ".join(statement.sql.split())[:160],
+        "scans": scans,
+        "estimated_rows": root["Plan Rows"],
+    }
+    if statement.analyzed:
+        summary["actual_rows"] = root["Actual Rows"]
+        summary["actual_ms"] = root["Actual Total Time"]
+    return summary
+
+
+async def run_case(
+    conn: AsyncConnection,
+    case: PlanCase,
+    subject: Subject,
+    captured: List[Statement],
+) -> List[Statement]:
+    """Run one case in a savepoint that is rolled back, returning its statements."""
+    savepoint = await conn.begin_nested()
+    try:
+        db = AsyncSession(
+            bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False
+        )
+        captured.clear()
+        await case.run(db, subject)
+        statements = list(captured)
+        captured.clear()
+        for statement in statements:
+            await explain(conn, statement)
+        await db.close()
+        return statements
+    finally:
+        captured.clear()
+        await savepoint.rollback()
+
+
+async def main(min_table_rows: int, max_misestimate: float, only: Optional[str]) -> int:
+    engine = create_engine()
+    capturing: List[Statement] = []
+    active = [False]
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        keyword = statement.lstrip().split(None, 1)[0].upper()
+        if (
+            active[0]
+            and not executemany
+            and keyword not in ("SAVEPOINT", "RELEASE", "ROLLBACK")
+        ):
+            capturing.append(Statement(statement, parameters))
+
+    failures = 0
+    results: Dict[str, Any] = {"cases": {}}
+    async with engine.connect() as conn:
+        await conn.begin()
+        sizes = await table_sizes(conn)
+        subject = await load_subject(conn)
+        results["subject_user"] = str(subject.user_id)
+        for case in CASES:
+            if only and only not in case.name:
+                continue
+            active[0] = True
+            try:
+                statements = await run_case(conn, case, subject, capturing)
+                problems = []
+            except Exception as e:
+                statements, problems = [], [f"raised {e}"]
+            finally:
+                active[0] = False
+
+            seen = set()
+            for statement in statements:
+                problems += check(
+                    case, statement, sizes, min_table_rows, max_misestimate
+                )
+                seen.update(
+                    node.get("Index Name") for node in plan_nodes(statement.plan)
+                )
+            problems += [
+                f"does not use index {index}"
+                for index in case.expect_indexes
+                if index not in seen
+            ]
+            failures += bool(problems)
+            results["cases"][case.name] = {
+                "ok": not problems,
+                "problems": problems,
+                "statements": [summarize(s) for s in statements],
+            }
+        await conn.rollback()
+    await engine.dispose()
+
+    results["failures"] = failures
+    report("query_plans", results)
+    return 1 if failures else 0
+
+
+def run_local(args: argparse.Namespace) -> int:
+    from benchmarks import generate_dataset
+    from benchmarks.local_postgres import LocalPostgres
+
+    with LocalPostgres() as url:
+        os.environ["BENCH_DATABASE_URL"] = url
+        plan = generate_dataset.DatasetPlan(
+            seed=args.seed,
+            users=args.users,
+            books=args.books,
+            library_entries=args.library_entries,
+            highlights=args.highlights,
+        )
+        asyncio.run(
+            generate_dataset.main(
+                plan, args.jobs, 50_000, defer_indexes=True, change_feed=True
+            )
+        )
+        return asyncio.run(main(args.min_table_rows, args.max_misestimate, args.only))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--min-table-rows", type=int, default=10_000)
+    parser.add_argument("--max-misestimate", type=float, default=100.0)
+    parser.add_argument("--only", help="run cases whose name contains this string")
+    parser.add_argument(
+        "--local",
+        action="store_true",
+        help="start a throwaway Postgres and generate a dataset first",
+    )
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--books", type=int, default=20_000)
+    parser.add_argument("--library-entries", type=int, default=100_000)
+    parser.add_argument("--highlights", type=int, default=2_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    if args.local:
+        sys.exit(run_local(args))
+    sys.exit(asyncio.run(main(args.min_table_rows, args.max_misestimate, args.only)))
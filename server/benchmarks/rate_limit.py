@@ -0,0 +1,113 @@
+"""Measure what a rate limit check costs per request.
+
+Times ``RateLimiter.hit`` with in-process buckets and with the in-memory
+stand-in for a shared backend, for a few hot users and for many distinct
+users, plus the ``rate_limited`` dependency and the headers middleware. Also
+checks that a burst is cut off at the configured size. No database needed.
+
+Usage:
+    python -m benchmarks.rate_limit --calls 200000 --users 50000
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+from fastapi import HTTPException, Request
+
+from app.core import rate_limit
+from app.core.rate_limit import (
+    SCOPE_KEY,
+    InMemorySharedRateLimit,
+    RateLimiter,
+    RateLimitHeadersMiddleware,
+    parse_rate_limit,
+)
+from app.schemas.auth import TokenData
+from benchmarks.common import report
+
+# Generous enough that the timed loops never run out of tokens
+LIMIT = parse_rate_limit("1000000/second,1000000")
+
+
+async def respond(scope, receive, send) -> None:
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def discard(message) -> None:
+    pass
+
+
+async def per_call_us(call: Callable[[int], Awaitable[Any]], calls: int) -> float:
+    start = time.perf_counter()
+    for i in range(calls):
+        await call(i)
+    return round((time.perf_counter() - start) / calls * 1e6, 2)
+
+
+async def burst_allowed(limiter: RateLimiter, burst: int) -> int:
+    allowed = 0
+    for _ in range(burst + 10):
+        decision = await limiter.hit("burst", "user")
+        allowed += decision.allowed
+    return allowed
+
+
+async def run(calls: int, users: int) -> Dict[str, Any]:
+    user_ids: List[str] = [f"user-{i}" for i in range(users)]
+    results: Dict[str, Any] = {"calls": calls, "users": users}
+    for name, shared in (("local", None), ("shared_memory", InMemorySharedRateLimit())):
+        limiter = RateLimiter({"route": LIMIT}, max_keys=users, shared=shared)
+        results[f"{name}_hot_user_us"] = await per_call_us(
+            lambda i: limiter.hit("route", "hot"), calls
+        )
+        results[f"{name}_many_users_us"] = await per_call_us(
+            lambda i: limiter.hit("route", user_ids[i % users]), calls
+        )
+    results["unlimited_route_us"] = await per_call_us(
+        lambda i: limiter.hit("other", "hot"), calls
+    )
+
+    # The dependency as FastAPI calls it, with the process-wide limiter swapped out
+    limiter = RateLimiter({"route": LIMIT}, max_keys=users)
+    rate_limit.get_rate_limiter = lambda: limiter
+    dependency = rate_limit.rate_limited("route")
+    user = TokenData(sub="hot", role="user")
+    request = Request({"type": "http"})
+    results["dependency_us"] = await per_call_us(
+        lambda i: dependency(request, user), calls
+    )
+
+    middleware = RateLimitHeadersMiddleware(respond)
+    decision = await limiter.hit("route", "hot")
+    results["headers_middleware_us"] = await per_call_us(
+        lambda i: middleware({"type": "http", SCOPE_KEY: decision}, None, discard),
+        calls,
+    )
+
+    burst_limit = parse_rate_limit("1/hour,20")
+    results["burst_20_allowed"] = await burst_allowed(
+        RateLimiter({"burst": burst_limit}, max_keys=10), burst_limit.burst
+    )
+    limiter = RateLimiter({"route": burst_limit}, max_keys=10)
+    dependency = rate_limit.rate_limited("route")
+    try:
+        for _ in range(burst_limit.burst + 1):
+            await dependency(request, user)
+    except HTTPException as e:
+        results["rejection"] = {"status": e.status_code, "headers": e.headers}
+    return results
+
+
+def main(calls: int, users: int) -> None:
+    report("rate_limit", asyncio.run(run(calls, users)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    args = parser.parse_args()
+    main(args.calls, args.users)
@@ -0,0 +1,205 @@
+"""Measure semantic index build cost and query latency for a large library.
+
+Builds indexes for ``--books`` synthetic books into a temporary directory
+with the same chunking, embedding and file layout the indexer uses, then
+times queries drawn from passages of random books: across the whole
+library, as a user with every book would run them, and within one book.
+Library-wide results are compared with exact float32 scores over every
+passage to report what scoring on quantized vectors first loses. Book text draws from
+a Zipf-distributed vocabulary plus words particular to each book, so books
+differ the way real ones do. No database needed.
+
+Usage:
+    python -m benchmarks.semantic_search --books 1000 --queries 200
+"""
+
+import argparse
+import heapq
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from app.services.rag_indexer import chunk_chapters
+from app.services.semantic_search import HashingEmbedder, SemanticIndex
+from benchmarks.common import report
+
+SYLLABLES = (
+    "ba be bi bo bu da de di do ka ke ki ko la le li lo ma me mi mo "
+    "na ne ni no ra re ri ro sa se si so ta te ti to va ve vi"
+).split()
+
+
+def vocabulary(rng: random.Random, size: int) -> List[str]:
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choices(SYLLABLES, k=rng.randint(1, 4))))
+    return sorted(words)
+
+
+def book_chapters(
+    rng: random.Random,
+    vocab: List[str],
+    weights: List[float],
+    words: int,
+    chapters: int,
+) -> List[str]:
+    topic = rng.sample(vocab, 40)
+    text = rng.choices(vocab, cum_weights=weights, k=words)
+    for i in rng.sample(range(words), words // 20):
+        text[i] = rng.choice(topic)
+    per_chapter = words // chapters
+    return [" ".join(text[i : i + per_chapter]) for i in range(0, words, per_chapter)]
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))], 2)
+
+
+def passage_key(hit: Dict[str, Any]):
+    return hit["book_id"], hit["chapter_index"], hit["start_char"]
+
+
+def exhaustive(index: SemanticIndex, query: str, book_ids: List[str], k: int):
+    """Exact float32 top-k over every passage, the slow way."""
+    vector = index.embedder.embed([query])[0]
+    terms = [(dim, weight) for dim, weight in enumerate(vector) if weight]
+    scored = []
+    for book_id in book_ids:
+        book = index.book(book_id)
+        scored.extend((book.score(i, terms), book, i) for i in range(book.size))
+    return [
+        book.hit(i, score)
+        for score, book, i in heapq.nlargest(k, scored, key=lambda hit: hit[0])
+    ]
+
+
+def timed_ms(call) -> float:
+    start = time.perf_counter()
+    call()
+    return (time.perf_counter() - start) * 1000
+
+
+def main(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    vocab = vocabulary(rng, args.vocabulary)
+    cumulative, total = [], 0.0
+    for rank in range(1, len(vocab) + 1):
+        total += 1 / rank
+        cumulative.append(total)
+
+    embedder = HashingEmbedder(args.dimensions)
+    results: Dict[str, Any] = {
+        "books": args.books,
+        "words_per_book": args.words,
+        "dimensions": args.dimensions,
+        "candidates": args.candidates,
+    }
+    with tempfile.TemporaryDirectory() as root:
+        index = SemanticIndex(
+            root, embedder, candidates=args.candidates, open_indexes=args.books
+        )
+        passages: Dict[str, List[str]] = {}
+        chunk_count = 0
+        embed_s = 0.0
+        build_start = time.perf_counter()
+        for b in range(args.books):
+            book_id = f"{b:08d}-0000-4000-8000-000000000000"
+            chunks = chunk_chapters(
+                book_chapters(rng, vocab, cumulative, args.words, args.chapters),
+                args.chunk_words,
+                args.overlap_words,
+            )
+            start = time.perf_counter()
+            vectors = []
+            for i in range(0, len(chunks), args.batch_size):
+                vectors.extend(
+                    embedder.embed([c.text for c in chunks[i : i + args.batch_size]])
+                )
+            embed_s += time.perf_counter() - start
+            index.write_book(book_id, "v1", chunks, vectors)
+            passages[book_id] = [c.text for c in rng.sample(chunks, 3)]
+            chunk_count += len(chunks)
+        build_s = time.perf_counter() - build_start
+        disk = sum(
+            os.path.getsize(os.path.join(dirpath, name))
+            for dirpath, _, names in os.walk(root)
+            for name in names
+        )
+        results["build"] = {
+            "chunks": chunk_count,
+            "seconds": round(build_s, 1),
+            "embed_us_per_chunk": round(embed_s / chunk_count * 1e6, 1),
+            "disk_mb": round(disk / 1e6, 1),
+            "bytes_per_chunk": round(disk / chunk_count),
+        }
+
+        versions = {book_id: "v1" for book_id in passages}
+        book_ids = list(passages)
+        queries = []
+        for _ in range(args.queries):
+            book_id = rng.choice(book_ids)
+            words = rng.choice(passages[book_id]).split()
+            first = rng.randrange(len(words) - args.query_words)
+            queries.append((book_id, " ".join(words[first : first + args.query_words])))
+
+        # Every book's index opened once, as a long-running worker would have it
+        for book_id, query in queries[:1] + [(b, "warm") for b in book_ids]:
+            index.search(query, {book_id: "v1"}, args.k)
+
+        library_ms, book_ms, found, overlap = [], [], 0, 0
+        for n, (book_id, query) in enumerate(queries):
+            hits: List[Dict[str, Any]] = []
+            library_ms.append(
+                timed_ms(lambda: hits.extend(index.search(query, versions, args.k)[0]))
+            )
+            book_ms.append(
+                timed_ms(lambda: index.search(query, {book_id: "v1"}, args.k))
+            )
+            found += bool(hits) and hits[0]["book_id"] == book_id
+            if n < args.exact_queries:
+                exact = exhaustive(index, query, book_ids, args.k)
+                keys = {passage_key(hit) for hit in hits}
+                overlap += sum(passage_key(hit) in keys for hit in exact)
+
+        results["library_query_ms"] = {
+            "p50": percentile(library_ms, 0.5),
+            "p99": percentile(library_ms, 0.99),
+            "mean": round(statistics.mean(library_ms), 2),
+        }
+        results["book_query_ms"] = {
+            "p50": percentile(book_ms, 0.5),
+            "p99": percentile(book_ms, 0.99),
+        }
+        results["top_hit_from_source_book"] = round(found / len(queries), 3)
+        results[f"recall_at_{args.k}_vs_exhaustive"] = round(
+            overlap / (args.k * min(args.exact_queries, len(queries))), 3
+        )
+    report("semantic_search", results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=int, default=1000)
+    parser.add_argument("--words", type=int, default=30000, help="words per book")
+    parser.add_argument("--chapters", type=int, default=20)
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--chunk-words", type=int, default=120)
+    parser.add_argument("--overlap-words", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--candidates", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--query-words", type=int, default=6)
+    parser.add_argument(
+        "--exact-queries",
+        type=int,
+        default=20,
+        help="queries checked against exhaustive search",
+    )
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    main(parser.parse_args())
@@ -0,0 +1,108 @@
+"""Compare JSON serialization paths for a large highlight list response.
+
+Runs without a database. Paths measured:
+  stdlib   - FastAPI's default: validate, dump to Python, json.dumps
+  orjson   - validate, dump to Python, orjson.dumps (ORJSONResponse)
+  adapter  - precompiled TypeAdapter: validate, dump_json in pydantic-core
+
+Usage:
+    python -m benchmarks.serialization --rows 10000
+"""
+
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from app.schemas.highlights import HighlightListAdapter
+from benchmarks.common import report
+
+
+def build_rows(count: int) -> List[Dict[str, Any]]:
+    now = datetime.now(timezone.utc)
+    book_id = uuid.uuid4()
+    return [
+        {
+            "id": uuid.uuid4(),
+            "book_id": book_id,
+            "text": f"A reasonably long highlighted passage, number {i}. " * 3,
+            "color": "yellow",
+            "note": "note" if i % 4 == 0 else None,
+            "epub_range": {
+                "startContainerPath": [0, 4, i % 17, 2],
+                "startOffset": i % 120,
+                "endContainerPath": [0, 4, i % 17, 3],
+                "endOffset": (i % 120) + 40,
+            },
+            "epub_chapter_href": f"chapter-{i % 40}.xhtml",
+            "epub_chapter_idx": i % 40,
+            "epub_chapter_title": f"Chapter {i % 40}",
+            "epub_est_page": i % 400,
+            "pdf_rect_position": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(count)
+    ]
+
+
+def stdlib_path(rows):
+    content = HighlightListAdapter.dump_python(
+        HighlightListAdapter.validate_python(rows), mode="json"
+    )
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")
+    ).encode()
+
+
+def orjson_path(rows):
+    return orjson.dumps(
+        HighlightListAdapter.dump_python(
+            HighlightListAdapter.validate_python(rows), mode="json"
+        )
+    )
+
+
+def adapter_path(rows):
+    return HighlightListAdapter.dump_json(HighlightListAdapter.validate_python(rows))
+
+
+def measure(fn: Callable, rows, repeat: int) -> Dict[str, Any]:
+    body = fn(rows)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(rows)
+    elapsed = (time.perf_counter() - start) / repeat
+    return {
+        "ms_per_response": round(elapsed * 1000, 2),
+        "rows_per_second": round(len(rows) / elapsed),
+        "bytes": len(body),
+    }
+
+
+def main(rows: int, repeat: int) -> None:
+    data = build_rows(rows)
+    results = {"rows": rows}
+    for name, fn in (
+        ("stdlib", stdlib_path),
+        ("orjson", orjson_path),
+        ("adapter", adapter_path),
+    ):
+        results[name] = measure(fn, data, repeat)
+    results["adapter_speedup_vs_stdlib"] = round(
+        results["stdlib"]["ms_per_response"] / results["adapter"]["ms_per_response"], 1
+    )
+    report("serialization", results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    main(args.rows, args.repeat)
@@ -0,0 +1,79 @@
+"""Measure throughput as ``app.server`` goes from one worker to one per CPU.
+
+Runs the load test mix against the production launcher once per worker
+count, with enough concurrency to keep every worker busy, and reports
+throughput, p99 latency and scaling efficiency against one worker. Postgres
+shares the machine, so on small hosts the database caps scaling before the
+workers do; point ``BENCH_DATABASE_URL`` elsewhere to take it out.
+
+Usage:
+    python -m benchmarks.worker_scaling --duration 20
+    python -m benchmarks.worker_scaling --workers 1 2 4 8
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+from typing import Any, Dict, List
+
+from app.server import available_cpus
+from benchmarks import loadtest
+from benchmarks.common import report
+from benchmarks.local_postgres import LocalPostgres
+
+
+def worker_counts(cpus: int) -> List[int]:
+    counts = [1]
+    while counts[-1] * 2 < cpus:
+        counts.append(counts[-1] * 2)
+    if cpus > 1:
+        counts.append(cpus)
+    return counts
+
+
+def main(args: argparse.Namespace) -> None:
+    cpus = available_cpus()
+    counts = args.workers or worker_counts(cpus)
+    results: Dict[str, Any] = {"cpus": cpus, "runs": {}}
+    with contextlib.ExitStack() as stack:
+        database_url = os.environ.get("BENCH_DATABASE_URL") or stack.enter_context(
+            LocalPostgres()
+        )
+        for workers in counts:
+            run_args = argparse.Namespace(
+                users=args.users,
+                books=args.books,
+                highlights=args.highlights,
+                concurrency=args.concurrency_per_worker * workers,
+                duration=args.duration,
+                warmup=args.warmup,
+                seed=args.seed,
+                workers=workers,
+            )
+            run = asyncio.run(loadtest.run(run_args, database_url))
+            results["runs"][workers] = {
+                "concurrency": run_args.concurrency,
+                "throughput_rps": run["throughput_rps"],
+                "errors": run["total_errors"],
+                "p99_ms": max(e["p99_ms"] for e in run["endpoints"].values()),
+            }
+
+    single = results["runs"][counts[0]]["throughput_rps"] / counts[0]
+    for workers, run in results["runs"].items():
+        run["speedup"] = round(run["throughput_rps"] / single, 2)
+        run["efficiency"] = round(run["speedup"] / workers, 2)
+    report("worker_scaling", results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="*", help="worker counts to try")
+    parser.add_argument("--concurrency-per-worker", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--books", type=int, default=20)
+    parser.add_argument("--highlights", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    main(parser.parse_args())